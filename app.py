@@ -1,80 +1,65 @@
 #Marcus🗿 was here
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import re
+from cache import clear_cache, load_cached_records
 from collections import defaultdict
+from dedup import SeenCalls, drop_repeated
+from exports import DURATION_FILES, export_path
+from incremental import add_values, file_state, load_state, save_state, take_new_records
+from instrument import finish_run, instrumented, start_run
+from lengths import length_histograms, length_stats, merge_histograms
+from quarantine import collecting, merge_rejected, print_rejected, read_quarantine, reject, write_quarantine
+from roster import AgentRoster, as_roster
+from sources import agent_column, is_call_log, normalize_names, read_source, source_spec
+from sources import extract_name  # noqa: F401  (defined here before the sources moved to sources.py; kept for scripts importing it)
 
-def extract_name(agent_str):
-    """Extract the name from the agent string in 'voicespin.csv'."""
-    if pd.isna(agent_str) or not isinstance(agent_str, str):
-        return ''
-    
-    agent_str = agent_str.strip()
-    
-    # Split the string by '-' and take the first part
-    parts = agent_str.split('-')
-    if len(parts) > 1:
-        name = parts[0].strip()
-    else:
-        name = agent_str
-    
-    # Remove any trailing numbers and whitespace
-    name = re.sub(r'\s*\d+\s*$', '', name)
-    
-    return name.lower()
+# Optional HH: part, then MM:SS, each part allowing the sign, inner spaces and digit-group underscores int() accepts
+DURATION_PATTERN = re.compile(r'^(?:\s*([+-]?[0-9]+(?:_[0-9]+)*)\s*:)?\s*([+-]?[0-9]+(?:_[0-9]+)*)\s*:\s*([+-]?[0-9]+(?:_[0-9]+)*)\s*$')
 
-def convert_to_seconds(duration_str, is_voicespin=False):
+def parse_durations(values, is_voicespin=False):
     """
-    Converts a duration string to total seconds. Handles formats of HH:MM:SS, MM:SS, and cases with unexpected extra parts.
-    For voicespin data, formats like MM:SS should be handled correctly, and extra trailing zeros should be removed.
+    Converts a whole duration column (HH:MM:SS or MM:SS; voicespin's HH:MM:00 is MM:SS) to seconds in one pass.
+    Returns an int64 array of seconds and a boolean mask of the rows that could not be parsed (those count as 0).
     """
-    if pd.isna(duration_str) or not isinstance(duration_str, str):
-        print(f"Warning: Invalid duration value detected: {duration_str}")
-        return 0  # Default to 0 if duration_str is NaN or not a string
-
-    duration_str = duration_str.strip()
-    
-    if not duration_str:
-        print(f"Warning: Empty duration value detected: '{duration_str}'")
-        return 0  # Return 0 if the duration string is empty
-
-    try:
-        if is_voicespin:
-            # Handle MM:SS and HH:MM:SS formats with trailing zeros
-            parts = duration_str.split(':')
-            if len(parts) > 2:
-                # If there are more than two parts, it's likely HH:MM:SS with trailing zeros
-                if len(parts) == 3 and parts[-1] == '00':
-                    # Remove the trailing '00' for HH:MM:SS
-                    parts.pop()
-                # Rejoin the remaining parts
-                duration_str = ':'.join(parts)
-            parts = duration_str.split(':')
-            if len(parts) == 2:  # MM:SS
-                minutes, seconds = map(int, parts)
-                total_seconds = minutes * 60 + seconds
-            elif len(parts) == 3:  # HH:MM:SS
-                hours, minutes, seconds = map(int, parts)
-                total_seconds = (hours * 3600) + (minutes * 60) + seconds
-            else:
-                print(f"Warning: Unexpected duration format for voicespin: '{duration_str}'")
-                return 0
-        else:
-            # Handle HH:MM:SS or MM:SS format
-            parts = duration_str.split(':')
-            if len(parts) == 3:  # HH:MM:SS
-                hours, minutes, seconds = map(int, parts)
-                total_seconds = (hours * 3600) + (minutes * 60) + seconds
-            elif len(parts) == 2:  # MM:SS
-                minutes, seconds = map(int, parts)
-                total_seconds = (minutes * 60) + seconds
-            else:
-                print(f"Warning: Unexpected duration format: '{duration_str}'")
-                return 0
-        
-        return total_seconds
-    except ValueError as e:
-        print(f"Error converting duration '{duration_str}': {e}")
-        return 0  # Default to 0 in case of an error
+    # Exports repeat the same few thousand durations, so parse each distinct value once
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    text = pd.Series([value if isinstance(value, str) else np.nan for value in uniques], dtype=object).str.strip()  # Non-strings can't be read
+
+    if is_voicespin:
+        # HH:MM:00 from voicespin is really MM:SS with trailing zeros
+        trailing = (text.str.count(':') == 2) & text.str.endswith(':00')
+        text = text.where(~trailing, text.str[:-3])
+
+    parts = text.str.extract(DURATION_PATTERN).apply(lambda part: part.str.replace('_', '', regex=False))
+    valid = parts[1].notna().to_numpy()
+    hours = pd.to_numeric(parts[0]).fillna(0).to_numpy()
+    minutes = pd.to_numeric(parts[1]).fillna(0).to_numpy()
+    seconds = pd.to_numeric(parts[2]).fillna(0).to_numpy()
+    unique_seconds = np.where(valid, hours * 3600 + minutes * 60 + seconds, 0).astype('int64')
+
+    # Missing values get code -1, which picks the appended sentinel
+    seconds = np.append(unique_seconds, 0)[codes]
+    invalid = np.append(~valid, True)[codes]
+    return seconds, invalid
+
+def convert_to_seconds(duration_str, is_voicespin=False):
+    """Convert one duration to seconds as parse_durations does, 0 where it can't be read; kept for scripts that parse single values."""
+    return int(parse_durations([duration_str], is_voicespin)[0][0])
+
+def duration_problems(values):
+    """Say why each of these unparseable durations was rejected: missing, empty or malformed."""
+    values = pd.Series(values, dtype=object)
+    blank = values.astype(str).str.strip() == ''
+    return np.where(values.isna(), 'missing duration', np.where(blank, 'empty duration', 'malformed duration'))
+
+def reject_durations(df, filename, duration_column, invalid):
+    """Send the rows whose duration could not be parsed (and so counted as 0) to the quarantine."""
+    if invalid.any():
+        rows = df.loc[invalid].drop(columns=['Agent_list', 'Duration_seconds'], errors='ignore')
+        reject(filename, rows, duration_column, duration_problems(rows[duration_column]))
 
 def convert_to_hours_minutes_seconds(seconds):
     """Convert seconds to hours, minutes, and seconds, returning them as a formatted string."""
@@ -93,74 +78,327 @@ def preprocess_data(df, duration_column):
     df[duration_column] = df[duration_column].fillna('0:00')
     return df
 
-def process_duration_file(df, filename, duration_column, is_voicespin=False):
-    """Process a file to calculate total duration in seconds."""
-    print(f"Processing file: {filename}")
-    print(f"Duration column: {duration_column}")
-    
+def add_duration_seconds(df, duration_column, is_voicespin=False):
+    """Add the 'Duration_seconds' column and return the frame with the mask of invalid durations."""
     # Replace NaN values with '0:00'
     df = preprocess_data(df, duration_column)
     
     # Convert column to string to handle any mixed data types
     df[duration_column] = df[duration_column].astype(str)
     
+    seconds, invalid = parse_durations(df[duration_column], is_voicespin)
+    df.loc[:, 'Duration_seconds'] = seconds
+    return df, invalid
+
+def process_duration_file(df, filename, duration_column, is_voicespin=False):
+    """Process a file to calculate total duration in seconds."""
+    print(f"Processing file: {filename}")
+    print(f"Duration column: {duration_column}")
+    
     # Print some example values from the duration column
     print("Example duration values:")
     print(df[duration_column].head())
     
-    df.loc[:, 'Duration_seconds'] = df[duration_column].apply(lambda x: convert_to_seconds(x, is_voicespin))
+    df, invalid = add_duration_seconds(df, duration_column, is_voicespin)
+    reject_durations(df, filename, duration_column, invalid)
+    
     total_seconds = df['Duration_seconds'].sum()
     
     print(f"Total seconds for {filename}: {total_seconds}")
     return total_seconds
 
 def extract_agent_names(df, filename):
-    """Extract and normalize agent names from different columns."""
-    if filename in ['voiso summitlife.csv', 'voiso traling.csv', 'voiso 24x.csv']:
-        df.loc[:, 'Agent_list'] = df['Agent(s)'].apply(lambda x: [name.strip().lower() for name in str(x).split('; ')] if pd.notna(x) else [])
-    elif filename in ['coperato traling2.csv', 'coperato signix2.csv',  'coperato 24x2.csv']:
-        df.loc[:, 'Agent_list'] = df['Name'].apply(lambda x: x.strip().lower() if pd.notna(x) else '')
-    elif filename == 'voicespin.csv':
-        df.loc[:, 'Agent_list'] = df['AGENT'].apply(extract_name)
+    """Extract and normalize agent names with the rule the file's source declares."""
+    spec = source_spec(filename)
+    column = agent_column(df, spec) if spec is not None else None
+    if column is not None:
+        df.loc[:, 'Agent_list'] = normalize_names(df[column], spec['extract'])
     
     return df
 
-def process_files(df_files, df_agents):
-    """Process all files and return results categorized by agent type."""
+def aggregate_durations(df, filename):
+    """
+    Sum the seconds per agent for one processed file, giving one (agent, filename, seconds) row per agent,
+    and the call-length histograms of its calls (see lengths.py); returns (totals, lengths).
+    """
+    # Voiso rows can list several agents; each of them is credited with the full call
+    calls = df[['Agent_list', 'Duration_seconds']].explode('Agent_list')
+    calls = calls[calls['Agent_list'].notna()]  # Rows whose agent list was empty
+    totals = calls.groupby('Agent_list', sort=False)['Duration_seconds'].sum()
+    totals = pd.DataFrame({'agent': totals.index, 'filename': filename, 'seconds': totals.to_numpy()})
+    return totals, length_histograms(calls['Agent_list'], calls['Duration_seconds'])
+
+def split_by_department(file_totals, roster):
+    """Join per-agent, per-file seconds to the roster and split them into conversion and retention agents."""
+    roster = as_roster(roster).frame[['agent', 'desk', 'department']]
+    roster = roster[roster['department'].isin([1, 2])]
+    # A name listed twice keeps its first position but its last desk
+    roster = roster.groupby(['department', 'agent'], sort=False)['desk'].last().reset_index()
+    
+    # An agent listed in both departments is only credited as a conversion agent
+    conversion_names = roster.loc[roster['department'] == 1, 'agent']
+    credited = roster[(roster['department'] == 1) | ~roster['agent'].isin(conversion_names)]
+    credited = credited.merge(file_totals, on='agent', how='inner')
+    
+    conversion_agents = {}
+    retention_agents = {}
+    departments = {1: conversion_agents, 2: retention_agents}
+    
+    for department, agent, desk in roster[['department', 'agent', 'desk']].itertuples(index=False):
+        departments[department][agent] = {
+            'desk': desk,
+            'total_seconds': 0,
+            'sources': defaultdict(int)
+        }
+    
+    for department, agent, filename, seconds in credited[['department', 'agent', 'filename', 'seconds']].itertuples(index=False):
+        departments[department][agent]['total_seconds'] += seconds
+        departments[department][agent]['sources'][filename] += seconds
+    
+    return conversion_agents, retention_agents
+
+def select_duration_rows(df, filename):
+    """Apply the file's status filter and return (df, duration_column, is_voicespin), or None for files we don't process."""
+    if not is_call_log(filename):
+        return None
+    spec = source_spec(filename)
+    if spec['answered'] is not None:
+        df = df[df[spec['status']] == spec['answered']]
+    return df, spec['duration'], spec['voicespin_durations']
+
+@instrumented('file durations')
+def file_duration_totals(df, filename):
+    """Process one loaded file and return its (totals, lengths) as aggregate_durations gives them, or None for files we don't process."""
+    selected = select_duration_rows(df, filename)
+    if selected is None:
+        return None
+    df, duration_column, is_voicespin = selected
+    
+    df = extract_agent_names(df, filename)
+    process_duration_file(df, filename, duration_column, is_voicespin)
+    return aggregate_durations(df, filename)
+
+def merge_duration_totals(partial_totals):
+    """Add up partial (agent, filename, seconds) totals, keeping agents in order of first appearance."""
+    merged = pd.concat(partial_totals, ignore_index=True)
+    return merged.groupby(['agent', 'filename'], sort=False)['seconds'].sum().reset_index()
+
+@instrumented('stream durations')
+def stream_file_durations(path, filename, chunksize=100000):
+    """
+    Read one file in chunks of `chunksize` rows and return its (totals, lengths), or None for files we don't process.
+    Only the identities of the calls read so far are kept, so a call repeated in a later chunk is still counted once.
+    """
+    if not is_call_log(filename):
+        return None
+    print(f"Streaming file: {filename} ({chunksize} rows per chunk)")
+    totals = None
+    lengths = None
+    seen = SeenCalls()
+    
+    for chunk in read_source(path, filename, chunksize):
+        records = seen.drop_seen(normalize_calls(chunk, filename), filename)
+        
+        # Fold each chunk into the running totals so only one chunk is held at a time
+        chunk_totals, chunk_lengths = record_durations(records, filename)
+        totals = chunk_totals if totals is None else merge_duration_totals([totals, chunk_totals])
+        lengths = merge_histograms([lengths, chunk_lengths])
+    
+    if totals is None:
+        totals = pd.DataFrame(columns=['agent', 'filename', 'seconds'])
+    print(f"Total seconds for {filename}: {totals['seconds'].sum()}")
+    return totals, lengths
+
+def text_column(df, column):
+    """Return a column as nullable text, or an empty one if the export doesn't have it."""
+    if column is None or column not in df.columns:
+        return pd.Series(pd.NA, index=df.index, dtype='string')
+    return df[column].astype('string')
+
+def time_column(df, column):
+    """Return a column as call times (NaT where missing or unreadable), or an empty one if the export doesn't have it."""
+    if column is None or column not in df.columns:
+        return pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    return pd.to_datetime(df[column], errors='coerce')
+
+@instrumented('normalize calls')
+def normalize_calls(df, filename, since=None):
+    """
+    Turn a raw call log into normalized call records with one row per call and agent:
+    agent, seconds, number (destination), call_id, status and time.
+    With `since`, only calls from that time on are kept, before any names or durations are parsed.
+    """
+    spec = source_spec(filename)
+    df.columns = df.columns.str.strip()  # Clean column names
+    
+    times = time_column(df, spec['time'])
+    if since is not None and times.notna().any():
+        # The calls at `since` itself are kept for incremental.take_new_records to tell apart
+        df = df[times >= since]
+        times = times[times >= since]
+    
+    df = extract_agent_names(df, filename)
+    df, invalid = add_duration_seconds(df, spec['duration'], spec['voicespin_durations'])
+    # Only answered calls count towards talk time, so only theirs are rejected
+    if spec['answered'] is not None:
+        invalid &= (df[spec['status']] == spec['answered']).to_numpy()
+    reject_durations(df, filename, spec['duration'], invalid)
+    
+    records = pd.DataFrame({
+        'agent': df['Agent_list'],
+        'seconds': df['Duration_seconds'],
+        'number': text_column(df, spec['number']),
+        'call_id': text_column(df, spec['call_id']),
+        'status': text_column(df, spec['status']),
+        'time': times
+    })
+    if spec['multi_agent']:
+        # One record per agent on multi-agent calls; calls without agents are dropped
+        records = records.explode('agent')
+        records = records[records['agent'].notna()]
+    return records.reset_index(drop=True)
+
+@instrumented('read call records')
+def read_call_records(path, filename, chunksize=None, since=None):
+    """
+    Read a call log (in chunks if `chunksize` is set) into normalized call records, optionally only the calls from `since` on.
+    A call listed more than once (see dedup.drop_repeated) is kept once.
+    """
+    if chunksize:
+        records = pd.concat([normalize_calls(chunk, filename, since) for chunk in read_source(path, filename, chunksize)], ignore_index=True)
+    else:
+        records = normalize_calls(read_source(path, filename), filename, since)
+    
+    # Agents and statuses repeat on nearly every row, so keep them as categories
+    records['agent'] = records['agent'].astype('category')
+    records['status'] = records['status'].astype('category')
+    return drop_repeated(records, filename)
+
+@instrumented('aggregate durations')
+def record_durations(records, filename):
+    """Sum the seconds per agent from normalized call records; returns (totals, lengths) as aggregate_durations does."""
+    spec = source_spec(filename)
+    if spec['answered'] is not None:
+        records = records[records['status'].isin([spec['answered']])]
+    
+    totals = records.groupby('agent', sort=False, observed=True)['seconds'].sum()
+    totals = pd.DataFrame({'agent': totals.index.astype(object), 'filename': filename, 'seconds': totals.to_numpy()})
+    return totals, length_histograms(records['agent'], records['seconds'])
+
+def load_file_durations(path, filename, chunksize=None, cache_dir=None):
+    """
+    Read and aggregate one file, streaming it in chunks if `chunksize` is set; returns its (totals, lengths) or None.
+    With a `cache_dir` the file's normalized call records are reused from earlier runs when its content is unchanged.
+    Either way each call is counted once, as pipeline.load_source counts it.
+    """
+    if not is_call_log(filename):
+        return None
+    if chunksize and not cache_dir:
+        return stream_file_durations(path, filename, chunksize)
+    return record_durations(load_call_records(path, filename, chunksize, cache_dir), filename)
+
+@instrumented('load durations')
+def load_all_durations(paths, filenames, chunksize=None, workers=1, cache_dir=None):
+    """
+    Load every file's per-agent totals, using a pool of `workers` processes when more than one.
+    Returns the (totals, filename) pairs and the call-length histograms of all the files.
+    """
+    if workers > 1:
+        # Files are independent, so each worker parses one and sends back only its per-agent totals and call lengths
+        count = len(paths)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(collecting, [load_file_durations] * count, paths, filenames, [chunksize] * count, [cache_dir] * count))
+        file_results = []
+        for result, rejected in results:
+            merge_rejected(rejected)
+            file_results.append(result)
+    else:
+        file_results = [load_file_durations(path, filename, chunksize, cache_dir) for path, filename in zip(paths, filenames)]
+    
+    loaded = [(result, filename) for result, filename in zip(file_results, filenames) if result is not None]
+    return [(totals, filename) for (totals, _), filename in loaded], merge_histograms([lengths for (_, lengths), _ in loaded])
+
+def load_call_records(path, filename, chunksize=None, cache_dir=None, since=None):
+    """Return a file's normalized call records, from the cache when a `cache_dir` is given."""
+    if cache_dir:
+        return load_cached_records(path, filename, cache_dir, lambda path: read_call_records(path, filename, chunksize))
+    return read_call_records(path, filename, chunksize, since)
+
+def load_incremental_durations(paths, filenames, state_path, chunksize=None, cache_dir=None, replayed=(), dedup_path=None, dedup_bloom=False):
+    """
+    Add only the calls newer than each file's watermark to the per-agent totals saved in state_path,
+    plus any `replayed` (totals, filename) pairs of fixed quarantined rows,
+    save the state and return the month-to-date (totals, filename) pairs and call-length histograms.
+    Each file's histograms are kept with its seconds, so they are reset together when an export has to be recounted.
+    With a `dedup_path` calls are matched by identity against every call counted before instead of by time,
+    so overlapping exports, late calls and calls without a time are each counted once.
+    """
+    state = load_state(state_path)
+    seen = SeenCalls(dedup_path, dedup_bloom) if dedup_path else None
+    
+    for path, filename in zip(paths, filenames):
+        if not is_call_log(filename):
+            continue
+        entry = file_state(state, filename)
+        if seen is not None:
+            records = seen.drop_seen(load_call_records(path, filename, chunksize, cache_dir), filename)
+        else:
+            records = take_new_records(entry, load_call_records(path, filename, chunksize, cache_dir, entry['watermark']), filename)
+        totals, lengths = record_durations(records, filename)
+        add_values(entry.setdefault('seconds', {}), zip(totals['agent'], totals['seconds']))
+        entry['lengths'] = merge_histograms([entry.get('lengths'), lengths])
+        print(f"{len(records)} new call records in {filename}")
+    
+    for totals, filename in replayed:
+        add_values(file_state(state, filename).setdefault('seconds', {}), zip(totals['agent'], totals['seconds']))
+    
+    if state.pop('lengths', None) is not None:
+        # States saved before call lengths were kept per file; those can't be told apart, so only new calls are counted
+        print("Note: the call lengths saved before this run weren't kept per file, so the Call Lengths sheets start over")
+    save_state(state, state_path)
+    if seen is not None:
+        seen.save()
+    
+    per_file_totals = []
+    for filename in filenames:
+        seconds = state['files'].get(filename, {}).get('seconds')
+        if seconds is not None:
+            per_file_totals.append((pd.DataFrame({'agent': list(seconds), 'filename': filename, 'seconds': list(seconds.values())}), filename))
+    lengths = merge_histograms([state['files'].get(filename, {}).get('lengths') for filename in filenames])
+    return per_file_totals, lengths
+
+def replay_quarantine(quarantine_path):
+    """
+    Total the talk time of the fixed rows in a quarantine file; returns (totals, filename) pairs to add to a run's.
+    Rows that still can't be parsed are rejected again. The rows were already counted as calls (of 0 s) when they were
+    rejected, so their call lengths are left out.
+    """
+    per_file_totals = []
+    for filename, rows in read_quarantine(quarantine_path).items():
+        print(f"Replaying {len(rows)} quarantined rows of {filename}")
+        result = file_duration_totals(rows, filename)
+        if result is not None:
+            per_file_totals.append((result[0], filename))
+    return per_file_totals
+
+def add_duration_totals(per_file_totals, extra_totals):
+    """Add more (totals, filename) pairs, e.g. replayed rows, into per_file_totals, keeping the file order."""
+    extra = defaultdict(list)
+    for totals, filename in extra_totals:
+        extra[filename].append(totals)
+    merged = [(merge_duration_totals([totals] + extra.pop(filename, [])), filename) for totals, filename in per_file_totals]
+    return merged + [(merge_duration_totals(parts), filename) for filename, parts in extra.items()]
+
+@instrumented('summarize durations')
+def summarize_durations(per_file_totals, roster):
+    """Combine (totals, filename) pairs into results categorized by agent type."""
     file_durations = defaultdict(lambda: defaultdict(int))
     unmatched_agents = defaultdict(set)
     
-    known_agents = set(df_agents['AGENTNAME'].str.strip().str.lower())
+    roster = as_roster(roster)
     
-    for df, filename in df_files:
-        if filename in ['voiso summitlife.csv', 'voiso traling.csv', 'voiso 24x.csv']:
-            duration_column = 'Talk time'
-            is_voicespin = False
-        elif filename in ['coperato traling2.csv', 'coperato signix2.csv',  'coperato 24x2.csv']:
-            duration_column = 'Duration'
-            df = df[df['Disposition'] == 'ANSWERED']
-            is_voicespin = False
-        elif filename == 'voicespin.csv':
-            duration_column = 'BILLSEC'
-            is_voicespin = True
-            df = df[df['CALL STATUS'] == 'ANSWERED']
-        else:
-            continue
-        
-        df = extract_agent_names(df, filename)
-        total_seconds = process_duration_file(df, filename, duration_column, is_voicespin)
-        
-        for _, row in df.iterrows():
-            agents = row['Agent_list']
-            if isinstance(agents, list):
-                for a in agents:
-                    file_durations[a][filename] += row['Duration_seconds']
-                    if a not in known_agents:
-                        unmatched_agents[filename].add(a)
-            else:
-                file_durations[agents][filename] += row['Duration_seconds']
-                if agents not in known_agents:
-                    unmatched_agents[filename].add(agents)
+    for totals, filename in per_file_totals:
+        unmatched_agents[filename].update(totals.loc[~totals['agent'].isin(roster.index), 'agent'])
         
         # Print unmatched agents for the current file
         if unmatched_agents[filename]:
@@ -168,38 +406,25 @@ def process_files(df_files, df_agents):
         else:
             print(f"No unmatched agents in {filename}.")
     
-    conversion_agents = {}
-    retention_agents = {}
+    file_totals = pd.concat([totals for totals, _ in per_file_totals], ignore_index=True) if per_file_totals else pd.DataFrame(columns=['agent', 'filename', 'seconds'])
+    for agent, filename, seconds in file_totals.itertuples(index=False):
+        file_durations[agent][filename] += seconds
     
-    for _, row in df_agents.iterrows():
-        agent = row['AGENTNAME'].strip().lower()
-        desk = row['DESK'].strip()
-        if row['DEPARTMENT'] == 1:
-            conversion_agents[agent] = {
-                'desk': desk,
-                'total_seconds': 0,
-                'sources': defaultdict(int)
-            }
-        elif row['DEPARTMENT'] == 2:
-            retention_agents[agent] = {
-                'desk': desk,
-                'total_seconds': 0,
-                'sources': defaultdict(int)
-            }
-    
-    for agent, files in file_durations.items():
-        total_seconds = sum(files.values())
-        if agent in conversion_agents:
-            conversion_agents[agent]['total_seconds'] += total_seconds
-            for filename, seconds in files.items():
-                conversion_agents[agent]['sources'][filename] += seconds
-        elif agent in retention_agents:
-            retention_agents[agent]['total_seconds'] += total_seconds
-            for filename, seconds in files.items():
-                retention_agents[agent]['sources'][filename] += seconds
+    conversion_agents, retention_agents = split_by_department(file_totals, roster)
     
     return conversion_agents, retention_agents, file_durations, unmatched_agents
 
+@instrumented('process files')
+def process_files(df_files, roster):
+    """Process all files and return results categorized by agent type."""
+    per_file_totals = []
+    for df, filename in df_files:
+        result = file_duration_totals(df, filename)
+        if result is not None:
+            per_file_totals.append((result[0], filename))
+    
+    return summarize_durations(per_file_totals, roster)
+
 
 def calculate_target_percentage(seconds, target_seconds):
     """Calculate the percentage of the target achieved."""
@@ -226,8 +451,50 @@ def get_max_lengths(agents, target_seconds):
     
     return max_lengths
 
-def export_to_excel(conversion_agents, retention_agents, filename):
-    """Export agent performance data to an Excel file."""
+def call_length_rows(group, names, stats):
+    """Turn length_stats rows into report rows: the group, the name columns given and the formatted statistics."""
+    return [
+        {
+            'Group': group,
+            **name_columns,
+            'Calls': int(calls),
+            'Median Call': convert_to_hours_minutes_seconds(int(median)),
+            'P90 Call': convert_to_hours_minutes_seconds(int(p90)),
+            'Short Calls': f"{short_ratio * 100:.2f}%",
+            'Longest Call': convert_to_hours_minutes_seconds(int(longest))
+        }
+        for name_columns, calls, median, p90, short_ratio, longest in zip(
+            names, stats['calls'], stats['median'], stats['p90'], stats['short_ratio'], stats['longest']
+        )
+    ]
+
+@instrumented('call lengths')
+def call_length_sheets(conversion_agents, retention_agents, lengths):
+    """
+    Build the 'Call Lengths' sheet (one row per reported agent) and the 'Desk Call Lengths' sheet from per-agent
+    call-length histograms (see lengths.py). Desks add up their agents' histograms, so their medians are over all their calls.
+    """
+    agent_rows = []
+    desk_rows = []
+    for group, agents in [('Conversion', conversion_agents), ('Retention', retention_agents)]:
+        # Agents without calls get empty histograms
+        histograms = lengths.reindex(list(agents), fill_value=0)
+        agent_rows += call_length_rows(group, [{'Agent Name': agent.title(), 'Desk': info['desk']} for agent, info in agents.items()], length_stats(histograms))
+
+        desks = [info['desk'] for info in agents.values()]
+        desk_histograms = merge_histograms([histograms.set_axis(desks)])
+        if desk_histograms is not None:
+            agent_counts = pd.Series(desks).value_counts()
+            desk_names = [{'Desk': desk, 'Agents': int(agent_counts[desk])} for desk in desk_histograms.index]
+            desk_rows += call_length_rows(group, desk_names, length_stats(desk_histograms))
+    return pd.DataFrame(agent_rows), pd.DataFrame(desk_rows)
+
+@instrumented('export durations')
+def export_to_excel(conversion_agents, retention_agents, filename, lengths=None):
+    """
+    Export agent performance data to an Excel file.
+    With `lengths` (the per-agent call-length histograms) it also gets the 'Call Lengths' and 'Desk Call Lengths' sheets.
+    """
     conversion_target_seconds = 2 * 3600 + 30 * 60  # 2 hours 30 minutes
     retention_target_seconds = 4 * 3600  # 4 hours
     
@@ -257,6 +524,11 @@ def export_to_excel(conversion_agents, retention_agents, filename):
             } for agent, info in retention_agents.items()
         ])
         retention_df.to_excel(writer, sheet_name='Retention Agents', index=False)
+        
+        if lengths is not None:
+            agent_lengths, desk_lengths = call_length_sheets(conversion_agents, retention_agents, lengths)
+            agent_lengths.to_excel(writer, sheet_name='Call Lengths', index=False)
+            desk_lengths.to_excel(writer, sheet_name='Desk Call Lengths', index=False)
 
 def print_unmatched_agents(unmatched_agents):
     """Print unmatched agents to the terminal."""
@@ -267,30 +539,73 @@ def print_unmatched_agents(unmatched_agents):
             print(f"  {agent.title()}")
         print("\n")
 
+def run_durations(data_dir, output='Agent_Duration_Results.xlsx', chunksize=None, workers=1, cache_dir=None, clear=False,
+                  incremental=False, state_path='duration_state.pkl', dedup_path=None, dedup_bloom=False,
+                  quarantine_path='rejected_rows.csv', replay_path=None):
+    """
+    Total every agent's talk time over the call logs in data_dir and write the duration report (what app.py runs).
+    replay_path is a fixed copy of an earlier quarantine; it can't be quarantine_path, which the run replaces.
+    """
+    if replay_path and os.path.exists(quarantine_path) and os.path.samefile(replay_path, quarantine_path):
+        raise ValueError(f"{replay_path} is replaced by this run's rejected rows. Replay a fixed copy of it instead.")
 
+    # Load the agent information from Excel, normalizing the names once
+    roster = AgentRoster.from_excel(os.path.join(data_dir, 'agents.xlsx'))
 
-if __name__ == "__main__":
-    # Load the agent information from Excel and clean the AGENTNAME
-    df_agents = pd.read_excel(r'C:\Users\marcus.forsen\Desktop\new project\agents.xlsx')
-    df_agents['AGENTNAME'] = df_agents['AGENTNAME'].str.strip().str.lower()
-    df_agents['DESK'] = df_agents['DESK'].str.strip()
-
-    # Load the call logs from CSV files with filenames
-    df_files = [
-        (pd.read_csv(r'C:\Users\marcus.forsen\Desktop\new project\voiso summitlife.csv'), 'voiso summitlife.csv'),
-        (pd.read_csv(r'C:\Users\marcus.forsen\Desktop\new project\voiso traling.csv'), 'voiso traling.csv'),
-        (pd.read_csv(r'C:\Users\marcus.forsen\Desktop\new project\voiso 24x.csv'), 'voiso 24x.csv'),
-        (pd.read_csv(r'C:\Users\marcus.forsen\Desktop\new project\coperato traling2.csv'), 'coperato traling2.csv'),
-        (pd.read_csv(r'C:\Users\marcus.forsen\Desktop\new project\coperato signix2.csv'), 'coperato signix2.csv'),
-        (pd.read_csv(r'C:\Users\marcus.forsen\Desktop\new project\coperato 24x2.csv'), 'coperato 24x2.csv'),
-        (pd.read_csv(r'C:\Users\marcus.forsen\Desktop\new project\voicespin.csv'), 'voicespin.csv')
-    ]
+    # The call logs to process; each can also be gzipped, zipped or split into a folder of parts (see exports.export_path)
+    filenames = DURATION_FILES
+    paths = [export_path(data_dir, filename) for filename in filenames]
+
+    if cache_dir and clear:
+        clear_cache(cache_dir)
 
     # Process the files and get conversion and retention agents
-    conversion_agents, retention_agents, file_durations, unmatched_agents = process_files(df_files, df_agents)
+    replayed = replay_quarantine(replay_path) if replay_path else []
+    if incremental:
+        per_file_totals, lengths = load_incremental_durations(paths, filenames, state_path, chunksize, cache_dir, replayed, dedup_path, dedup_bloom)
+    else:
+        per_file_totals, lengths = load_all_durations(paths, filenames, chunksize, workers, cache_dir)
+        per_file_totals = add_duration_totals(per_file_totals, replayed)
+    conversion_agents, retention_agents, file_durations, unmatched_agents = summarize_durations(per_file_totals, roster)
 
     # Print the results
     print_unmatched_agents(unmatched_agents)
+    print_rejected()
+    write_quarantine(quarantine_path)
 
     # Export the results to Excel
-    export_to_excel(conversion_agents, retention_agents, filename='Agent_Duration_Results.xlsx')
+    export_to_excel(conversion_agents, retention_agents, filename=output, lengths=lengths)
+
+
+if __name__ == "__main__":
+    # Set STREAMING to read each export in chunks of CHUNK_SIZE rows instead of loading them all at once
+    STREAMING = False
+    CHUNK_SIZE = 100000
+    # Number of processes to read the files with; 1 processes them one after another
+    WORKERS = 1
+    # Set CACHE_DIR to reuse parsed call logs whose content hasn't changed; CLEAR_CACHE empties it first
+    CACHE_DIR = None
+    CLEAR_CACHE = False
+    # Set INCREMENTAL to add only the calls since the last run to the month-to-date totals kept in STATE_PATH
+    INCREMENTAL = False
+    STATE_PATH = 'duration_state.pkl'
+    # Set DEDUP_PATH to recognize calls that were already counted by their ID instead of by time (keep one per state file);
+    # DEDUP_BLOOM puts a Bloom filter in front of it for very long histories
+    DEDUP_PATH = None
+    DEDUP_BLOOM = False
+    # Rows whose duration can't be read count as 0 and are written to QUARANTINE_PATH (replaced every run).
+    # Fix them in a copy of it and set REPLAY_PATH to the copy to add their talk time (to the saved totals when INCREMENTAL).
+    QUARANTINE_PATH = 'rejected_rows.csv'
+    REPLAY_PATH = None
+    DATA_DIR = r'C:\Users\marcus.forsen\Desktop\new project'
+    # Set REPORT_PATH to write a JSON report of every stage's time, rows and memory; PROFILE_PATH also saves a cProfile of the run
+    REPORT_PATH = None
+    PROFILE_PATH = None
+
+    if REPORT_PATH or PROFILE_PATH:
+        start_run(PROFILE_PATH)
+
+    run_durations(DATA_DIR, 'Agent_Duration_Results.xlsx', CHUNK_SIZE if STREAMING else None, WORKERS, CACHE_DIR, CLEAR_CACHE,
+                  INCREMENTAL, STATE_PATH, DEDUP_PATH, DEDUP_BLOOM, QUARANTINE_PATH, REPLAY_PATH)
+
+    finish_run(REPORT_PATH)
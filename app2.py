@@ -1,92 +1,281 @@
 #Marcus🗿 was here
+import os
 import pandas as pd
+from app import load_call_records, normalize_calls
+from cache import clear_cache, file_digest
 from collections import defaultdict
-import re
-
-def extract_name(agent_str):
-    """Extract the name from the agent string in 'voicespin.csv'."""
-    if pd.isna(agent_str) or not isinstance(agent_str, str):
-        return ''
-    
-    # Remove leading/trailing whitespace
-    agent_str = agent_str.strip()
-    
-    # Split the string by '-' and take the first part
-    parts = agent_str.split('-')
-    if len(parts) > 1:
-        name = parts[0].strip()
-    else:
-        name = agent_str
-    
-    # Remove any trailing numbers and whitespace
-    name = re.sub(r'\s*\d+\s*$', '', name)
-    
-    return name.lower()
+from concurrent.futures import ProcessPoolExecutor
+from dedup import SeenCalls
+from distinct import DistinctCounter
+from exports import CALL_FILES, export_path
+from instrument import finish_run, instrumented, start_run
+from incremental import add_key_sets, add_values, file_state, load_state, save_state, take_new_records
+from roster import AgentRoster
+from sources import agent_column, is_call_log, normalize_names, read_source, source_spec
+from sources import extract_name  # noqa: F401  (defined here before the sources moved to sources.py; kept for scripts importing it)
 
 def is_valid_agent(agent_str):
     """Check if the agent string is a valid name (not a timestamp or other non-name value)."""
     return isinstance(agent_str, str) and agent_str.strip() != ''
 
-def process_file(df, filename, call_attempts, file_call_attempts, conversion_agents, retention_agents, df_agents):
-    """Process each file and update call attempts and agent dictionaries."""
+@instrumented('count calls')
+def count_file_calls(df, filename):
+    """
+    Count the calls in a file (or one chunk of it).
+    Returns (attempts, unique_keys, reported_unique): attempts per agent, the set of distinct numbers/call IDs per agent
+    and, for coperato summaries, the unique counts the export reports itself. Returns None if the file can't be counted.
+    """
     df.columns = df.columns.str.strip()  # Clean column names
+    spec = source_spec(filename)
+    if spec is None:
+        return None
 
-    if filename not in file_call_attempts:
-        file_call_attempts[filename] = defaultdict(int)
+    column = agent_column(df, spec)
+    if column is None:
+        print(f"Error: No suitable column found for agent names in {filename}.")
+        return None
+    df['Agent_list'] = normalize_names(df[column], spec['extract'])
 
-    if filename in ['voiso summitlife.csv', 'voiso traling.csv', 'voiso 24x.csv']:
-        df['Agent_list'] = df['Agent(s)'].apply(lambda x: [name.strip().lower() for name in str(x).split('; ')] if pd.notna(x) else [])
-        df = df.explode('Agent_list')
+    if spec['kind'] == 'summary':
         df = df[df['Agent_list'].apply(is_valid_agent)]
 
-        for agent in df['Agent_list']:
-            file_call_attempts[filename][agent] += 1
-        
-        unique_counts = df.groupby('Agent_list')['DNIS/To'].nunique()
-        for agent, unique_count in unique_counts.items():
-            file_call_attempts[filename][f"{agent}_unique"] = unique_count
+        # Agent summaries are already aggregated: add up the attempts and keep the last reported unique count
+        attempts = (df[spec['attempts']] if spec['attempts'] in df.columns else pd.Series(0, index=df.index)).groupby(df['Agent_list'], sort=False).sum()
+        last_rows = df.drop_duplicates('Agent_list', keep='last')
+        reported_unique = pd.Series(last_rows[spec['unique']].to_numpy() if spec['unique'] in df.columns else 0, index=last_rows['Agent_list'].to_numpy())
+        return attempts, None, reported_unique
 
-    elif filename in ['coperato traling.csv', 'coperato signix.csv', 'coperato 24x.csv']:
-        df['Agent_list'] = df['Name'].apply(lambda x: x.strip().lower() if pd.notna(x) else '')
-        df = df[df['Agent_list'].apply(is_valid_agent)]
+    if spec['multi_agent']:
+        df = df.explode('Agent_list')
+    df = df[df['Agent_list'].apply(is_valid_agent)]
+
+    attempts = df.groupby('Agent_list', sort=False).size()
+    unique_keys = distinct_keys(df, spec[spec['unique_key']])
+    return attempts, unique_keys, None
+
+def distinct_keys(df, key_column):
+    """Return the set of distinct non-empty values of key_column for each agent."""
+    keys = df[['Agent_list', key_column]].dropna().drop_duplicates()
+    return {agent: set(values) for agent, values in keys.groupby('Agent_list', sort=False)[key_column]}
+
+def merge_call_partials(partials, other):
+    """Merge the counts of two chunks of the same file."""
+    attempts, unique_keys, reported_unique = partials
+    other_attempts, other_keys, other_reported = other
+
+    attempts = pd.concat([attempts, other_attempts]).groupby(level=0, sort=False).sum()
+    if unique_keys is not None:
+        for agent, keys in other_keys.items():
+            unique_keys.setdefault(agent, set()).update(keys)
+    if reported_unique is not None:
+        # Later rows win, as they did when the whole file was read at once
+        reported_unique = pd.concat([reported_unique, other_reported])
+        reported_unique = reported_unique[~reported_unique.index.duplicated(keep='last')]
+
+    return attempts, unique_keys, reported_unique
+
+def finalize_call_counts(partials):
+    """Turn merged counts into the per-file dict of agent attempts and '<agent>_unique' counts."""
+    attempts, unique_keys, reported_unique = partials
+    counts = dict(attempts.items())
+    if unique_keys is not None:
+        for agent, keys in unique_keys.items():
+            counts[f"{agent}_unique"] = len(keys)
+    if reported_unique is not None:
+        for agent, unique_value in reported_unique.items():
+            counts[f"{agent}_unique"] = unique_value
+    return counts
+
+@instrumented('stream calls')
+def stream_file_calls(path, filename, chunksize=100000):
+    """
+    Count a file in chunks of `chunksize` rows, returning the same per-file dict as a full read, or None.
+    Call logs are counted from their call records, and only the identities of the calls read so far are kept,
+    so a call repeated in a later chunk is still counted once.
+    """
+    print(f"Streaming file: {filename} ({chunksize} rows per chunk)")
+    partials = None
+    seen = SeenCalls() if is_call_log(filename) else None
+
+    # The distinct-count keys are read as text so chunks can't disagree on their type
+    for chunk in read_source(path, filename, chunksize):
+        if seen is not None:
+            chunk_partials = count_call_records(seen.drop_seen(normalize_calls(chunk, filename), filename), filename)
+        else:
+            chunk_partials = count_file_calls(chunk, filename)
+        if chunk_partials is None:
+            return None
+        partials = chunk_partials if partials is None else merge_call_partials(partials, chunk_partials)
+
+    return finalize_call_counts(partials) if partials is not None else {}
+
+@instrumented('count call records')
+def count_call_records(records, filename):
+    """Count normalized call records (see app.normalize_calls) into the same partials count_file_calls gives for the raw file."""
+    records = records[records['agent'] != '']
+    key_column = source_spec(filename)['unique_key']
+
+    attempts = records.groupby('agent', sort=False, observed=True).size()
+    attempts.index = attempts.index.astype(object)
+    keys = records[['agent', key_column]].dropna().drop_duplicates()
+    unique_keys = {agent: set(values) for agent, values in keys.groupby('agent', sort=False, observed=True)[key_column]}
+    return attempts, unique_keys, None
+
+def load_file_counts(path, filename, chunksize=None, cache_dir=None, unique_mode=None):
+    """
+    Read and count one file, streaming it in chunks if `chunksize` is set; returns (counts, destinations), counts being
+    its per-file dict or None. With a `unique_mode` a call log's destination numbers (see record_destinations) are
+    collected from the same read, otherwise destinations is None.
+    With a `cache_dir` voiso and voicespin call records are reused from earlier runs when the file's content is unchanged.
+    Either way each call is counted once, as pipeline.load_source counts it.
+    """
+    if is_call_log(filename) and (cache_dir or unique_mode or not chunksize):
+        records = load_call_records(path, filename, chunksize, cache_dir)
+        destinations = record_destinations(records, unique_mode) if unique_mode else None
+        return finalize_call_counts(count_call_records(records, filename)), destinations
+    if chunksize:
+        return stream_file_calls(path, filename, chunksize), None
+    partials = count_file_calls(read_source(path, filename), filename)
+    return (finalize_call_counts(partials) if partials is not None else None), None
+
+@instrumented('load counts')
+def load_all_counts(paths, filenames, chunksize=None, workers=1, cache_dir=None, unique_mode=None):
+    """
+    Count every file, using a pool of `workers` processes when more than one; returns the per-file dicts in file order
+    and, with a `unique_mode`, every call log's destination numbers merged into one DistinctCounter (otherwise None),
+    so a number dialed from several dialers counts once.
+    """
+    if workers > 1:
+        # Files are independent, so each worker counts one and sends back only its per-agent counts and numbers
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(load_file_counts, paths, filenames, [chunksize] * len(paths), [cache_dir] * len(paths), [unique_mode] * len(paths)))
+    else:
+        results = [load_file_counts(path, filename, chunksize, cache_dir, unique_mode) for path, filename in zip(paths, filenames)]
+
+    destinations = None
+    if unique_mode:
+        destinations = DistinctCounter(unique_mode)
+        for _, file_destinations in results:
+            if file_destinations is not None:
+                destinations.merge(file_destinations)
+    return [counts for counts, _ in results], destinations
 
-        for _, row in df.iterrows():
-            agent = row['Agent_list']
-            attempts = row.get('Call Attempts', 0)
-            unique_value = row.get('Unique', 0)
-            file_call_attempts[filename][agent] += attempts
-            file_call_attempts[filename][f"{agent}_unique"] = unique_value
-
-    elif filename == 'voicespin.csv':
-        if 'AGENT' in df.columns:
-            df['Agent_list'] = df['AGENT'].apply(extract_name)
-        elif 'Agent' in df.columns:
-            df['Agent_list'] = df['Agent'].apply(extract_name)
+def load_incremental_counts(paths, filenames, state_path, chunksize=None, cache_dir=None, unique_mode=None, dedup_path=None, dedup_bloom=False):
+    """
+    Add only the calls newer than each file's watermark to the attempts and distinct numbers saved in state_path,
+    save the state and return the month-to-date per-file dicts in file order.
+    With a `unique_mode` each call log's destination numbers are also kept, for stored_destinations.
+    With a `dedup_path` calls are matched by identity against every call counted before instead of by time.
+    """
+    state = load_state(state_path)
+    seen = SeenCalls(dedup_path, dedup_bloom) if dedup_path else None
+
+    for path, filename in zip(paths, filenames):
+        entry = file_state(state, filename)
+
+        if not is_call_log(filename):
+            # Coperato agent summaries have no call times, so each distinct export is added once
+            digest = file_digest(path)
+            if digest in entry.setdefault('digests', set()):
+                continue
+            partials = count_file_calls(read_source(path, filename), filename)
+            if partials is None:
+                continue
+            attempts, _, reported_unique = partials
+            entry['digests'].add(digest)
+            add_values(entry.setdefault('attempts', {}), attempts.items())
+            add_values(entry.setdefault('unique', {}), reported_unique.items())
+        else:
+            if seen is not None:
+                records = seen.drop_seen(load_call_records(path, filename, chunksize, cache_dir), filename)
+            else:
+                records = take_new_records(entry, load_call_records(path, filename, chunksize, cache_dir, entry['watermark']), filename)
+            attempts, unique_keys, _ = count_call_records(records, filename)
+            add_values(entry.setdefault('attempts', {}), attempts.items())
+            add_key_sets(entry.setdefault('unique_keys', {}), unique_keys)
+            if unique_mode:
+                entry.setdefault('destinations', DistinctCounter(unique_mode)).merge(record_destinations(records, unique_mode))
+            print(f"{len(records)} new call records in {filename}")
+
+    save_state(state, state_path)
+    if seen is not None:
+        seen.save()
+
+    all_counts = []
+    for filename in filenames:
+        entry = state['files'].get(filename, {})
+        if 'attempts' not in entry:
+            all_counts.append(None)
+            continue
+        counts = dict(entry['attempts'])
+        for agent, keys in entry.get('unique_keys', {}).items():
+            counts[f"{agent}_unique"] = len(keys)
+        for agent, unique_value in entry.get('unique', {}).items():
+            counts[f"{agent}_unique"] = unique_value
+        all_counts.append(counts)
+    return all_counts
+
+def record_destinations(records, mode='exact'):
+    """Collect the destination numbers each agent dialed in normalized call records into a DistinctCounter."""
+    records = records[records['agent'] != '']
+    destinations = DistinctCounter(mode)
+    destinations.add(records['agent'], records['number'])
+    return destinations
+
+def stored_destinations(state_path, filenames, mode='exact'):
+    """
+    Merge the month-to-date destination numbers load_incremental_counts saved for the given files.
+    Calls added to the state before a unique mode was set are not in it.
+    """
+    state = load_state(state_path)
+    destinations = DistinctCounter(mode)
+    for filename in filenames:
+        file_destinations = state['files'].get(filename, {}).get('destinations')
+        if file_destinations is not None:
+            destinations.merge(file_destinations)
+    return destinations
+
+def cross_source_unique(destinations, file_call_attempts):
+    """
+    Give each agent's unique calls as their distinct destination numbers over all call logs.
+    Coperato agent summaries only report a count, which is added on top as before.
+    """
+    unique_totals = defaultdict(int, destinations.counts())
+    for fname, counts in file_call_attempts.items():
+        if not is_call_log(fname):
+            for agent, value in counts.items():
+                if agent.endswith('_unique'):
+                    unique_totals[agent[:-len('_unique')]] += value
+    return unique_totals
+
+@instrumented('record counts')
+def record_file_counts(filename, counts, call_attempts, file_call_attempts, conversion_agents, retention_agents, roster, unmatched_by_file=None):
+    """
+    Store a file's counts and update the call attempts and agent dictionaries.
+    Unmatched agents are collected per file in `unmatched_by_file`; pass a fresh dict per run when one process
+    makes several reports, as the module-level unmatched_agents_by_file app2.py uses otherwise keeps growing.
+    """
+    if unmatched_by_file is None:
+        unmatched_by_file = unmatched_agents_by_file
+    if filename not in file_call_attempts:
+        file_call_attempts[filename] = defaultdict(int)
+
+    for agent, value in counts.items():
+        if not agent.endswith('_unique'):
+            file_call_attempts[filename][agent] += value
         else:
-            print(f"Error: No suitable column found for agent names in {filename}.")
-            return
-        
-        df['Agent_list'] = df['Agent_list'].apply(lambda x: x.lower())
-        agent_counts = df['Agent_list'].value_counts()
-        for agent, count in agent_counts.items():
-            file_call_attempts[filename][agent] = count
-        
-        df['Unique_CALL_ID'] = df.groupby('Agent_list')['CALL ID'].transform(lambda x: x.nunique())
-        unique_counts = df.groupby('Agent_list')['Unique_CALL_ID'].max()
-        for agent, unique_count in unique_counts.items():
-            file_call_attempts[filename][f"{agent}_unique"] = unique_count
-
-    df_merged = df.merge(df_agents, left_on='Agent_list', right_on='AGENTNAME', how='left')
-    unmatched_agents = df_merged[df_merged['AGENTNAME'].isna()]['Agent_list']
-    unmatched_agents = unmatched_agents[unmatched_agents.apply(is_valid_agent)].unique()
+            file_call_attempts[filename][agent] = value
+
+    agents = [agent for agent in counts if not agent.endswith('_unique')]
+    unmatched_agents = [agent for agent in agents if agent not in roster and is_valid_agent(agent)]
     
-    if filename not in unmatched_agents_by_file:
-        unmatched_agents_by_file[filename] = set()
-    unmatched_agents_by_file[filename].update(unmatched_agents)
+    if filename not in unmatched_by_file:
+        unmatched_by_file[filename] = set()
+    unmatched_by_file[filename].update(unmatched_agents)
 
     # Print unmatched agents for the current file
-    if unmatched_agents_by_file[filename]:
-        print(f"Unmatched agents in {filename}: {', '.join(unmatched_agents_by_file[filename])}")
+    if unmatched_by_file[filename]:
+        print(f"Unmatched agents in {filename}: {', '.join(unmatched_by_file[filename])}")
     else:
         print(f"No unmatched agents in {filename}.")
 
@@ -96,20 +285,33 @@ def process_file(df, filename, call_attempts, file_call_attempts, conversion_age
         else:
             call_attempts[agent] = file_call_attempts[filename].get(agent, 0)
 
-    for _, row in df_merged.iterrows():
-        agent = row['Agent_list']
-        if row.get('DEPARTMENT') == 1:
+    for agent in agents:
+        department = roster.department(agent)
+        if department == 1:
             conversion_agents[agent] += file_call_attempts[filename].get(agent, 0)
             conversion_agents[f"{agent}_unique"] += file_call_attempts[filename].get(f"{agent}_unique", 0)
-        elif row.get('DEPARTMENT') == 2:
+        elif department == 2:
             retention_agents[agent] += file_call_attempts[filename].get(agent, 0)
             retention_agents[f"{agent}_unique"] += file_call_attempts[filename].get(f"{agent}_unique", 0)
 
     return file_call_attempts
 
+@instrumented('process file')
+def process_file(df, filename, call_attempts, file_call_attempts, conversion_agents, retention_agents, roster):
+    """Process each file and update call attempts and agent dictionaries."""
+    partials = count_file_calls(df, filename)
+    if partials is None:
+        return file_call_attempts
+
+    return record_file_counts(filename, finalize_call_counts(partials), call_attempts, file_call_attempts, conversion_agents, retention_agents, roster)
 
-def export_call_attempts_to_excel(conversion_agents, retention_agents, file_call_attempts, df_agents, filename='Agent_Call_Results.xlsx'):
-    """Export the call attempt results to an Excel file with accurate 'Sources' and 'Unique' columns in separate sheets."""
+
+@instrumented('export call attempts')
+def export_call_attempts_to_excel(conversion_agents, retention_agents, file_call_attempts, roster, filename='Agent_Call_Results.xlsx', unique_totals=None):
+    """
+    Export the call attempt results to an Excel file with accurate 'Sources' and 'Unique' columns in separate sheets.
+    With `unique_totals` (see cross_source_unique) the 'Unique' column uses them instead of adding up the per-file counts.
+    """
     
     # Define targets for conversion and retention
     target_conversion_unique = 300
@@ -119,10 +321,13 @@ def export_call_attempts_to_excel(conversion_agents, retention_agents, file_call
     conversion_data = []
     for agent, attempts in conversion_agents.items():
         if not agent.endswith('_unique'):
-            desk = df_agents[df_agents['AGENTNAME'] == agent]['DESK'].values[0] if agent in df_agents['AGENTNAME'].values else 'Unknown'
+            desk = roster.desk(agent)
             
             total_attempts = sum(file_call_attempts[fname].get(agent, 0) for fname in file_call_attempts)
-            total_unique = sum(file_call_attempts[fname].get(f"{agent}_unique", 0) for fname in file_call_attempts)
+            if unique_totals is not None:
+                total_unique = unique_totals.get(agent, 0)
+            else:
+                total_unique = sum(file_call_attempts[fname].get(f"{agent}_unique", 0) for fname in file_call_attempts)
             target_percentage = (total_unique / target_conversion_unique) * 100
             
             unique_sources = []
@@ -147,10 +352,13 @@ def export_call_attempts_to_excel(conversion_agents, retention_agents, file_call
     retention_data = []
     for agent, attempts in retention_agents.items():
         if not agent.endswith('_unique'):
-            desk = df_agents[df_agents['AGENTNAME'] == agent]['DESK'].values[0] if agent in df_agents['AGENTNAME'].values else 'Unknown'
+            desk = roster.desk(agent)
             
             total_attempts = sum(file_call_attempts[fname].get(agent, 0) for fname in file_call_attempts)
-            total_unique = sum(file_call_attempts[fname].get(f"{agent}_unique", 0) for fname in file_call_attempts)
+            if unique_totals is not None:
+                total_unique = unique_totals.get(agent, 0)
+            else:
+                total_unique = sum(file_call_attempts[fname].get(f"{agent}_unique", 0) for fname in file_call_attempts)
             target_percentage = (total_unique / target_retention_unique) * 100
             
             unique_sources = []
@@ -180,38 +388,78 @@ def export_call_attempts_to_excel(conversion_agents, retention_agents, file_call
         conversion_df.to_excel(writer, sheet_name='Conversion Agents', index=False)
         retention_df.to_excel(writer, sheet_name='Retention Agents', index=False)
 
-    print("Results have been exported to Agent_Call_Results.xlsx")
-
-# Load agent data
-df_agents = pd.read_excel(r'C:\Users\marcus.forsen\Desktop\new project\agents.xlsx')
-df_agents['AGENTNAME'] = df_agents['AGENTNAME'].str.strip().str.lower()
-df_agents['DESK'] = df_agents['DESK'].str.strip()
-
-# Load the call logs from CSV files with filenames
-df_files = [
-    (pd.read_csv(r'C:\Users\marcus.forsen\Desktop\new project\voiso summitlife.csv'), 'voiso summitlife.csv'),
-    (pd.read_csv(r'C:\Users\marcus.forsen\Desktop\new project\voiso traling.csv'), 'voiso traling.csv'),
-    (pd.read_csv(r'C:\Users\marcus.forsen\Desktop\new project\voiso 24x.csv'), 'voiso 24x.csv'),
-    (pd.read_csv(r'C:\Users\marcus.forsen\Desktop\new project\coperato traling.csv'), 'coperato traling.csv'),
-    (pd.read_csv(r'C:\Users\marcus.forsen\Desktop\new project\coperato signix.csv'), 'coperato signix.csv'),
-    (pd.read_csv(r'C:\Users\marcus.forsen\Desktop\new project\coperato 24x.csv'), 'coperato 24x.csv'),
-    (pd.read_csv(r'C:\Users\marcus.forsen\Desktop\new project\voicespin.csv'), 'voicespin.csv')
-]
-
-# Initialize dictionaries to store call attempts by agent and department
-call_attempts = defaultdict(int)
-conversion_agents = defaultdict(int)
-retention_agents = defaultdict(int)
+    print(f"Results have been exported to {filename}")
 
 # Initialize dictionary to store unmatched agents by file
 unmatched_agents_by_file = {}
 
-# Initialize dictionary to store call attempts by file
-file_call_attempts = defaultdict(lambda: defaultdict(int))
+def run_attempts(data_dir, output='Agent_Call_Results.xlsx', chunksize=None, workers=1, cache_dir=None, clear=False,
+                 incremental=False, state_path='call_state.pkl', dedup_path=None, dedup_bloom=False, unique_mode=None):
+    """Count every agent's call attempts and unique calls over the exports in data_dir and write the call report (what app2.py runs)."""
+    # Load agent data, normalizing the names once
+    roster = AgentRoster.from_excel(os.path.join(data_dir, 'agents.xlsx'))
+
+    # The exports to process; each can also be gzipped, zipped or split into a folder of parts (see exports.export_path)
+    filenames = CALL_FILES
+    paths = [export_path(data_dir, filename) for filename in filenames]
+
+    # Initialize dictionaries to store call attempts by agent and department
+    call_attempts = defaultdict(int)
+    conversion_agents = defaultdict(int)
+    retention_agents = defaultdict(int)
+
+    # Initialize dictionary to store call attempts by file
+    file_call_attempts = defaultdict(lambda: defaultdict(int))
+
+    if cache_dir and clear:
+        clear_cache(cache_dir)
+
+    # Count each file, then record the counts in file order
+    if incremental:
+        all_counts = load_incremental_counts(paths, filenames, state_path, chunksize, cache_dir, unique_mode, dedup_path, dedup_bloom)
+        destinations = stored_destinations(state_path, filenames, unique_mode) if unique_mode else None
+    else:
+        # With a unique mode the call logs' destination numbers are collected as they are counted
+        all_counts, destinations = load_all_counts(paths, filenames, chunksize, workers, cache_dir, unique_mode)
+    for counts, filename in zip(all_counts, filenames):
+        if counts is not None:
+            file_call_attempts = record_file_counts(filename, counts, call_attempts, file_call_attempts, conversion_agents, retention_agents, roster)
+
+    # Count unique destinations across the call logs
+    unique_totals = cross_source_unique(destinations, file_call_attempts) if destinations is not None else None
+
+    # Export results to Excel
+    export_call_attempts_to_excel(conversion_agents, retention_agents, file_call_attempts, roster, filename=output, unique_totals=unique_totals)
+
+
+if __name__ == "__main__":
+    # Set STREAMING to read each export in chunks of CHUNK_SIZE rows instead of loading it whole
+    STREAMING = False
+    CHUNK_SIZE = 100000
+    # Number of processes to read the files with; 1 processes them one after another
+    WORKERS = 1
+    # Set CACHE_DIR to reuse parsed call logs whose content hasn't changed; CLEAR_CACHE empties it first
+    CACHE_DIR = None
+    CLEAR_CACHE = False
+    # Set INCREMENTAL to add only the calls since the last run to the month-to-date counts kept in STATE_PATH
+    INCREMENTAL = False
+    STATE_PATH = 'call_state.pkl'
+    # Set DEDUP_PATH to recognize calls that were already counted by their ID instead of by time (keep one per state file);
+    # DEDUP_BLOOM puts a Bloom filter in front of it for very long histories
+    DEDUP_PATH = None
+    DEDUP_BLOOM = False
+    # Set UNIQUE_MODE to count each agent's destination numbers once across all call logs instead of once per file:
+    # 'exact' keeps every number, 'hll' estimates the count (within about 1%) in a fixed amount of memory
+    UNIQUE_MODE = None
+    DATA_DIR = r'C:\Users\marcus.forsen\Desktop\new project'
+    # Set REPORT_PATH to write a JSON report of every stage's time, rows and memory; PROFILE_PATH also saves a cProfile of the run
+    REPORT_PATH = None
+    PROFILE_PATH = None
+
+    if REPORT_PATH or PROFILE_PATH:
+        start_run(PROFILE_PATH)
 
-# Process each file and keep track of call attempts per file
-for df, filename in df_files:
-    file_call_attempts = process_file(df, filename, call_attempts, file_call_attempts, conversion_agents, retention_agents, df_agents)
+    run_attempts(DATA_DIR, 'Agent_Call_Results.xlsx', CHUNK_SIZE if STREAMING else None, WORKERS, CACHE_DIR, CLEAR_CACHE,
+                 INCREMENTAL, STATE_PATH, DEDUP_PATH, DEDUP_BLOOM, UNIQUE_MODE)
 
-# Export results to Excel
-export_call_attempts_to_excel(conversion_agents, retention_agents, file_call_attempts, df_agents)
+    finish_run(REPORT_PATH)
@@ -0,0 +1,140 @@
+#Marcus🗿 was here
+import json
+import os
+from app import read_call_records
+from concurrent.futures import ProcessPoolExecutor
+from cube import add_to_cube, cube_counts, cube_durations, cube_untimed, empty_cube, records_to_cube
+from exports import export_path
+from pipeline import CALL_FILES, DURATION_FILES, load_source, run_pipeline
+from quarantine import collecting, merge_rejected, print_rejected, take_rejected, write_quarantine
+from roster import AgentRoster
+from sources import is_call_log, report_untimed
+
+# The exports of each brand; voicespin.csv covers every brand, so jobs for single brands list it under "files" if wanted
+BRAND_FILES = {
+    'summitlife': ['voiso summitlife.csv'],
+    'traling': ['voiso traling.csv', 'coperato traling2.csv', 'coperato traling.csv'],
+    '24x': ['voiso 24x.csv', 'coperato 24x2.csv', 'coperato 24x.csv'],
+    'signix': ['coperato signix2.csv', 'coperato signix.csv']
+}
+
+def load_manifest(path, data_dir=None):
+    """
+    Read a JSON manifest: a list of jobs, each {"output": ..., and optionally "brands": [...], "files": [...],
+    "start": "2024-10-01", "end": "2024-11-01", "data_dir": ...}. Without brands or files a job covers every export.
+    Returns the jobs with their data_dir and the export files they use filled in.
+    """
+    with open(path) as f:
+        jobs = json.load(f)
+    for job in jobs:
+        job.setdefault('data_dir', data_dir)
+        unknown = [brand for brand in job.get('brands', []) if brand not in BRAND_FILES]
+        if unknown:
+            raise ValueError(f"Unknown brand {', '.join(unknown)} in {path}. Known brands: {', '.join(BRAND_FILES)}")
+        files = [filename for brand in job.get('brands', []) for filename in BRAND_FILES[brand]] + job.get('files', [])
+        job['files'] = set(files) if files else set(DURATION_FILES + CALL_FILES)
+    return jobs
+
+def parse_input(path, filename):
+    """Read one export once: a call log is rolled up into hourly cube buckets, an agent summary into its counts."""
+    if is_call_log(filename):
+        return records_to_cube(read_call_records(path, filename), filename)
+    return load_source(path, filename, [], [filename])[1]
+
+def job_sources(job, cube, summaries):
+    """Take one job's durations and call counts from the shared parsed data; returns (per_file_totals, call_counts)."""
+    duration_files = [filename for filename in DURATION_FILES if filename in job['files']]
+    call_files = [filename for filename in CALL_FILES if filename in job['files']]
+    start, end = job.get('start'), job.get('end')
+    if start is not None or end is not None:
+        report_untimed(cube_untimed(cube, duration_files + call_files))
+
+    per_file_totals = cube_durations(cube, duration_files, start, end)
+    counts = dict(zip(call_files, cube_counts(cube, call_files, start, end)))
+    for filename in call_files:
+        if not is_call_log(filename):
+            # Agent summaries have no call times, so a job for a period still counts all of them
+            counts[filename] = summaries.get(filename)
+    call_counts = [(counts[filename], filename) for filename in call_files if counts[filename] is not None]
+    return per_file_totals, call_counts
+
+def run_job(roster, per_file_totals, call_counts, output):
+    """Score one job and write its workbook."""
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    run_pipeline(roster, per_file_totals, call_counts, output, write_details=False)
+
+def quarantine_file(quarantine_path, data_dir, data_dirs):
+    """Return where the rejected rows of a data folder go: quarantine_path itself, or one file per folder if there are several."""
+    if len(data_dirs) == 1:
+        return quarantine_path
+    stem, extension = os.path.splitext(quarantine_path)
+    return f"{stem} {os.path.basename(os.path.normpath(data_dir))}{extension}"
+
+def write_rejected(rejected_by_input, quarantine_path):
+    """Print and quarantine the rows each input rejected, one quarantine per data folder, so each can be fixed and replayed there."""
+    data_dirs = sorted({data_dir for data_dir, _ in rejected_by_input})
+    for data_dir in data_dirs:
+        take_rejected()
+        for (input_dir, _), rejected in rejected_by_input.items():
+            if input_dir == data_dir:
+                merge_rejected(rejected)
+        print(f"Data folder: {data_dir}")
+        print_rejected()
+        write_quarantine(quarantine_file(quarantine_path, data_dir, data_dirs))
+    take_rejected()
+
+def run_batch(jobs, workers=1, quarantine_path='rejected_rows.csv'):
+    """
+    Run every job of a manifest: each export that any job needs is parsed once (in parallel across `workers` processes),
+    then every job is scored from the shared data and written, again across the pool.
+    The rows the exports rejected are written to quarantine_path (one file per data folder if the jobs read several).
+    """
+    inputs = []
+    for data_dir, filename in sorted({(job['data_dir'], filename) for job in jobs for filename in job['files']}):
+        if os.path.exists(export_path(data_dir, filename)):
+            inputs.append((data_dir, filename))
+        else:
+            print(f"Note: {filename} is not in {data_dir}, so the jobs reading it go without it")
+    print(f"{len(jobs)} jobs share {len(inputs)} input files")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parsed = executor.map(collecting, [parse_input] * len(inputs), [export_path(data_dir, filename) for data_dir, filename in inputs], [filename for _, filename in inputs])
+
+        # One cube, summary set and roster per data folder, shared by every job that reads from it
+        cubes = {}
+        summaries = {}
+        rejected_by_input = {}
+        for (data_dir, filename), (result, rejected) in zip(inputs, parsed):
+            rejected_by_input[(data_dir, filename)] = rejected
+            if is_call_log(filename):
+                cubes[data_dir] = add_to_cube(cubes.get(data_dir, empty_cube()), result)
+            elif result is not None:
+                summaries.setdefault(data_dir, {})[filename] = result
+        rosters = {data_dir: AgentRoster.from_excel(os.path.join(data_dir, 'agents.xlsx')) for data_dir in {job['data_dir'] for job in jobs}}
+
+        sources = [job_sources(job, cubes.get(job['data_dir'], empty_cube()), summaries.get(job['data_dir'], {})) for job in jobs]
+        # list() waits for every job, so a failed one raises here
+        list(executor.map(
+            run_job,
+            [rosters[job['data_dir']] for job in jobs],
+            [per_file_totals for per_file_totals, _ in sources],
+            [call_counts for _, call_counts in sources],
+            [job['output'] for job in jobs]
+        ))
+
+    write_rejected(rejected_by_input, quarantine_path)
+
+
+if __name__ == "__main__":
+    # The jobs to run, e.g. [{"output": "reports/traling October.xlsx", "brands": ["traling"], "files": ["voicespin.csv"],
+    # "start": "2024-10-01", "end": "2024-11-01"}, {"output": "reports/all.xlsx"}]; jobs without "data_dir" read DATA_DIR
+    MANIFEST_PATH = 'reports.json'
+    DATA_DIR = r'C:\Users\marcus.forsen\Desktop\new project'
+    # Number of processes to parse the inputs and write the reports with
+    WORKERS = 4
+    # Rows whose duration can't be read count as 0 and are written to QUARANTINE_PATH (replaced every run);
+    # with jobs over several data folders each folder gets its own, named after it
+    QUARANTINE_PATH = 'rejected_rows.csv'
+
+    run_batch(load_manifest(MANIFEST_PATH, DATA_DIR), WORKERS, QUARANTINE_PATH)
@@ -0,0 +1,131 @@
+#Marcus🗿 was here
+import os
+import time
+import tracemalloc
+import pandas as pd
+from app import export_to_excel, normalize_calls, record_durations, summarize_durations
+from app2 import count_call_records, count_file_calls, export_call_attempts_to_excel, finalize_call_counts, record_file_counts
+from collections import defaultdict
+from pipeline import CALL_FILES, DURATION_FILES, call_data, duration_data
+from roster import AgentRoster
+from sources import is_call_log, read_source
+from synthetic import generate
+from theapp import build_results, write_results
+
+class StageTimer:
+    """
+    Time stages and record the peak memory allocated in each, as tracemalloc sees it (numpy arrays included).
+    tracemalloc slows code down several times, so with track_memory each stage is run a second time to measure it.
+    """
+
+    def __init__(self, track_memory=True):
+        self.track_memory = track_memory
+        self.results = []
+
+    def run(self, stage, func, *args):
+        """Run func(*args) as one measurement of `stage` and return its result."""
+        start = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - start
+
+        peak = float('nan')
+        if self.track_memory:
+            tracemalloc.start()
+            try:
+                func(*args)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        self.results.append({'stage': stage, 'seconds': seconds, 'peak_mb': peak / 1024 ** 2})
+        return result
+
+    def totals(self):
+        """Add up the measurements per stage, keeping the largest peak."""
+        results = pd.DataFrame(self.results)
+        return results.groupby('stage', sort=False).agg(seconds=('seconds', 'sum'), peak_mb=('peak_mb', 'max')).reset_index()
+
+def parse_files(data_dir, filenames):
+    """Read every export with the registry's column pruning and dtypes."""
+    return {filename: read_source(os.path.join(data_dir, filename), filename) for filename in filenames}
+
+def normalize_files(frames):
+    """Turn call logs into normalized records and count the agent summaries."""
+    normalized = {}
+    for filename, df in frames.items():
+        normalized[filename] = normalize_calls(df, filename) if is_call_log(filename) else count_file_calls(df, filename)
+    return normalized
+
+def aggregate_files(normalized, roster):
+    """Total durations and call counts per agent and split them by department, as pipeline.run_pipeline does."""
+    per_file_totals = [(record_durations(normalized[filename], filename)[0], filename) for filename in DURATION_FILES]
+    conversion_durations, retention_durations, _, _ = summarize_durations(per_file_totals, roster)
+
+    conversion_calls = defaultdict(int)
+    retention_calls = defaultdict(int)
+    file_call_attempts = defaultdict(lambda: defaultdict(int))
+    for filename in CALL_FILES:
+        partials = count_call_records(normalized[filename], filename) if is_call_log(filename) else normalized[filename]
+        file_call_attempts = record_file_counts(filename, finalize_call_counts(partials), defaultdict(int), file_call_attempts, conversion_calls, retention_calls, roster)
+    return conversion_durations, retention_durations, conversion_calls, retention_calls, file_call_attempts
+
+def score(roster, aggregated):
+    """Score and sort the agents as theapp.py does."""
+    conversion_durations, retention_durations, conversion_calls, retention_calls, file_call_attempts = aggregated
+    return build_results(
+        roster,
+        call_data(conversion_calls, file_call_attempts),
+        call_data(retention_calls, file_call_attempts),
+        duration_data(conversion_durations),
+        duration_data(retention_durations)
+    )
+
+def export(out_dir, roster, aggregated, scored):
+    """Write the three workbooks."""
+    conversion_durations, retention_durations, conversion_calls, retention_calls, file_call_attempts = aggregated
+    export_to_excel(conversion_durations, retention_durations, filename=os.path.join(out_dir, 'Agent_Duration_Results.xlsx'))
+    export_call_attempts_to_excel(conversion_calls, retention_calls, file_call_attempts, roster, filename=os.path.join(out_dir, 'Agent_Call_Results.xlsx'))
+    write_results(scored[0], scored[1], os.path.join(out_dir, 'Agent_Results.xlsx'))
+
+def benchmark(data_dir, out_dir, track_memory=True):
+    """Run the whole job on the exports in data_dir stage by stage and return seconds and peak memory per stage."""
+    timer = StageTimer(track_memory)
+    filenames = list(dict.fromkeys(DURATION_FILES + CALL_FILES))
+
+    roster = timer.run('parse', AgentRoster.from_excel, os.path.join(data_dir, 'agents.xlsx'))
+    frames = timer.run('parse', parse_files, data_dir, filenames)
+    normalized = timer.run('normalize', normalize_files, frames)
+    del frames
+    aggregated = timer.run('aggregate', aggregate_files, normalized, roster)
+    scored = timer.run('score', score, roster, aggregated)
+    timer.run('export', export, out_dir, roster, aggregated, scored)
+    return timer.totals()
+
+
+if __name__ == "__main__":
+    # Rows per call log for each run; every size gets its own seeded set of exports under BENCH_DIR
+    SIZES = [10000, 100000, 1000000]
+    AGENTS = 300
+    SEED = 0
+    BENCH_DIR = 'benchmark_data'
+    # Every run is appended here, so results of different versions can be compared
+    RESULTS_PATH = 'benchmark_results.csv'
+    # Also measure peak memory per stage (runs every stage twice)
+    TRACK_MEMORY = True
+
+    all_results = []
+    for rows in SIZES:
+        data_dir = os.path.join(BENCH_DIR, f"{rows}_rows")
+        if not os.path.exists(os.path.join(data_dir, 'agents.xlsx')):
+            print(f"Generating {rows} rows per call log in {data_dir}")
+            generate(data_dir, rows, AGENTS, SEED)
+
+        results = benchmark(data_dir, data_dir, TRACK_MEMORY)
+        results.insert(0, 'rows', rows)
+        all_results.append(results)
+
+    all_results = pd.concat(all_results, ignore_index=True)
+    all_results.insert(0, 'run', pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'))
+    all_results.to_csv(RESULTS_PATH, index=False, mode='a', header=not os.path.exists(RESULTS_PATH))
+
+    print("\nBenchmark results:")
+    print(all_results.to_string(index=False, float_format=lambda value: f"{value:.2f}"))
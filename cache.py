@@ -0,0 +1,95 @@
+#Marcus🗿 was here
+import hashlib
+import os
+import pandas as pd
+from exports import has_parquet_engine, input_files
+from quarantine import read_rejected, rejected_by, restore_rejected, save_rejected
+from sources import source_type
+
+# Bump this whenever the normalized record layout or parsing rules change, so old entries are not reused
+CACHE_VERSION = 6
+
+# Default upper bound for the total size of the cache folder (2 GB)
+MAX_CACHE_BYTES = 2 * 1024 ** 3
+
+def require_parquet(what='The cache'):
+    """Fail with a clear message before any work is done if no parquet library is installed."""
+    if not has_parquet_engine():
+        raise ImportError(f"{what} is stored as parquet, which needs pyarrow or fastparquet. Install one with: pip install pyarrow")
+
+def file_digest(path, block_size=1024 * 1024):
+    """
+    Return the SHA-256 hex digest of a file's content, read in blocks.
+    For a folder or glob pattern every file's name and content go into it, so adding, removing or changing a part changes it.
+    """
+    digest = hashlib.sha256()
+    files = input_files(path)
+    for file in files:
+        if files != [path]:
+            digest.update(os.path.basename(file).encode() + b'\0')
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def cache_path(cache_dir, digest, source_type):
+    """Return where the records of a file with this content and source type are cached."""
+    return os.path.join(cache_dir, f"{source_type}-v{CACHE_VERSION}-{digest}.parquet")
+
+def rejected_path(entry):
+    """Return where the rows rejected while building a cache entry are kept (only written if there were any)."""
+    return entry[:-len('.parquet')] + '.rejected.csv'
+
+def load_cached_records(path, filename, cache_dir, build, max_bytes=MAX_CACHE_BYTES):
+    """
+    Return the normalized call records of a file, from the cache when its content was seen before.
+    On a miss the records are built with build(path), stored as parquet and the cache is trimmed to max_bytes.
+    The rows rejected while building them are stored with them and rejected again on every hit (see quarantine.py).
+    """
+    require_parquet()
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = cache_path(cache_dir, file_digest(path), source_type(filename))
+
+    if os.path.exists(entry):
+        print(f"Loading {os.path.basename(path)} from cache")
+        os.utime(entry)  # Mark as recently used for eviction
+        if os.path.exists(rejected_path(entry)):
+            # Another export with the same content may have built the entry
+            restore_rejected(read_rejected(rejected_path(entry)), filename)
+        return pd.read_parquet(entry)
+
+    records, rejected = rejected_by(build, path)
+    # Write to a temporary name first so an interrupted run never leaves a half-written entry;
+    # the rejected rows go first, as an entry without them would look like a file with none
+    if rejected is not None:
+        save_rejected(rejected, rejected_path(entry) + '.tmp')
+        os.replace(rejected_path(entry) + '.tmp', rejected_path(entry))
+    elif os.path.exists(rejected_path(entry)):
+        os.remove(rejected_path(entry))
+    records.to_parquet(entry + '.tmp', index=False)
+    os.replace(entry + '.tmp', entry)
+    evict(cache_dir, max_bytes)
+    return records
+
+def evict(cache_dir, max_bytes=MAX_CACHE_BYTES):
+    """Delete the least recently used entries until the cache folder fits in max_bytes."""
+    entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith('.parquet')]
+    entries.sort(key=os.path.getmtime)
+    total = sum(os.path.getsize(entry) for entry in entries)
+
+    # The newest entry is always kept, even if it alone is larger than the limit
+    for entry in entries[:-1]:
+        if total <= max_bytes:
+            break
+        total -= os.path.getsize(entry)
+        os.remove(entry)
+        if os.path.exists(rejected_path(entry)):
+            os.remove(rejected_path(entry))
+
+def clear_cache(cache_dir):
+    """Invalidate the cache by deleting every entry."""
+    if not os.path.isdir(cache_dir):
+        return
+    for name in os.listdir(cache_dir):
+        if name.endswith(('.parquet', '.rejected.csv', '.tmp')):
+            os.remove(os.path.join(cache_dir, name))
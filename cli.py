@@ -0,0 +1,194 @@
+#Marcus🗿 was here
+import argparse
+import os
+import sys
+from datetime import datetime
+from exports import CALL_FILES, DURATION_FILES, export_path, has_parquet_engine
+
+# Only the standard library is imported up front, so --help and --check answer at once; pandas and the scripts
+# themselves are imported when a command actually runs.
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return number
+
+def hour(value):
+    """argparse type for an hour of the day."""
+    number = int(value)
+    if not 0 <= number <= 23:
+        raise argparse.ArgumentTypeError(f"must be an hour from 0 to 23, not {value}")
+    return number
+
+def build_parser():
+    """Return the parser for the durations, attempts, report and all commands."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--data-dir', default='.', help="folder with agents.xlsx and the exports (default: the current folder)")
+    common.add_argument('--report-path', help="write a JSON report of every stage's time, rows and memory here")
+    common.add_argument('--profile-path', help="also save a cProfile of the run here")
+    common.add_argument('--check', action='store_true', help="only check the configuration and the input files, then exit")
+
+    reading = argparse.ArgumentParser(add_help=False)
+    reading.add_argument('--workers', type=positive_int, default=1, help="processes to read the exports with (default: 1)")
+    reading.add_argument('--chunk-size', type=positive_int, help="stream each export in chunks of this many rows instead of loading it whole")
+    reading.add_argument('--cache-dir', help="reuse parsed call logs whose content hasn't changed from this folder")
+    reading.add_argument('--clear-cache', action='store_true', help="empty --cache-dir first")
+
+    incremental = argparse.ArgumentParser(add_help=False)
+    incremental.add_argument('--incremental', action='store_true', help="add only the new calls to the month-to-date totals kept in --state")
+    incremental.add_argument('--dedup', help="with --incremental, recognize counted calls by their ID in this index instead of by time")
+    incremental.add_argument('--dedup-bloom', action='store_true', help="put a Bloom filter in front of the --dedup index")
+
+    parser = argparse.ArgumentParser(prog='cli.py', description="Agent talk time, call attempts and scores from the dialer exports.")
+    commands = parser.add_subparsers(dest='command', required=True, metavar='{durations,attempts,report,all}')
+
+    durations = commands.add_parser('durations', parents=[common, reading, incremental], help="total each agent's talk time (app.py)")
+    durations.add_argument('--output', default='Agent_Duration_Results.xlsx')
+    durations.add_argument('--state', default='duration_state.pkl', help="month-to-date state for --incremental")
+    durations.add_argument('--quarantine', default='rejected_rows.csv', help="where rows with unreadable durations are written (replaced every run)")
+    durations.add_argument('--replay', help="a fixed copy of a quarantine file whose talk time is added; not the --quarantine file itself")
+
+    attempts = commands.add_parser('attempts', parents=[common, reading, incremental], help="count each agent's call attempts and unique calls (app2.py)")
+    attempts.add_argument('--output', default='Agent_Call_Results.xlsx')
+    attempts.add_argument('--state', default='call_state.pkl', help="month-to-date state for --incremental")
+    attempts.add_argument('--unique-mode', choices=['exact', 'hll'], help="count destination numbers once across all call logs")
+
+    report = commands.add_parser('report', parents=[common], help="score the agents from the durations and attempts workbooks (theapp.py)")
+    report.add_argument('--output', default='Agent_Results.xlsx')
+    report.add_argument('--call-results', default='Agent_Call_Results.xlsx')
+    report.add_argument('--duration-results', default='Agent_Duration_Results.xlsx')
+
+    everything = commands.add_parser('all', parents=[common, reading], help="read every export once and write the scored report (pipeline.py)")
+    everything.add_argument('--output', default='Agent_Results.xlsx')
+    everything.add_argument('--no-details', dest='write_details', action='store_false', help="skip Agent_Duration_Results.xlsx and Agent_Call_Results.xlsx")
+    everything.add_argument('--duration-output', help="where the duration details go (default: Agent_Duration_Results.xlsx next to --output)")
+    everything.add_argument('--call-output', help="where the call attempt details go (default: Agent_Call_Results.xlsx next to --output)")
+    everything.add_argument('--quarantine', default='rejected_rows.csv', help="where rows with unreadable durations are written (replaced every run)")
+    everything.add_argument('--cube-dir', help="report from the hourly cube kept in this folder")
+    everything.add_argument('--store', help="report from the SQLite store at this path")
+    everything.add_argument('--no-update', dest='update', action='store_false', help="report from the cube or store without reading the exports into it")
+    everything.add_argument('--start', help="first day (or time) to report, e.g. 2024-10-01; needs --cube-dir or --store")
+    everything.add_argument('--end', help="day (or time) the report stops before, e.g. 2024-11-01; needs --cube-dir or --store")
+    everything.add_argument('--shift', type=hour, nargs=2, metavar=('START', 'END'), help="daily shift hours, e.g. 22 6; needs --cube-dir")
+    everything.add_argument('--unique-mode', choices=['exact', 'hll'], help="count destination numbers once across all call logs; not with --cube-dir or --store")
+    everything.add_argument('--dedup', help="leave out the calls earlier runs with this index counted and add this run's to it; not with --cube-dir or --store")
+    everything.add_argument('--dedup-bloom', action='store_true', help="put a Bloom filter in front of the --dedup index")
+    return parser
+
+def check_config(args):
+    """Return what is wrong with the command line and the input files, without loading any data."""
+    problems = []
+    roster = os.path.join(args.data_dir, 'agents.xlsx')
+    if not os.path.isdir(args.data_dir):
+        return [f"{args.data_dir} is not a folder"]
+    if not os.path.exists(roster):
+        problems.append(f"{roster} is missing")
+
+    exports = []
+    if args.command == 'durations':
+        exports = DURATION_FILES
+    elif args.command == 'attempts':
+        exports = CALL_FILES
+    elif args.command == 'all':
+        if args.update or not (args.cube_dir or args.store):
+            exports = list(dict.fromkeys(DURATION_FILES + CALL_FILES))
+        else:
+            # The call logs come from the cube or store, so only the agent summaries (read for attempts alone) are needed
+            exports = [filename for filename in CALL_FILES if filename not in DURATION_FILES]
+    for filename in exports:
+        if not os.path.exists(export_path(args.data_dir, filename)):
+            problems.append(f"{filename} (or a .gz, .zip or folder of it) is missing from {args.data_dir}")
+
+    if args.command == 'report':
+        for path in [args.call_results, args.duration_results]:
+            if not os.path.exists(path):
+                problems.append(f"{path} is missing; run the durations and attempts commands first")
+    if args.command in ('durations', 'attempts') and args.dedup and not args.incremental:
+        problems.append("--dedup only applies with --incremental")
+    if (getattr(args, 'cache_dir', None) or getattr(args, 'cube_dir', None)) and not has_parquet_engine():
+        problems.append("--cache-dir and --cube-dir store parquet files, which needs pyarrow or fastparquet (pip install pyarrow)")
+    if args.command == 'durations' and args.replay:
+        if not os.path.exists(args.replay):
+            problems.append(f"{args.replay} is missing")
+        elif os.path.exists(args.quarantine) and os.path.samefile(args.replay, args.quarantine):
+            problems.append(f"--replay {args.replay} is replaced by this run's rejected rows; fix and replay a copy of it")
+    if args.command == 'all':
+        if args.cube_dir and args.store:
+            problems.append("use either --cube-dir or --store, not both")
+        if (args.start or args.end) and not (args.cube_dir or args.store):
+            problems.append("--start and --end need --cube-dir or --store")
+        if args.shift and not args.cube_dir:
+            problems.append("--shift needs --cube-dir")
+        if args.unique_mode and (args.cube_dir or args.store):
+            problems.append("--unique-mode needs the exports themselves, not --cube-dir or --store")
+        if args.dedup and (args.cube_dir or args.store):
+            problems.append("--cube-dir and --store already keep each call once, so they don't take --dedup")
+        elif args.dedup and args.workers > 1:
+            problems.append("--dedup checks and updates its index file by file, so it needs --workers 1")
+        times = {}
+        for name in ['start', 'end']:
+            value = getattr(args, name)
+            if value:
+                try:
+                    times[name] = datetime.fromisoformat(value)
+                except ValueError:
+                    problems.append(f"--{name} {value} is not a date like 2024-10-01")
+        if len(times) == 2 and times['start'] >= times['end']:
+            problems.append("--start must be before --end")
+
+    output_dir = os.path.dirname(os.path.abspath(args.output))
+    if not os.path.isdir(output_dir):
+        problems.append(f"the folder of {args.output} doesn't exist")
+    return problems
+
+def run_command(args):
+    """Import the script a command belongs to and run it."""
+    if args.command == 'durations':
+        from app import run_durations
+        run_durations(
+            args.data_dir, args.output, args.chunk_size, args.workers, args.cache_dir, args.clear_cache,
+            args.incremental, args.state, args.dedup, args.dedup_bloom, args.quarantine, args.replay
+        )
+    elif args.command == 'attempts':
+        from app2 import run_attempts
+        run_attempts(
+            args.data_dir, args.output, args.chunk_size, args.workers, args.cache_dir, args.clear_cache,
+            args.incremental, args.state, args.dedup, args.dedup_bloom, args.unique_mode
+        )
+    elif args.command == 'report':
+        from theapp import run_report
+        run_report(os.path.join(args.data_dir, 'agents.xlsx'), args.call_results, args.duration_results, args.output)
+    else:
+        from pipeline import run_all
+        run_all(
+            args.data_dir, args.output, args.chunk_size, args.workers, args.cache_dir, args.write_details,
+            args.cube_dir, args.update, args.start, args.end, tuple(args.shift) if args.shift else None,
+            args.store, args.update, args.chunk_size or 100000, args.quarantine, args.unique_mode,
+            args.clear_cache, args.duration_output, args.call_output, args.dedup, args.dedup_bloom
+        )
+
+def main(argv=None):
+    """Parse the command line, check it and run the command."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    problems = check_config(args)
+    if problems:
+        parser.exit(2, ''.join(f"{parser.prog} {args.command}: {problem}\n" for problem in problems))
+    if args.check:
+        print("The configuration and input files look fine.")
+        return
+
+    if args.report_path or args.profile_path:
+        from instrument import start_run
+        start_run(args.profile_path)
+    run_command(args)
+    if args.report_path or args.profile_path:
+        from instrument import finish_run
+        finish_run(args.report_path)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
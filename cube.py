@@ -0,0 +1,151 @@
+#Marcus🗿 was here
+import numpy as np
+import os
+import pandas as pd
+from cache import require_parquet
+from dedup import call_identity
+from distinct import hash_keys
+from sources import source_spec
+
+# The cube is three tables: per-agent, per-source, per-hour totals, the distinct unique-call keys seen in each
+# of those buckets (hashed), which is what makes distinct counts over any range exact, and the identity of every call
+# in it (see dedup.call_identity), which is how an export that overlaps the ones before only adds its new calls
+TOTALS_COLUMNS = ['agent', 'source', 'hour', 'seconds', 'answered', 'attempts']
+KEYS_COLUMNS = ['agent', 'source', 'hour', 'key']
+CUBE_TABLES = ['totals', 'keys', 'ids']
+
+def empty_cube():
+    """Return a cube with no buckets."""
+    return {
+        'totals': pd.DataFrame({'agent': pd.Series(dtype=object), 'source': pd.Series(dtype=object), 'hour': pd.Series(dtype='datetime64[ns]'), 'seconds': pd.Series(dtype='int64'), 'answered': pd.Series(dtype='int64'), 'attempts': pd.Series(dtype='int64')}),
+        'keys': pd.DataFrame({'agent': pd.Series(dtype=object), 'source': pd.Series(dtype=object), 'hour': pd.Series(dtype='datetime64[ns]'), 'key': pd.Series(dtype='uint64')}),
+        'ids': pd.DataFrame({'identity': pd.Series(dtype='uint64')})
+    }
+
+def records_to_cube(records, filename, counted=None):
+    """
+    Roll one call log's normalized records up into hourly buckets: talk seconds and number of answered calls,
+    attempts, and the distinct keys (destination numbers or call IDs, as the source counts unique calls).
+    Calls without a readable time go into a bucket with no hour, which only reports without a date range include.
+    Calls whose identity is among the `counted` ones (e.g. a cube's 'ids'), or repeated within the records, are left out.
+    """
+    identities = call_identity(records, filename)
+    new = ~pd.Series(identities).duplicated().to_numpy()
+    if counted is not None:
+        new &= ~np.isin(identities, counted)
+    records = records[new]
+    identities = identities[new]
+
+    spec = source_spec(filename)
+    answered = records['status'].isin([spec['answered']]).to_numpy() if spec['answered'] is not None else np.ones(len(records), dtype=bool)
+
+    calls = pd.DataFrame({
+        'agent': records['agent'].astype(object).to_numpy(),
+        'source': filename,
+        'hour': records['time'].astype('datetime64[ns]').dt.floor('h').to_numpy(),
+        'seconds': np.where(answered, records['seconds'].to_numpy(), 0),
+        'answered': answered.astype('int64'),
+        'key': records[spec['unique_key']].to_numpy()
+    })
+    buckets = calls.groupby(['agent', 'source', 'hour'], sort=False, dropna=False)
+    totals = buckets[['seconds', 'answered']].sum()
+    totals['attempts'] = buckets.size()
+
+    keys = calls[KEYS_COLUMNS].dropna(subset=['key'])
+    keys = keys.assign(key=hash_keys(keys['key'])).drop_duplicates()
+    return {'totals': totals.reset_index()[TOTALS_COLUMNS], 'keys': keys.reset_index(drop=True), 'ids': pd.DataFrame({'identity': identities})}
+
+def add_to_cube(cube, part):
+    """
+    Add a freshly rolled-up export to the cube, adding its buckets into those of the same agent, source and hour.
+    Roll the export up with the cube's 'ids' as `counted` (see records_to_cube), so an overlapping (e.g. month-to-date)
+    export, or one that ends mid-hour where the next one starts, adds only the calls that weren't in the cube yet.
+    """
+    totals = pd.concat([cube['totals'], part['totals']], ignore_index=True)
+    totals = totals.groupby(['agent', 'source', 'hour'], sort=False, dropna=False)[['seconds', 'answered', 'attempts']].sum()
+    return {
+        'totals': totals.reset_index()[TOTALS_COLUMNS],
+        'keys': pd.concat([cube['keys'], part['keys']], ignore_index=True).drop_duplicates(ignore_index=True),
+        'ids': pd.concat([cube['ids'], part['ids']], ignore_index=True)
+    }
+
+def load_cube(cube_dir):
+    """Load the cube saved in cube_dir, or an empty one if there is none yet."""
+    require_parquet('The hourly cube')  # Checked before the exports are read, as saving it is the last step
+    if not os.path.exists(os.path.join(cube_dir, 'totals.parquet')):
+        return empty_cube()
+    if not os.path.exists(os.path.join(cube_dir, 'ids.parquet')):
+        raise ValueError(f"The cube in {cube_dir} was built before calls were kept by identity. Delete it to rebuild it from the exports.")
+    return {table: pd.read_parquet(os.path.join(cube_dir, f"{table}.parquet")) for table in CUBE_TABLES}
+
+def save_cube(cube, cube_dir):
+    """Save the cube, replacing each table only once its new file is fully written."""
+    os.makedirs(cube_dir, exist_ok=True)
+    for table in CUBE_TABLES:
+        path = os.path.join(cube_dir, f"{table}.parquet")
+        cube[table].to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+def cube_untimed(cube, filenames):
+    """Return {filename: (calls without a time, calls)} for the given files in the cube (see sources.report_untimed)."""
+    totals = cube['totals']
+    untimed = {}
+    for filename in filenames:
+        file_totals = totals[totals['source'] == filename]
+        if len(file_totals):
+            untimed[filename] = (int(file_totals.loc[file_totals['hour'].isna(), 'attempts'].sum()), int(file_totals['attempts'].sum()))
+    return untimed
+
+def select_buckets(frame, start=None, end=None, shift=None):
+    """
+    Return the buckets from `start` (inclusive) to `end` (exclusive), optionally only the hours of a daily shift
+    given as (first_hour, end_hour), e.g. (22, 6) for 22:00-06:00. Without any of them every bucket is returned;
+    with any of them the calls without a time are left out (see cube_untimed).
+    """
+    if start is None and end is None and shift is None:
+        return frame
+    keep = frame['hour'].notna()
+    if start is not None:
+        keep &= frame['hour'] >= pd.Timestamp(start)
+    if end is not None:
+        keep &= frame['hour'] < pd.Timestamp(end)
+    if shift is not None:
+        first_hour, end_hour = shift
+        hour = frame['hour'].dt.hour
+        # A shift past midnight wraps around, e.g. 22-6 is 22:00 to 05:59
+        keep &= (hour >= first_hour) & (hour < end_hour) if first_hour < end_hour else (hour >= first_hour) | (hour < end_hour)
+    return frame[keep]
+
+def cube_durations(cube, filenames, start=None, end=None, shift=None):
+    """Return (totals, filename) pairs for the given files over a date range, as app.load_all_durations gives them."""
+    totals = select_buckets(cube['totals'], start, end, shift)
+    stored_sources = set(cube['totals']['source'])
+    per_file_totals = []
+    for filename in filenames:
+        # Like app.py, only agents with answered calls get a total
+        file_totals = totals[(totals['source'] == filename) & (totals['answered'] > 0)]
+        if filename in stored_sources:
+            seconds = file_totals.groupby('agent', sort=False)['seconds'].sum()
+            per_file_totals.append((pd.DataFrame({'agent': seconds.index.astype(object), 'filename': filename, 'seconds': seconds.to_numpy()}), filename))
+    return per_file_totals
+
+def cube_counts(cube, filenames, start=None, end=None, shift=None):
+    """Return the per-file dicts of attempts and '<agent>_unique' counts over a date range, as app2.load_all_counts gives them."""
+    # Calls without an agent name count towards nobody's attempts
+    totals = select_buckets(cube['totals'], start, end, shift)
+    totals = totals[totals['agent'] != '']
+    keys = select_buckets(cube['keys'], start, end, shift)
+    keys = keys[keys['agent'] != '']
+    stored_sources = set(cube['totals']['source'])
+
+    all_counts = []
+    for filename in filenames:
+        if filename not in stored_sources:
+            all_counts.append(None)
+            continue
+        counts = dict(totals[totals['source'] == filename].groupby('agent', sort=False)['attempts'].sum().items())
+        unique = keys[keys['source'] == filename].groupby('agent', sort=False)['key'].nunique()
+        for agent, unique_value in unique.items():
+            counts[f"{agent}_unique"] = unique_value
+        all_counts.append(counts)
+    return all_counts
@@ -0,0 +1,116 @@
+#Marcus🗿 was here
+import numpy as np
+import os
+import pandas as pd
+from distinct import hash_keys
+from sources import source_spec
+
+# Bloom filter size in bits per stored call and number of bit positions per call: about a 2% false positive rate,
+# and a false positive only costs a lookup in the sorted hashes, never a wrongly dropped call
+BLOOM_BITS_PER_CALL = 8
+BLOOM_HASHES = 3
+
+def call_identity(records, filename):
+    """
+    Hash each normalized call record to a 64-bit identity: the export it came from, the agent and the call's ID where the
+    export has one (voicespin CALL ID, voiso UUID, coperato Call ID), otherwise its destination number and time.
+    The export is part of it because each brand's dialer numbers its calls on its own, and the agent because a voiso
+    call with several agents is one record per agent.
+    """
+    spec = source_spec(filename)
+    agent = records['agent'].astype(str)
+    fallback = agent + '|' + records['number'].astype(str) + '|' + records['time'].astype(str)
+    call_id = records['call_id'].astype(object) if spec['call_id'] is not None else pd.Series(np.nan, index=records.index, dtype=object)
+    identity = filename + '|' + agent + '|' + call_id.where(call_id.notna(), 'no id|' + fallback).astype(str)
+    return hash_keys(identity)
+
+def drop_repeated(records, filename):
+    """Return the records with each call (by call_identity) once, e.g. where the parts of a split export or two pulls overlap."""
+    repeated = pd.Series(call_identity(records, filename)).duplicated().to_numpy()
+    if repeated.any():
+        print(f"{repeated.sum()} calls in {filename} are listed more than once and are counted once")
+        records = records[~repeated].reset_index(drop=True)
+    return records
+
+class SeenCalls:
+    """
+    A persistent set of call identities, stored as a sorted array of hashes so a whole batch is checked with one
+    searchsorted. The array is memory-mapped rather than read whole, and with `bloom` a Bloom filter in front of it
+    answers most never-seen calls without touching the array, which keeps very large histories cheap to check.
+    Without a path the set only lives in memory, e.g. to recognize calls repeated across the chunks of one export.
+    """
+
+    def __init__(self, path=None, bloom=False):
+        self.path = path
+        self.hashes = np.load(path, mmap_mode='r') if path is not None and os.path.exists(path) else np.empty(0, dtype=np.uint64)
+        self.bloom = None
+        if bloom:
+            bloom_path = path + '.bloom.npy'
+            if path is not None and os.path.exists(bloom_path) and os.path.getmtime(bloom_path) >= os.path.getmtime(path):
+                self.bloom = np.load(bloom_path)
+            else:
+                self.bloom = self.build_bloom(self.hashes)
+
+    def bloom_positions(self, hashes, bits):
+        """Return the BLOOM_HASHES bit positions of each hash, derived from its 64 bits (double hashing)."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        first = hashes % np.uint64(bits)
+        step = (hashes >> np.uint64(32)) | np.uint64(1)
+        return [(first + np.uint64(i) * step) % np.uint64(bits) for i in range(BLOOM_HASHES)]
+
+    def build_bloom(self, hashes, size=None):
+        """Return a Bloom filter of `size` bytes holding the hashes; by default sized for twice as many calls."""
+        if size is None:
+            size = max(len(hashes) * 2, 1 << 20) * BLOOM_BITS_PER_CALL // 8
+        bloom = np.zeros(size, dtype=np.uint8)
+        for positions in self.bloom_positions(hashes, size * 8):
+            np.bitwise_or.at(bloom, (positions >> np.uint64(3)).astype(np.intp), np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+        return bloom
+
+    def contains(self, hashes):
+        """Return a boolean mask of which hashes were stored before."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        candidates = np.ones(len(hashes), dtype=bool)
+        if self.bloom is not None:
+            bits = len(self.bloom) * 8
+            for positions in self.bloom_positions(hashes, bits):
+                candidates &= (self.bloom[(positions >> np.uint64(3)).astype(np.intp)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1 > 0
+
+        seen = np.zeros(len(hashes), dtype=bool)
+        if len(self.hashes) and candidates.any():
+            lookup = hashes[candidates]
+            found = np.searchsorted(self.hashes, lookup)
+            seen[candidates] = self.hashes[np.minimum(found, len(self.hashes) - 1)] == lookup
+        return seen
+
+    def add(self, hashes):
+        """Store more hashes (kept in memory until save)."""
+        hashes = np.unique(np.asarray(hashes, dtype=np.uint64))
+        self.hashes = np.union1d(self.hashes, hashes)
+        if self.bloom is not None:
+            if len(self.hashes) * BLOOM_BITS_PER_CALL > len(self.bloom) * 8:
+                self.bloom = self.build_bloom(self.hashes)  # Full: rebuild it with room for as many again
+            else:
+                self.bloom |= self.build_bloom(hashes, len(self.bloom))
+
+    def drop_seen(self, records, filename):
+        """Return the records whose calls weren't stored before, each once, and store them."""
+        hashes = call_identity(records, filename)
+        seen = self.contains(hashes) | pd.Series(hashes).duplicated().to_numpy()
+        self.add(hashes[~seen])
+        if seen.any():
+            print(f"{seen.sum()} calls in {filename} were already counted and are dropped")
+        return records[~seen]
+
+    def save(self):
+        """Save the stored hashes (and Bloom filter), replacing the files only once the new ones are fully written."""
+        # Read a memory-mapped array into memory first, as a mapped file can't be replaced on Windows
+        hashes = np.array(self.hashes)
+        with open(self.path + '.tmp', 'wb') as f:
+            np.save(f, hashes)
+        self.hashes = hashes
+        os.replace(self.path + '.tmp', self.path)
+        if self.bloom is not None:
+            with open(self.path + '.bloom.tmp', 'wb') as f:
+                np.save(f, self.bloom)
+            os.replace(self.path + '.bloom.tmp', self.path + '.bloom.npy')
@@ -0,0 +1,94 @@
+#Marcus🗿 was here
+import numpy as np
+import pandas as pd
+
+# Sketch precision: 2 ** 14 one-byte registers per agent, for a standard error of about 0.8%
+HLL_PRECISION = 14
+
+def hash_keys(values):
+    """Hash keys (e.g. destination numbers) to 64-bit integers; the hashes are the same in every process and run."""
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+class HyperLogLog:
+    """
+    A HyperLogLog sketch estimating how many distinct hashes were added, in a fixed 2 ** precision bytes.
+    Sketches of the same precision merge by taking the larger register, so daily sketches roll up into monthly ones.
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        """Add an array of 64-bit hashes."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        # The top bits pick the register, the rest give the rank: the position of their first 1 bit
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        rest = (hashes << np.uint64(self.precision)) >> np.uint64(11)  # Top 53 bits, exact as floats
+        rank = np.full(len(hashes), 54, dtype=np.uint8)
+        nonzero = rest > 0
+        rank[nonzero] = 53 - np.floor(np.log2(rest[nonzero].astype(np.float64))).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        """Fold another sketch of the same precision into this one."""
+        if other.precision != self.precision:
+            raise ValueError(f"Can't merge sketches of precision {self.precision} and {other.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        """Return the estimated number of distinct hashes added."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            # Few keys: counting the empty registers is more accurate
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+class DistinctCounter:
+    """
+    Per-agent distinct counts of keys, e.g. destination numbers over every call log.
+    mode 'exact' keeps a set of key hashes per agent; mode 'hll' keeps a HyperLogLog sketch per agent,
+    whose memory doesn't grow with the number of keys. Counters of the same mode can be merged.
+    """
+
+    def __init__(self, mode='exact', precision=HLL_PRECISION):
+        if mode not in ('exact', 'hll'):
+            raise ValueError(f"Unknown distinct-count mode: {mode}")
+        self.mode = mode
+        self.precision = precision
+        self.agents = {}
+
+    def add(self, agents, keys):
+        """Add (agent, key) pairs; pairs with a missing agent or key are skipped."""
+        pairs = pd.DataFrame({'agent': np.asarray(agents, dtype=object), 'key': np.asarray(keys, dtype=object)}).dropna()
+        hashes = hash_keys(pairs['key'])
+
+        for agent, rows in pairs.groupby('agent', sort=False).indices.items():
+            if self.mode == 'exact':
+                self.agents.setdefault(agent, set()).update(np.unique(hashes[rows]).tolist())
+            else:
+                self.agents.setdefault(agent, HyperLogLog(self.precision)).add_hashes(hashes[rows])
+
+    def merge(self, other):
+        """Fold another counter of the same mode into this one."""
+        if other.mode != self.mode:
+            raise ValueError(f"Can't merge a '{other.mode}' counter into a '{self.mode}' one")
+        for agent, state in other.agents.items():
+            if self.mode == 'exact':
+                self.agents.setdefault(agent, set()).update(state)
+            else:
+                self.agents.setdefault(agent, HyperLogLog(self.precision)).merge(state)
+
+    def count(self, agent):
+        """Return the (estimated, in 'hll' mode) number of distinct keys of an agent."""
+        state = self.agents.get(agent)
+        if state is None:
+            return 0
+        return len(state) if self.mode == 'exact' else state.count()
+
+    def counts(self):
+        """Return {agent: distinct count} for every agent seen."""
+        return {agent: self.count(agent) for agent in self.agents}
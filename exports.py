@@ -0,0 +1,77 @@
+#Marcus🗿 was here
+import glob
+import importlib.util
+import os
+import zipfile
+
+# Which exports are read, where each one is found and whether the cache can be stored. Only the standard library
+# is used here, so the command line can check a data folder without loading pandas.
+
+# Files app.py reads for durations and app2.py reads for call attempts
+DURATION_FILES = [
+    'voiso summitlife.csv',
+    'voiso traling.csv',
+    'voiso 24x.csv',
+    'coperato traling2.csv',
+    'coperato signix2.csv',
+    'coperato 24x2.csv',
+    'voicespin.csv'
+]
+CALL_FILES = [
+    'voiso summitlife.csv',
+    'voiso traling.csv',
+    'voiso 24x.csv',
+    'coperato traling.csv',
+    'coperato signix.csv',
+    'coperato 24x.csv',
+    'voicespin.csv'
+]
+
+# The libraries pandas can read and write parquet with; the cache (and the hourly cube) need one of them
+PARQUET_ENGINES = ['pyarrow', 'fastparquet']
+
+def has_parquet_engine():
+    """Check whether a parquet library is installed, without importing it."""
+    return any(importlib.util.find_spec(engine) is not None for engine in PARQUET_ENGINES)
+
+def export_path(data_dir, filename):
+    """
+    Return where an export is in data_dir: the plain CSV if it is there, otherwise the first of
+    '<filename>.gz', '<name>.zip' and a '<name>' folder of parts (e.g. 'voicespin.csv.gz', 'voicespin.zip', 'voicespin/').
+    Falls back to the plain path, so a missing export fails as it always did.
+    """
+    path = os.path.join(data_dir, filename)
+    stem = os.path.splitext(path)[0]
+    for candidate in [path, path + '.gz', stem + '.zip', stem]:
+        if os.path.exists(candidate):
+            return candidate
+    return path
+
+def input_files(path):
+    """Return the files an input path stands for: the file itself, the CSV, .csv.gz and .zip files in a folder, or the matches of a glob pattern."""
+    if glob.has_magic(path):
+        files = sorted(glob.glob(path))
+    elif os.path.isdir(path):
+        files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(('.csv', '.csv.gz', '.zip'))
+        )
+    else:
+        return [path]
+    if not files:
+        raise FileNotFoundError(f"No CSV files in {path}")
+    return files
+
+def input_parts(path):
+    """Return the (file, member) parts of an input in order; member is the CSV's name inside a zip archive, otherwise None."""
+    parts = []
+    for file in input_files(path):
+        if file.lower().endswith('.zip'):
+            with zipfile.ZipFile(file) as archive:
+                members = [member for member in archive.namelist() if member.lower().endswith('.csv') and not member.startswith('__MACOSX/')]
+            if not members:
+                raise ValueError(f"No CSV files in {file}")
+            parts.extend((file, member) for member in members)
+        else:
+            parts.append((file, None))
+    return parts
@@ -0,0 +1,72 @@
+#Marcus🗿 was here
+import numpy as np
+import os
+import pickle
+from dedup import call_identity
+
+# Bump this whenever the layout of the saved state changes
+STATE_VERSION = 1
+
+def load_state(path):
+    """Load the saved month-to-date state, or start an empty one if there is none yet."""
+    if not os.path.exists(path):
+        return {'version': STATE_VERSION, 'files': {}}
+
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    if state.get('version') != STATE_VERSION:
+        raise ValueError(f"{path} was saved by an incompatible version. Delete it to rebuild the totals from scratch.")
+    return state
+
+def save_state(state, path):
+    """Save the state, replacing the previous file only once the new one is fully written."""
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+
+def file_state(state, filename):
+    """Return the stored aggregates and watermark of one source file."""
+    return state['files'].setdefault(filename, {'watermark': None})
+
+def take_new_records(entry, records, filename):
+    """
+    Return the call records newer than the file's watermark and move the watermark to the newest of them.
+    Times only go down to the second, so the calls at the watermark itself are remembered by identity
+    (see dedup.call_identity): a call in the next pull with that same time is new unless it is one of them.
+    Calls without a readable time can't be placed against the watermark, so they are only counted on the first run.
+    If the export has no call times at all it is treated as a full snapshot: the file's stored aggregates are reset
+    and every record is returned.
+    """
+    if len(records) and records['time'].isna().all():
+        print("Warning: no call times found, so the whole file replaces what was stored for it")
+        for key in [key for key in entry if key != 'watermark']:
+            del entry[key]
+        return records
+
+    counted = entry.get('at_watermark')
+    if entry['watermark'] is not None:
+        keep = np.array(records['time'] > entry['watermark'])
+        # Without remembered calls (state saved before they were kept) every call at the watermark was counted
+        if counted is not None:
+            at_watermark = (records['time'] == entry['watermark']).to_numpy()
+            keep[at_watermark] = ~np.isin(call_identity(records[at_watermark], filename), np.fromiter(counted, dtype=np.uint64, count=len(counted)))
+        records = records[keep]
+
+    if records['time'].notna().any():
+        newest = records['time'].max()
+        identities = set(call_identity(records[records['time'] == newest], filename).tolist())
+        if newest == entry['watermark'] and counted is not None:
+            identities |= counted  # Only more calls at the same second, so the earlier ones stay counted too
+        entry['watermark'] = newest
+        entry['at_watermark'] = identities
+    return records
+
+def add_values(totals, agent_values):
+    """Add (agent, value) pairs into a stored per-agent dict."""
+    for agent, value in agent_values:
+        totals[agent] = totals.get(agent, 0) + value
+
+def add_key_sets(stored_keys, unique_keys):
+    """Merge per-agent sets of distinct numbers into the stored ones, keeping distinct counts exact across runs."""
+    for agent, keys in unique_keys.items():
+        stored_keys.setdefault(agent, set()).update(keys)
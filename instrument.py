@@ -0,0 +1,125 @@
+#Marcus🗿 was here
+import cProfile
+import functools
+import inspect
+import json
+import pstats
+import sys
+import time
+import pandas as pd
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# The run being recorded, or None when instrumentation is off (stages then cost next to nothing)
+_run = None
+
+def peak_rss_mb():
+    """Return the peak resident memory of this process so far in MB, or None where it can't be read."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory = psutil.Process().memory_info()
+    return getattr(memory, 'peak_wset', memory.rss) / 1024 ** 2
+
+def start_run(profile_path=None):
+    """Start recording stages; with a profile_path the whole run is also profiled with cProfile."""
+    global _run
+    _run = {'started': time.time(), 'stages': [], 'depth': 0, 'profile_path': profile_path, 'profiler': None}
+    if profile_path:
+        _run['profiler'] = cProfile.Profile()
+        _run['profiler'].enable()
+
+@contextmanager
+def stage(name, filename=None, rows_in=None):
+    """
+    Record one stage's wall time, rows in and out, throughput and the process's peak RSS so far.
+    The caller can fill in record['rows_out'] (and 'rows_in') inside the block.
+    Stages run in worker processes are not recorded; the stage that started the pool covers them.
+    """
+    record = {'stage': name, 'file': filename, 'rows_in': rows_in, 'rows_out': None}
+    if _run is None:
+        yield record
+        return
+
+    run = _run
+    record['depth'] = run['depth']
+    run['stages'].append(record)  # Added up front so stages are listed in the order they started
+    run['depth'] += 1
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        seconds = time.perf_counter() - start
+        run['depth'] -= 1
+        rows = record['rows_in'] if record['rows_in'] is not None else record['rows_out']
+        record['seconds'] = seconds
+        record['rows_per_second'] = rows / seconds if rows is not None and seconds > 0 else None
+        record['peak_rss_mb'] = peak_rss_mb()
+
+def instrumented(name):
+    """
+    Decorate a function so each call is recorded as a stage. The file is taken from a `filename` argument,
+    rows in from the first DataFrame argument and rows out from a DataFrame result.
+    """
+    def decorate(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _run is None:
+                return func(*args, **kwargs)
+
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            frames = [value for value in arguments.values() if isinstance(value, pd.DataFrame)]
+            with stage(name, arguments.get('filename'), len(frames[0]) if frames else None) as record:
+                result = func(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    record['rows_out'] = len(result)
+                return result
+        return wrapper
+    return decorate
+
+def hot_functions(profiler, limit=25):
+    """Return the functions with the most cumulative time in a profile, leaving out the stage wrappers themselves."""
+    stats = pstats.Stats(profiler).stats
+    rows = [
+        {'function': f"{path}:{line}({function})", 'calls': calls, 'own_seconds': own, 'cumulative_seconds': cumulative}
+        for (path, line, function), (_, calls, own, cumulative, _) in stats.items()
+        if path != __file__
+    ]
+    return sorted(rows, key=lambda row: row['cumulative_seconds'], reverse=True)[:limit]
+
+def finish_run(report_path=None):
+    """Stop recording, save the profile if one was taken, and write the JSON run report to report_path (if given)."""
+    global _run
+    run = _run
+    _run = None
+    if run is None:
+        return None
+
+    report = {
+        'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(run['started'])),
+        'seconds': time.time() - run['started'],
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': run['stages']
+    }
+    if run['profiler'] is not None:
+        run['profiler'].disable()
+        run['profiler'].dump_stats(run['profile_path'])
+        report['profile'] = run['profile_path']
+        report['hot_functions'] = hot_functions(run['profiler'])
+
+    if report_path:
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Run report written to {report_path}")
+    return report
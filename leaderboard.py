@@ -0,0 +1,154 @@
+#Marcus🗿 was here
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from theapp import desk_order_conversion, desk_order_retention
+from urllib.parse import parse_qs, urlparse
+from watch import FolderWatcher, watch
+
+# Department names used in the URLs, with the desk order of each
+DESK_ORDERS = {'conversion': desk_order_conversion, 'retention': desk_order_retention}
+
+def standings(scored):
+    """Turn a scored sheet (as theapp.build_results gives it, with its numeric Seconds and Target Value) into per-agent rows."""
+    return [
+        {
+            'desk': desk,
+            'agent': agent,
+            'duration': duration,
+            'duration_seconds': int(seconds),
+            'attempts': int(attempts),
+            'unique': int(unique),
+            'target': int(target)
+        }
+        for desk, agent, duration, attempts, unique, target, seconds in zip(
+            scored['Desk'], scored['Agent Name'], scored['Duration'], scored['Call Attempts'], scored['Unique'], scored['Target Value'], scored['Seconds']
+        )
+    ]
+
+def desk_standings(agents, desk_order):
+    """Total each desk's agents, in the report's desk order (desks not in the order come last)."""
+    desks = {}
+    for agent in agents:
+        desk = desks.setdefault(agent['desk'], {'desk': agent['desk'], 'agents': 0, 'duration_seconds': 0, 'attempts': 0, 'unique': 0, 'target': 0})
+        desk['agents'] += 1
+        for field in ['duration_seconds', 'attempts', 'unique', 'target']:
+            desk[field] += agent[field]
+    for desk in desks.values():
+        desk['average_target'] = round(desk['target'] / desk['agents'], 2)
+    order = {desk: idx for idx, desk in enumerate(desk_order)}
+    return sorted(desks.values(), key=lambda desk: order.get(desk['desk'], len(order)))
+
+class Leaderboard:
+    """
+    The standings of one report, computed once when the report is scored. Responses are cached per page (path,
+    department and desk, with every unknown desk sharing one entry), so made-up URLs can't grow the cache;
+    new data gives a new Leaderboard, which is what invalidates them.
+    """
+
+    def __init__(self, merged_data_conversion, merged_data_retention):
+        self.updated = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.agents = {'conversion': standings(merged_data_conversion), 'retention': standings(merged_data_retention)}
+        self.desks = {department: desk_standings(agents, DESK_ORDERS[department]) for department, agents in self.agents.items()}
+        self.desk_names = {department: {agent['desk'] for agent in agents} for department, agents in self.agents.items()}
+        self.cache = {}
+
+    def page(self, path, query):
+        """Return the cache key of the page a request asks for, or None for an unknown path or department."""
+        if path == '/status':
+            return (path,)
+        department = query.get('department', [None])[0]
+        if department not in DESK_ORDERS:
+            return None
+        if path == '/desks':
+            return (path, department)
+        if path == '/agents':
+            desk = query.get('desk', [None])[0]
+            known = desk is None or desk in self.desk_names[department]
+            return (path, department, known, desk if known else None)
+        return None
+
+    def answer(self, path, query):
+        """Return the JSON-ready answer to a request, or None for an unknown path or department."""
+        department = query.get('department', [None])[0]
+        if path == '/status':
+            return {'updated': self.updated, 'agents': {department: len(agents) for department, agents in self.agents.items()}}
+        if department not in DESK_ORDERS:
+            return None
+        if path == '/agents':
+            desk = query.get('desk', [None])[0]
+            agents = self.agents[department]
+            return {'updated': self.updated, 'agents': agents if desk is None else [agent for agent in agents if agent['desk'] == desk]}
+        if path == '/desks':
+            return {'updated': self.updated, 'desks': self.desks[department]}
+        return None
+
+    def response(self, url):
+        """Return the encoded JSON body for a URL, or None if there is no such page."""
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        page = self.page(parsed.path, query)
+        if page is None:
+            return None
+        if page not in self.cache:
+            self.cache[page] = json.dumps(self.answer(parsed.path, query)).encode()
+        return self.cache[page]
+
+class LeaderboardHandler(BaseHTTPRequestHandler):
+    """
+    Serve the current leaderboard:
+    /status, /desks?department=conversion|retention and /agents?department=conversion|retention[&desk=Team Elly]
+    """
+
+    def do_GET(self):
+        board = self.server.board
+        if board is None:
+            self.send_json(503, b'{"error": "no report yet"}')
+            return
+        body = board.response(self.path)
+        if body is None:
+            self.send_json(404, b'{"error": "use /status, /desks?department=conversion|retention or /agents?department=...&desk=..."}')
+            return
+        self.send_json(200, body)
+
+    def send_json(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep the console for the watcher's output
+
+def serve(host='127.0.0.1', port=8050):
+    """Start the leaderboard server in a background thread and return it; set server.board to publish a Leaderboard."""
+    server = ThreadingHTTPServer((host, port), LeaderboardHandler)
+    server.board = None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Leaderboard at http://{host}:{port}/desks?department=conversion")
+    return server
+
+
+if __name__ == "__main__":
+    # The folder the exports are dropped into, and how often to look at it (as in watch.py)
+    DATA_DIR = r'C:\Users\marcus.forsen\Desktop\new project'
+    POLL_SECONDS = 5
+    OUTPUT = 'Agent_Results.xlsx'
+    QUARANTINE_PATH = 'rejected_rows.csv'
+    # Where the leaderboard listens; 127.0.0.1 keeps it on this machine, '0.0.0.0' opens it to the network
+    HOST = '127.0.0.1'
+    PORT = 8050
+
+    server = serve(HOST, PORT)
+
+    def publish(scored):
+        # Swapping in a new board is atomic, so requests see either the old standings or the new ones
+        server.board = Leaderboard(*scored)
+
+    try:
+        watch(FolderWatcher(DATA_DIR), OUTPUT, QUARANTINE_PATH, poll_seconds=POLL_SECONDS, on_report=publish)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print("Stopped the leaderboard.")
@@ -0,0 +1,70 @@
+#Marcus🗿 was here
+import numpy as np
+import pandas as pd
+
+# Call lengths are counted in buckets of LENGTH_BUCKET_SECONDS, LENGTH_BUCKETS of them (two hours); longer calls share the last.
+# A histogram is the same size however many calls it holds, and histograms add up, so files, chunks and runs merge cheaply.
+LENGTH_BUCKET_SECONDS = 10
+LENGTH_BUCKETS = 720
+BUCKET_COLUMNS = list(range(LENGTH_BUCKETS))
+
+# Calls shorter than this are short calls; a whole number of buckets, so the short-call ratio is exact
+SHORT_CALL_SECONDS = 30
+
+def length_histograms(agents, seconds):
+    """
+    Count calls per agent and length bucket with one bincount over (agent code, bucket) pairs.
+    Returns one row per agent: the count of each bucket (columns 0..LENGTH_BUCKETS-1) and the agent's 'longest' call in seconds.
+    """
+    # Category codes come straight from categorical columns, so only plain text columns are hashed
+    codes, names = pd.factorize(pd.Series(agents))
+    names = np.asarray(names, dtype=object)
+    seconds = np.asarray(seconds, dtype='int64')
+    has_agent = codes >= 0
+    codes = codes[has_agent]
+    seconds = seconds[has_agent]
+
+    buckets = np.clip(seconds // LENGTH_BUCKET_SECONDS, 0, LENGTH_BUCKETS - 1)
+    counts = np.bincount(codes * LENGTH_BUCKETS + buckets, minlength=len(names) * LENGTH_BUCKETS).reshape(len(names), LENGTH_BUCKETS)
+    longest = np.zeros(len(names), dtype='int64')
+    np.maximum.at(longest, codes, seconds)
+
+    histograms = pd.DataFrame(counts, index=pd.Index(names, dtype=object, name='agent'), columns=BUCKET_COLUMNS)
+    histograms['longest'] = longest
+    return histograms
+
+def merge_histograms(histograms):
+    """Add up histograms (None entries are skipped), keeping agents in order of first appearance; None if there are none."""
+    histograms = [frame for frame in histograms if frame is not None]
+    if not histograms:
+        return None
+    grouped = pd.concat(histograms).groupby(level=0, sort=False)
+    merged = grouped[BUCKET_COLUMNS].sum()
+    merged['longest'] = grouped['longest'].max()
+    return merged
+
+def length_stats(histograms):
+    """
+    Return the calls, median, p90, short-call ratio and longest call of each row of a histogram frame (agents or desks).
+    The median and p90 are the upper edge of the bucket they fall in, so within LENGTH_BUCKET_SECONDS below two hours,
+    and never past the longest call.
+    """
+    counts = histograms[BUCKET_COLUMNS].to_numpy()
+    longest = histograms['longest'].to_numpy()
+    calls = counts.sum(axis=1)
+    cumulative = counts.cumsum(axis=1)
+
+    def quantile(q):
+        # The first bucket holding the call of rank ceil(q * calls); the last bucket has no upper edge but the longest call
+        bucket = (cumulative >= np.ceil(calls * q)[:, None]).argmax(axis=1)
+        upper = np.where(bucket == LENGTH_BUCKETS - 1, longest, (bucket + 1) * LENGTH_BUCKET_SECONDS)
+        return np.minimum(upper, longest)
+
+    short = counts[:, :SHORT_CALL_SECONDS // LENGTH_BUCKET_SECONDS].sum(axis=1)
+    return pd.DataFrame({
+        'calls': calls,
+        'median': quantile(0.5),
+        'p90': quantile(0.9),
+        'short_ratio': np.divide(short, calls, out=np.zeros(len(calls)), where=calls > 0),
+        'longest': longest
+    }, index=histograms.index)
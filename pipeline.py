@@ -0,0 +1,316 @@
+#Marcus🗿 was here
+import os
+import pandas as pd
+from app import export_to_excel, load_call_records, record_durations, summarize_durations, print_unmatched_agents
+from app2 import count_call_records, count_file_calls, cross_source_unique, export_call_attempts_to_excel, finalize_call_counts, record_destinations, record_file_counts
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from cache import clear_cache
+from dedup import SeenCalls
+from cube import add_to_cube, cube_counts, cube_durations, cube_untimed, load_cube, records_to_cube, save_cube
+from distinct import DistinctCounter
+from exports import CALL_FILES, DURATION_FILES, export_path
+from instrument import finish_run, instrumented, start_run
+from lengths import merge_histograms
+from quarantine import collecting, merge_rejected, print_rejected, write_quarantine
+from roster import AgentRoster
+from sources import is_call_log, read_source, report_untimed
+from store import load_file, open_store, restore_stored_rejected, store_counts, store_durations, store_untimed
+from theapp import build_results, write_results
+
+def load_source(path, filename, duration_files=DURATION_FILES, call_files=CALL_FILES, chunksize=None, cache_dir=None, unique_mode=None, seen=None):
+    """
+    Read one source file once and return its per-agent duration totals, call counts, destination numbers
+    (with a `unique_mode`, see app2.record_destinations) and call-length histograms; None where not needed.
+    With `seen` (a dedup.SeenCalls) the calls it holds are left out and the file's other calls are added to it.
+    """
+    totals = None
+    counts = None
+    destinations = None
+    lengths = None
+
+    if is_call_log(filename):
+        # Voiso and voicespin logs feed both durations and call attempts from the same records
+        records = load_call_records(path, filename, chunksize, cache_dir)
+        if seen is not None:
+            records = seen.drop_seen(records, filename)
+        if filename in duration_files:
+            totals, lengths = record_durations(records, filename)
+        if filename in call_files:
+            counts = finalize_call_counts(count_call_records(records, filename))
+            if unique_mode:
+                destinations = record_destinations(records, unique_mode)
+    elif filename in call_files:
+        partials = count_file_calls(read_source(path, filename), filename)
+        if partials is not None:
+            counts = finalize_call_counts(partials)
+
+    return totals, counts, destinations, lengths
+
+@instrumented('load sources')
+def load_sources(data_dir, duration_files=DURATION_FILES, call_files=CALL_FILES, chunksize=None, workers=1, cache_dir=None, unique_mode=None,
+                 dedup_path=None, dedup_bloom=False):
+    """
+    Read every source file once, in parallel across `workers` processes if more than one;
+    returns (per_file_totals, call_counts, destinations, lengths), lengths being the call-length histograms of the duration files.
+    With a `unique_mode` destinations holds every call log's destination numbers in one DistinctCounter, otherwise it is None.
+    With a `dedup_path` the calls counted by earlier runs sharing that index (see dedup.SeenCalls) are left out, and this
+    run's calls are added to it; the files are then read one after another, as the index can't be shared between processes.
+    Coperato agent summaries have no calls to recognize, so they always count in full.
+    """
+    if dedup_path and workers > 1:
+        raise ValueError("A de-duplication index is checked and updated file by file, so it needs a single worker")
+    filenames = list(dict.fromkeys(duration_files + call_files))
+    paths = [export_path(data_dir, filename) for filename in filenames]
+    count = len(filenames)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(collecting, [load_source] * count, paths, filenames, [duration_files] * count, [call_files] * count, [chunksize] * count, [cache_dir] * count, [unique_mode] * count))
+        for _, rejected in results:
+            merge_rejected(rejected)
+        results = [result for result, _ in results]
+    else:
+        seen = SeenCalls(dedup_path, dedup_bloom) if dedup_path else None
+        results = [load_source(path, filename, duration_files, call_files, chunksize, cache_dir, unique_mode, seen) for path, filename in zip(paths, filenames)]
+        if seen is not None:
+            seen.save()
+
+    # Hand the results on in each script's own file order, which the report's row and source order follow
+    results = dict(zip(filenames, results))
+    per_file_totals = [(results[filename][0], filename) for filename in duration_files if results[filename][0] is not None]
+    call_counts = [(results[filename][1], filename) for filename in call_files if results[filename][1] is not None]
+    lengths = merge_histograms([results[filename][3] for filename in duration_files])
+
+    destinations = None
+    if unique_mode:
+        # A number dialed from several dialers counts once
+        destinations = DistinctCounter(unique_mode)
+        for filename in call_files:
+            if results[filename][2] is not None:
+                destinations.merge(results[filename][2])
+    return per_file_totals, call_counts, destinations, lengths
+
+@instrumented('update cube')
+def update_cube(data_dir, cube_dir, filenames, chunksize=None, cache_dir=None):
+    """Roll every call log among `filenames` up into the hourly cube kept in cube_dir and return the updated cube."""
+    cube = load_cube(cube_dir)
+    for filename in filenames:
+        if is_call_log(filename):
+            records = load_call_records(export_path(data_dir, filename), filename, chunksize, cache_dir)
+            cube = add_to_cube(cube, records_to_cube(records, filename, cube['ids']['identity'].to_numpy()))
+    save_cube(cube, cube_dir)
+    return cube
+
+def cube_sources(cube, data_dir, duration_files=DURATION_FILES, call_files=CALL_FILES, start=None, end=None, shift=None):
+    """
+    Take the durations and call counts of a date range (and optionally a daily shift) from the cube; returns (per_file_totals, call_counts).
+    Coperato agent summaries have no call times, so they are read from data_dir and always count in full.
+    Call log calls without a time are left out of a range or shift, with a warning (see sources.report_untimed).
+    """
+    if start is not None or end is not None or shift is not None:
+        report_untimed(cube_untimed(cube, list(dict.fromkeys(duration_files + call_files))))
+    per_file_totals = cube_durations(cube, duration_files, start, end, shift)
+    counts = dict(zip(call_files, cube_counts(cube, call_files, start, end, shift)))
+    return per_file_totals, with_summary_counts(counts, data_dir, call_files, start is not None or end is not None or shift is not None)
+
+def with_summary_counts(counts, data_dir, call_files, ranged=False):
+    """
+    Add the coperato agent summaries, read from data_dir, to per-file counts of the call logs; returns the call_counts pairs.
+    The summaries have no call times, so they always count in full.
+    """
+    for filename in call_files:
+        if not is_call_log(filename):
+            if ranged:
+                print(f"Note: {filename} has no call times, so all of it is counted")
+            counts[filename] = load_source(export_path(data_dir, filename), filename, [], call_files)[1]
+    return [(counts[filename], filename) for filename in call_files if counts[filename] is not None]
+
+@instrumented('update store')
+def update_store(conn, data_dir, filenames, chunksize=100000):
+    """Load every call log among `filenames` into the SQL store (files already in it are skipped)."""
+    for filename in filenames:
+        if is_call_log(filename):
+            load_file(conn, export_path(data_dir, filename), filename, chunksize)
+
+def store_sources(conn, data_dir, duration_files=DURATION_FILES, call_files=CALL_FILES, start=None, end=None):
+    """
+    Aggregate the durations and call counts of a date range in the SQL store; returns (per_file_totals, call_counts).
+    Calls without a time are left out of a range, with a warning (see sources.report_untimed).
+    """
+    if start is not None or end is not None:
+        report_untimed(store_untimed(conn, list(dict.fromkeys(duration_files + call_files))))
+    per_file_totals = store_durations(conn, duration_files, start, end)
+    counts = dict(zip(call_files, store_counts(conn, call_files, start, end)))
+    return per_file_totals, with_summary_counts(counts, data_dir, call_files, start is not None or end is not None)
+
+def call_data(agents, file_call_attempts, unique_totals=None):
+    """
+    Total each agent's attempts and unique calls over all files, as theapp.py reads them from Agent_Call_Results.xlsx.
+    With `unique_totals` (see app2.cross_source_unique) the unique calls come from them instead of adding up the files.
+    """
+    rows = []
+    for agent in agents:
+        if not agent.endswith('_unique'):
+            if unique_totals is not None:
+                unique = unique_totals.get(agent, 0)
+            else:
+                unique = sum(file_call_attempts[fname].get(f"{agent}_unique", 0) for fname in file_call_attempts)
+            rows.append({
+                'Agent Name': agent.upper(),
+                'Unique': unique,
+                'Call Attempts': sum(file_call_attempts[fname].get(agent, 0) for fname in file_call_attempts)
+            })
+    return pd.DataFrame(rows, columns=['Agent Name', 'Unique', 'Call Attempts'])
+
+def duration_data(agents):
+    """Give each agent's exact total talk time in seconds."""
+    rows = [{'Agent Name': agent.upper(), 'Seconds': int(info['total_seconds'])} for agent, info in agents.items()]
+    return pd.DataFrame(rows, columns=['Agent Name', 'Seconds'])
+
+def detail_outputs(output, duration_output=None, call_output=None):
+    """Return where the detail workbooks go: the paths given, by default Agent_Duration_Results.xlsx and Agent_Call_Results.xlsx next to output."""
+    output_dir = os.path.dirname(output)
+    return (
+        duration_output or os.path.join(output_dir, 'Agent_Duration_Results.xlsx'),
+        call_output or os.path.join(output_dir, 'Agent_Call_Results.xlsx')
+    )
+
+@instrumented('run pipeline')
+def run_pipeline(roster, per_file_totals, call_counts, output='Agent_Results.xlsx', write_details=True, destinations=None,
+                 duration_output=None, call_output=None, lengths=None):
+    """
+    Score the loaded durations and call counts in memory and write the report (and optionally the detail workbooks,
+    to duration_output and call_output, by default next to the report; see detail_outputs).
+    The duration details get call-length sheets from `lengths` (see load_sources) when it is given.
+    With `destinations` (see load_sources) each agent's unique calls are their distinct numbers over all call logs.
+    """
+
+    # Durations, as app.py computes them
+    conversion_durations, retention_durations, file_durations, unmatched_agents = summarize_durations(per_file_totals, roster)
+    print_unmatched_agents(unmatched_agents)
+
+    # Call attempts and unique calls, as app2.py computes them
+    call_attempts = defaultdict(int)
+    conversion_calls = defaultdict(int)
+    retention_calls = defaultdict(int)
+    file_call_attempts = defaultdict(lambda: defaultdict(int))
+    unmatched_calls = {}  # Per run, as the watch service and batch jobs score several reports in one process
+    for counts, filename in call_counts:
+        file_call_attempts = record_file_counts(filename, counts, call_attempts, file_call_attempts, conversion_calls, retention_calls, roster, unmatched_calls)
+    unique_totals = cross_source_unique(destinations, file_call_attempts) if destinations is not None else None
+
+    # Score and sort the agents, as theapp.py does, without the Excel round-trips in between
+    merged_data_conversion, merged_data_retention = build_results(
+        roster,
+        call_data(conversion_calls, file_call_attempts, unique_totals),
+        call_data(retention_calls, file_call_attempts, unique_totals),
+        duration_data(conversion_durations),
+        duration_data(retention_durations)
+    )
+
+    if write_details:
+        duration_output, call_output = detail_outputs(output, duration_output, call_output)
+        export_to_excel(conversion_durations, retention_durations, filename=duration_output, lengths=lengths)
+        export_call_attempts_to_excel(conversion_calls, retention_calls, file_call_attempts, roster, filename=call_output, unique_totals=unique_totals)
+    write_results(merged_data_conversion, merged_data_retention, output)
+    print(f"\n{output} has been generated.")
+
+    return merged_data_conversion, merged_data_retention
+
+def run_all(data_dir, output='Agent_Results.xlsx', chunksize=None, workers=1, cache_dir=None, write_details=True,
+            cube_dir=None, update_cube_first=True, start=None, end=None, shift=None,
+            store_path=None, update_store_first=True, store_chunksize=100000, quarantine_path='rejected_rows.csv', unique_mode=None,
+            clear=False, duration_output=None, call_output=None, dedup_path=None, dedup_bloom=False):
+    """
+    Score every agent from the exports in data_dir and write the report (what pipeline.py runs): straight from the
+    exports, from the hourly cube in cube_dir or from the SQLite store at store_path, each optionally brought up to date first.
+    With a `unique_mode` ('exact' or 'hll') unique calls are distinct destination numbers across all call logs, which only
+    the exports themselves have. `clear` empties cache_dir first; the detail workbooks go where run_pipeline puts them.
+    With a `dedup_path` each call is only counted by the first run that reads it (see load_sources); the cube and the store
+    already keep each call once. Returns the scored conversion and retention sheets.
+    """
+    if unique_mode and (cube_dir or store_path):
+        raise ValueError("A unique mode needs the destination numbers of the exports, which the cube and the store don't keep")
+    if dedup_path and (cube_dir or store_path):
+        raise ValueError("The cube and the store keep each call once by its identity, so they don't take a de-duplication index")
+    # Call lengths come from reading the call logs, so reports from the cube or store have none
+    destinations = None
+    lengths = None
+    roster = AgentRoster.from_excel(os.path.join(data_dir, 'agents.xlsx'))
+    if cache_dir and clear:
+        clear_cache(cache_dir)
+    if store_path:
+        conn = open_store(store_path)
+        if update_store_first:
+            update_store(conn, data_dir, list(dict.fromkeys(DURATION_FILES + CALL_FILES)), store_chunksize)
+        else:
+            restore_stored_rejected(conn, list(dict.fromkeys(DURATION_FILES + CALL_FILES)))
+        per_file_totals, call_counts = store_sources(conn, data_dir, start=start, end=end)
+        conn.close()
+    elif cube_dir:
+        if update_cube_first:
+            cube = update_cube(data_dir, cube_dir, list(dict.fromkeys(DURATION_FILES + CALL_FILES)), chunksize, cache_dir)
+        else:
+            cube = load_cube(cube_dir)
+        per_file_totals, call_counts = cube_sources(cube, data_dir, start=start, end=end, shift=shift)
+    else:
+        per_file_totals, call_counts, destinations, lengths = load_sources(data_dir, chunksize=chunksize, workers=workers, cache_dir=cache_dir, unique_mode=unique_mode, dedup_path=dedup_path, dedup_bloom=dedup_bloom)
+    scored = run_pipeline(roster, per_file_totals, call_counts, output, write_details, destinations, duration_output, call_output, lengths)
+    if cube_dir and not store_path and not update_cube_first:
+        # The cube doesn't keep rejected rows, and no export was read, so the last quarantine still stands
+        print(f"No exports were read, so {quarantine_path} is left as it was")
+        return scored
+    print_rejected()
+    write_quarantine(quarantine_path)
+    return scored
+
+
+if __name__ == "__main__":
+    # Set STREAMING to read each export in chunks of CHUNK_SIZE rows instead of loading them all at once
+    STREAMING = False
+    CHUNK_SIZE = 100000
+    # Number of processes to read the files with; 1 processes them one after another
+    WORKERS = 1
+    # Set CACHE_DIR to reuse parsed call logs whose content hasn't changed; CLEAR_CACHE empties it first
+    CACHE_DIR = None
+    CLEAR_CACHE = False
+    # Also write Agent_Duration_Results.xlsx and Agent_Call_Results.xlsx (next to the report) for looking into disputed numbers
+    WRITE_DETAILS = True
+    # Set CUBE_DIR to keep the call logs rolled up into hourly buckets there, so a report can cover any date range
+    # (REPORT_START up to, not including, REPORT_END, e.g. '2024-10-01' and '2024-10-08') or daily shift (SHIFT_HOURS,
+    # e.g. (22, 6) for 22:00-06:00). With UPDATE_CUBE off the report comes from the stored cube without reading the logs.
+    CUBE_DIR = None
+    UPDATE_CUBE = True
+    REPORT_START = None
+    REPORT_END = None
+    SHIFT_HOURS = None
+    # Rows whose duration can't be read count as 0 and are written to QUARANTINE_PATH (replaced every run)
+    QUARANTINE_PATH = 'rejected_rows.csv'
+    # Set STORE_PATH to keep every call record in a SQLite file instead, loading only exports that changed and aggregating
+    # there (REPORT_START and REPORT_END apply; SHIFT_HOURS only works with the cube). UPDATE_STORE off reports without loading.
+    STORE_PATH = None
+    UPDATE_STORE = True
+    # Set UNIQUE_MODE to count each agent's destination numbers once across all call logs instead of once per file:
+    # 'exact' keeps every number, 'hll' estimates the count (within about 1%) in a fixed amount of memory. Not with the cube or store.
+    UNIQUE_MODE = None
+    # Set DEDUP_PATH to count each call in only one report: calls that an earlier run with the same index counted are
+    # left out (for pulls that repeat the edge of the last one). DEDUP_BLOOM puts a Bloom filter in front of it. Not with the cube or store.
+    DEDUP_PATH = None
+    DEDUP_BLOOM = False
+    DATA_DIR = r'C:\Users\marcus.forsen\Desktop\new project'
+    # Set REPORT_PATH to write a JSON report of every stage's time, rows and memory; PROFILE_PATH also saves a cProfile of the run
+    REPORT_PATH = None
+    PROFILE_PATH = None
+
+    if REPORT_PATH or PROFILE_PATH:
+        start_run(PROFILE_PATH)
+
+    run_all(
+        DATA_DIR, 'Agent_Results.xlsx', CHUNK_SIZE if STREAMING else None, WORKERS, CACHE_DIR, WRITE_DETAILS,
+        CUBE_DIR, UPDATE_CUBE, REPORT_START, REPORT_END, SHIFT_HOURS,
+        STORE_PATH, UPDATE_STORE, CHUNK_SIZE, QUARANTINE_PATH, UNIQUE_MODE, CLEAR_CACHE,
+        None, None, DEDUP_PATH, DEDUP_BLOOM
+    )
+
+    finish_run(REPORT_PATH)
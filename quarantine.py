@@ -0,0 +1,168 @@
+#Marcus🗿 was here
+import os
+import pandas as pd
+from collections import defaultdict
+
+# How many example rows per file the console summary shows; the quarantine file always gets all of them
+EXAMPLE_LIMIT = 5
+
+# The first data row of an export is line 2, after the header
+FIRST_DATA_LINE = 2
+
+# Columns every quarantined row starts with, followed by the export's own columns. `part` is the part of an export
+# split into several files (see sources.read_source), whose own line numbers `line` then gives; empty otherwise
+QUARANTINE_COLUMNS = ['file', 'part', 'line', 'reason', 'column', 'value']
+
+# Rows rejected so far in this process: counts by (file, reason), a few examples per file and the rejected rows themselves
+_rejected = {'counts': defaultdict(int), 'examples': defaultdict(list), 'rows': []}
+
+def reject(filename, rows, column, reasons):
+    """
+    Record rows of an export that could not be used as they are, e.g. unreadable durations, with the reason for each.
+    `rows` keeps the export's row index, which gives the line numbers (and the part, for a split export indexed by
+    (part, row)); `column` is the column that was rejected.
+    """
+    if len(rows) == 0:
+        return
+    reasons = pd.Series(reasons, index=rows.index)
+    for reason, count in reasons.value_counts(sort=False).items():
+        _rejected['counts'][(filename, reason)] += count
+
+    rows = rows.copy()
+    rows.columns = rows.columns.str.strip()
+    if isinstance(rows.index, pd.MultiIndex):
+        parts = rows.index.get_level_values(0).astype(str).to_numpy()
+        lines = rows.index.get_level_values(-1).to_numpy()
+    else:
+        parts = ''
+        lines = rows.index.to_numpy()
+    quarantined = pd.DataFrame({
+        'file': filename,
+        'part': parts,
+        'line': lines + FIRST_DATA_LINE,
+        'reason': reasons.to_numpy(),
+        'column': column,
+        'value': rows[column].to_numpy()
+    }, index=rows.index)
+    quarantined = pd.concat([quarantined, rows], axis=1)
+    _rejected['rows'].append(quarantined)
+
+    examples = _rejected['examples'][filename]
+    examples.extend(quarantined[['part', 'line', 'reason', 'value']].head(EXAMPLE_LIMIT - len(examples)).itertuples(index=False, name=None))
+
+def take_rejected():
+    """Return everything rejected so far and start over, e.g. to send a worker process's rejections back to the parent."""
+    global _rejected
+    rejected = _rejected
+    _rejected = {'counts': defaultdict(int), 'examples': defaultdict(list), 'rows': []}
+    return rejected
+
+def merge_rejected(rejected):
+    """Add rejections taken with take_rejected (e.g. in a worker process) to this process's."""
+    for key, count in rejected['counts'].items():
+        _rejected['counts'][key] += count
+    for filename, examples in rejected['examples'].items():
+        _rejected['examples'][filename].extend(examples[:EXAMPLE_LIMIT - len(_rejected['examples'][filename])])
+    _rejected['rows'].extend(rejected['rows'])
+
+def collecting(func, *args):
+    """Call func(*args) and return its result with the rows it rejected, for running it in a worker process."""
+    take_rejected()
+    result = func(*args)
+    return result, take_rejected()
+
+def rejected_by(func, *args):
+    """
+    Call func(*args) and return its result with the rows it rejected as one frame (None if it rejected none),
+    e.g. to save them with a cached result. The rows stay rejected in this process too.
+    """
+    held = take_rejected()
+    try:
+        result = func(*args)
+    finally:
+        rejected = take_rejected()
+        merge_rejected(held)
+        merge_rejected(rejected)
+    return result, pd.concat(rejected['rows'], ignore_index=True) if rejected['rows'] else None
+
+def restore_rejected(rows, filename=None):
+    """
+    Reject again rows that rejected_by returned for an earlier read, e.g. when the records come from a cache instead,
+    so the run reports and quarantines them as if the file had been parsed. `filename` relabels them for another file name.
+    """
+    if rows is None or len(rows) == 0:
+        return
+    rows = rows.copy()
+    if filename is not None:
+        rows['file'] = filename
+    if 'part' in rows.columns:
+        rows['part'] = rows['part'].fillna('')
+    else:
+        rows.insert(1, 'part', '')  # Saved before split exports were told apart
+    rows['line'] = rows['line'].astype(int)
+    for (file, reason), count in rows.groupby(['file', 'reason'], sort=False).size().items():
+        _rejected['counts'][(file, reason)] += count
+    for file, file_rows in rows.groupby('file', sort=False):
+        examples = _rejected['examples'][file]
+        examples.extend(file_rows[['part', 'line', 'reason', 'value']].head(EXAMPLE_LIMIT - len(examples)).itertuples(index=False, name=None))
+    _rejected['rows'].append(rows)
+
+def read_rejected(file):
+    """Read rows saved with save_rejected back, as text like the quarantine file is read."""
+    return pd.read_csv(file, dtype=str)
+
+def save_rejected(rows, file):
+    """Save rows rejected_by returned (e.g. next to a cache entry) to a path or text buffer, as CSV."""
+    rows.to_csv(file, index=False)
+
+def print_rejected():
+    """Print the number of rejected rows per file and reason, with a few examples per file."""
+    if not _rejected['counts']:
+        print("No rejected rows.")
+        return
+
+    print("Rejected rows:")
+    by_file = defaultdict(list)
+    for (filename, reason), count in _rejected['counts'].items():
+        by_file[filename].append((reason, count))
+    for filename, reasons in by_file.items():
+        print(f"File: {filename}")
+        for reason, count in reasons:
+            print(f"  {reason}: {count}")
+        for part, line, reason, value in _rejected['examples'][filename]:
+            print(f"    {part + ', ' if part else ''}line {line}: {value!r} ({reason})")
+
+def write_quarantine(path):
+    """
+    Write every rejected row to one CSV: file, part, line, reason, the rejected column and value, then the row as it was read.
+    A copy of the file can be fixed and replayed with read_quarantine. Returns the number of rows written.
+    """
+    if not _rejected['rows']:
+        if os.path.exists(path):
+            os.remove(path)  # Don't leave an earlier run's rejects behind
+        return 0
+
+    # A replayed row that is still wrong can be rejected again by the same run; keep it once
+    rows = pd.concat(_rejected['rows'], ignore_index=True).drop_duplicates(['file', 'part', 'line'])
+    rows.to_csv(path, index=False)
+    print(f"{len(rows)} rejected rows written to {path}")
+    return len(rows)
+
+def read_quarantine(path):
+    """
+    Read a (fixed) quarantine file back as {filename: rows}, each with only the export's own columns and indexed
+    so rejected rows report their original line numbers (and parts) again.
+    """
+    rows = pd.read_csv(path, dtype=str)
+    if 'part' not in rows.columns:
+        rows.insert(1, 'part', pd.NA)  # Written before split exports were told apart
+    quarantined = {}
+    for filename, file_rows in rows.groupby('file', sort=False):
+        lines = file_rows['line'].astype(int).to_numpy() - FIRST_DATA_LINE
+        parts = file_rows['part'].fillna('')
+        # Other exports' columns are empty for this file's rows; the rejected column is kept even if it was cleared
+        used = file_rows.notna().any() | file_rows.columns.isin(file_rows['column']) | file_rows.columns.isin(QUARANTINE_COLUMNS)
+        file_rows = file_rows.loc[:, used].drop(columns=QUARANTINE_COLUMNS)
+        file_rows.index = pd.MultiIndex.from_arrays([parts, lines], names=['part', None]) if (parts != '').any() else lines
+        quarantined[filename] = file_rows
+    return quarantined
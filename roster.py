@@ -0,0 +1,51 @@
+#Marcus🗿 was here
+import pandas as pd
+
+class AgentRoster:
+    """
+    The agents.xlsx roster with every name normalized (stripped, lower-case) once.
+    Desk and department are looked up by name in a dict, and each distinct name gets an integer code
+    (its position in the roster) that results can be joined on instead of on name strings.
+    """
+
+    def __init__(self, df_agents):
+        df_agents = df_agents[df_agents['AGENTNAME'].notna()]
+        self.frame = pd.DataFrame({
+            'agent': df_agents['AGENTNAME'].str.strip().str.lower(),
+            'name': df_agents['AGENTNAME'].str.strip(),
+            'desk': df_agents['DESK'].str.strip(),
+            'department': df_agents['DEPARTMENT']
+        }).reset_index(drop=True)
+
+        # A name listed twice keeps its first code, desk and department
+        first_rows = self.frame.drop_duplicates('agent')
+        self.index = pd.Index(first_rows['agent'])
+        self.frame['code'] = self.index.get_indexer(self.frame['agent'])
+        self.lookup = dict(zip(first_rows['agent'], zip(first_rows['desk'], first_rows['department'])))
+
+    @classmethod
+    def from_excel(cls, path):
+        """Load the roster from agents.xlsx."""
+        return cls(pd.read_excel(path))
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, agent):
+        return agent in self.lookup
+
+    def desk(self, agent, default='Unknown'):
+        """Return the desk of a normalized agent name."""
+        return self.lookup[agent][0] if agent in self.lookup else default
+
+    def department(self, agent, default=None):
+        """Return the department (1 conversion, 2 retention) of a normalized agent name."""
+        return self.lookup[agent][1] if agent in self.lookup else default
+
+    def encode(self, agents):
+        """Return the integer codes of normalized agent names, -1 for names not on the roster."""
+        return self.index.get_indexer(pd.Index(agents))
+
+def as_roster(agents):
+    """Return `agents` as an AgentRoster, building one if given the agents DataFrame."""
+    return agents if isinstance(agents, AgentRoster) else AgentRoster(agents)
@@ -0,0 +1,234 @@
+#Marcus🗿 was here
+import numpy as np
+import pandas as pd
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from exports import input_parts
+from instrument import instrumented
+
+# How many parts of a split export (archive members, files in a folder) are read at once when reading whole files
+READ_THREADS = 4
+
+# Trailing extension numbers on voicespin agent names, e.g. "John Smith 1234"
+TRAILING_NUMBER_PATTERN = re.compile(r'\s*\d+\s*$')
+
+def extract_name(agent_str):
+    """Extract the name from the agent string in 'voicespin.csv'."""
+    if pd.isna(agent_str) or not isinstance(agent_str, str):
+        return ''
+
+    agent_str = agent_str.strip()
+
+    # Split the string by '-' and take the first part
+    parts = agent_str.split('-')
+    if len(parts) > 1:
+        name = parts[0].strip()
+    else:
+        name = agent_str
+
+    # Remove any trailing numbers and whitespace
+    name = TRAILING_NUMBER_PATTERN.sub('', name)
+
+    return name.lower()
+
+def split_agents(agents):
+    """Split the 'Agent(s)' cell of a voiso log into its normalized agent names."""
+    return [name.strip().lower() for name in str(agents).split('; ')] if pd.notna(agents) else []
+
+def clean_name(name):
+    """Normalize a coperato agent name."""
+    return name.strip().lower() if pd.notna(name) else ''
+
+def normalize_names(values, normalize):
+    """
+    Apply `normalize` to a column of raw agent strings, once per distinct string rather than once per row.
+    The strings are factorized into codes, the distinct ones normalized and the results mapped back by code.
+    """
+    codes, uniques = pd.factorize(values)
+    # The extra last slot holds the result for missing values, which factorize codes as -1
+    table = np.empty(len(uniques) + 1, dtype=object)
+    for code, value in enumerate(uniques):
+        table[code] = normalize(value)
+    table[-1] = normalize(np.nan)
+    return pd.Series(table[codes], index=values.index)
+
+# Every dialer export we read, by source type.
+# Call logs have one row per call and name the columns each call field is in (None where the export lacks it);
+# agent summaries are already aggregated with one row per agent.
+SOURCES = {
+    'voiso': {
+        'kind': 'calls',
+        'files': ['voiso summitlife.csv', 'voiso traling.csv', 'voiso 24x.csv'],
+        'agent': ['Agent(s)'],
+        'extract': split_agents,
+        'multi_agent': True,  # One call can list several agents, each credited with the whole call
+        'duration': 'Talk time',
+        'number': 'DNIS/To',
+        'call_id': 'UUID',
+        'status': None,
+        'time': 'Date',
+        'answered': None,  # Voiso logs only have connected calls
+        'unique_key': 'number',  # Unique calls are distinct destination numbers
+        'voicespin_durations': False
+    },
+    # The Calls History exports ('coperato X2.csv'), which app.py reads for talk time
+    'coperato': {
+        'kind': 'calls',
+        'files': ['coperato traling2.csv', 'coperato signix2.csv', 'coperato 24x2.csv'],
+        'agent': ['Name'],
+        'extract': clean_name,
+        'multi_agent': False,
+        'duration': 'Duration',
+        'number': 'Destination',
+        'call_id': 'Call ID',
+        'status': 'Disposition',
+        'time': 'Date',
+        'answered': 'ANSWERED',
+        'unique_key': 'call_id',
+        'voicespin_durations': False
+    },
+    'voicespin': {
+        'kind': 'calls',
+        'files': ['voicespin.csv'],
+        'agent': ['AGENT', 'Agent'],  # Older exports call the column 'Agent'
+        'extract': extract_name,
+        'multi_agent': False,
+        'duration': 'BILLSEC',
+        'number': 'DESTINATION',
+        'call_id': 'CALL ID',
+        'status': 'CALL STATUS',
+        'time': 'CALL DATE',
+        'answered': 'ANSWERED',
+        'unique_key': 'call_id',
+        'voicespin_durations': True  # HH:MM:00 is really MM:SS, see app.parse_durations
+    },
+    # The Agent Summary exports ('coperato X.csv'), which app2.py reads for call attempts
+    'coperato summary': {
+        'kind': 'summary',
+        'files': ['coperato traling.csv', 'coperato signix.csv', 'coperato 24x.csv'],
+        'agent': ['Name'],
+        'extract': clean_name,
+        'attempts': 'Call Attempts',
+        'unique': 'Unique'
+    }
+}
+
+# How each field is read: agent names and statuses repeat a lot, so they are categories;
+# numbers, call IDs, durations and times are text until they are parsed. None leaves the type to pandas.
+FIELD_DTYPES = {
+    'agent': 'category',
+    'status': 'category',
+    'number': str,
+    'call_id': str,
+    'duration': str,
+    'time': str,
+    'attempts': None,
+    'unique': None
+}
+
+def source_type(filename):
+    """Return which registered source a file is (e.g. 'voiso' or 'coperato summary'), or None for files we don't process."""
+    for name, spec in SOURCES.items():
+        if filename in spec['files']:
+            return name
+    return None
+
+def source_spec(filename):
+    """Return the registry entry of a file, or None for files we don't process."""
+    return SOURCES.get(source_type(filename))
+
+def is_call_log(filename):
+    """Check if a file is a call log with one row per call, rather than an agent summary or an unknown file."""
+    spec = source_spec(filename)
+    return spec is not None and spec['kind'] == 'calls'
+
+def report_untimed(untimed):
+    """
+    Warn about the calls a date range or shift leaves out because their time can't be read, given {filename: (untimed, calls)}.
+    Raises ValueError for a call log with no readable time at all: its time column (see SOURCES) is probably named differently.
+    """
+    for filename, (missing, calls) in untimed.items():
+        column = source_spec(filename)['time']
+        if calls and missing == calls:
+            raise ValueError(f"None of the {calls} calls in {filename} has a readable '{column}' time, so a date range or shift "
+                             f"can't be applied to it. Check that the export's time column is '{column}'.")
+        if missing:
+            print(f"Warning: {missing} of {calls} calls in {filename} have no readable '{column}' time and are left out of the report")
+
+def agent_column(df, spec):
+    """Return the column a source keeps its agent names in, or None if the frame has none of them."""
+    return next((column for column in spec['agent'] if column in df.columns), None)
+
+def source_columns(spec):
+    """Return {column: dtype} for every column a source is read from."""
+    columns = {column: FIELD_DTYPES['agent'] for column in spec['agent']}
+    for field in FIELD_DTYPES:
+        if field != 'agent' and spec.get(field):
+            columns[spec[field]] = FIELD_DTYPES[field]
+    return columns
+
+def read_part(file, member, spec, chunksize=None):
+    """
+    Read one CSV part (as an iterator of chunks if `chunksize` is set). Gzip is decompressed by pandas as it reads,
+    and zip members are streamed from the archive, so nothing is unpacked to disk.
+    """
+    def read(**kwargs):
+        if member is None:
+            return pd.read_csv(file, **kwargs)
+        archive = zipfile.ZipFile(file)
+        f = archive.open(member)
+        if kwargs.get('chunksize'):
+            return read_chunks(archive, f, kwargs)
+        with archive, f:
+            return pd.read_csv(f, **kwargs)
+
+    if spec is None:
+        return read(chunksize=chunksize)
+
+    # Match the header with stray spaces stripped, as the columns are cleaned after reading
+    wanted = source_columns(spec)
+    header = read(nrows=0).columns
+    usecols = [column for column in header if column.strip() in wanted]
+    dtypes = {column: wanted[column.strip()] for column in usecols if wanted[column.strip()] is not None}
+    return read(usecols=usecols, dtype=dtypes, chunksize=chunksize)
+
+def read_chunks(archive, f, kwargs):
+    """Yield the chunks of a zip member, closing the archive once they are all read."""
+    with archive, f, pd.read_csv(f, **kwargs) as reader:
+        yield from reader
+
+def part_name(file, member):
+    """Name one part of a split export: its path, followed by the member's name for a CSV inside a zip archive."""
+    return file if member is None else f"{file}/{member}"
+
+def with_part(frame, part):
+    """Index a part's rows by (part, row), so rows of a split export keep the line numbers they have in their own part."""
+    frame.index = pd.MultiIndex.from_product([[part], frame.index], names=['part', None])
+    return frame
+
+def chain_chunks(parts, spec, chunksize):
+    """Yield the chunks of every part in turn, so only one chunk of one part is held at a time."""
+    for file, member in parts:
+        for chunk in read_part(file, member, spec, chunksize):
+            yield with_part(chunk, part_name(file, member)) if len(parts) > 1 else chunk
+
+@instrumented('read csv')
+def read_source(path, filename, chunksize=None):
+    """
+    Read a file with only the columns its source uses, in compact dtypes (as an iterator of chunks if `chunksize` is set).
+    Files that aren't registered are read whole. The path can also be a .csv.gz, a .zip of one or more CSVs, a folder
+    or a glob pattern (see exports.input_files); the parts are read in order as one export, whole parts several at a time.
+    The rows of an export in several parts are indexed by (part, row within the part), see with_part.
+    """
+    spec = source_spec(filename)
+    parts = input_parts(path)
+    if chunksize:
+        return chain_chunks(parts, spec, chunksize)
+    if len(parts) == 1:
+        return read_part(*parts[0], spec)
+
+    # Decompression and parsing largely release the GIL, so independent parts read well side by side
+    with ThreadPoolExecutor(max_workers=min(READ_THREADS, len(parts))) as executor:
+        frames = list(executor.map(lambda part: read_part(*part, spec), parts))
+    return pd.concat([with_part(frame, part_name(*part)) for frame, part in zip(frames, parts)])
@@ -0,0 +1,188 @@
+#Marcus🗿 was here
+import io
+import numpy as np
+import sqlite3
+import time
+import pandas as pd
+from app import normalize_calls
+from cache import file_digest
+from dedup import call_identity
+from quarantine import read_rejected, rejected_by, restore_rejected, save_rejected
+from sources import read_source, source_spec
+
+# One row per normalized call record. Times are nanoseconds since 1970 (NULL when unreadable), `hour` is the time
+# floored to the hour (as in the hourly cube), and `identity` is the call's dedup.call_identity, which each source
+# holds once, so an export that overlaps the ones loaded before only adds its new calls
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    source TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    seconds INTEGER NOT NULL,
+    answered INTEGER NOT NULL,
+    unique_key TEXT,
+    number TEXT,
+    call_id TEXT,
+    status TEXT,
+    time INTEGER,
+    hour INTEGER,
+    identity INTEGER NOT NULL,
+    UNIQUE (source, identity)
+);
+CREATE INDEX IF NOT EXISTS calls_source_time ON calls (source, time);
+CREATE INDEX IF NOT EXISTS calls_agent ON calls (agent);
+CREATE TABLE IF NOT EXISTS files (
+    source TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    loaded TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rejected (
+    source TEXT PRIMARY KEY,
+    rows TEXT NOT NULL
+);
+"""
+
+CALL_COLUMNS = ['source', 'agent', 'seconds', 'answered', 'unique_key', 'number', 'call_id', 'status', 'time', 'hour', 'identity']
+
+NS_PER_HOUR = 3600 * 10 ** 9
+
+def open_store(path):
+    """Open (or create) the store at path."""
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    columns = [column for _, column, *_ in conn.execute('PRAGMA table_info(calls)')]
+    if columns and 'identity' not in columns:
+        conn.close()
+        raise ValueError(f"The store at {path} was built before calls were kept by identity. Delete it to rebuild it from the exports.")
+    conn.executescript(SCHEMA)
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS staging AS SELECT * FROM calls WHERE 0")
+    return conn
+
+def record_rows(records, filename):
+    """Turn one file's normalized call records into rows for the calls table."""
+    spec = source_spec(filename)
+    times = records['time'].astype('datetime64[ns]')
+    nanoseconds = pd.array(times.to_numpy().view('int64'), dtype='Int64')
+    nanoseconds[times.isna().to_numpy()] = pd.NA
+    answered = records['status'].isin([spec['answered']]).to_numpy() if spec['answered'] is not None else np.ones(len(records), dtype=bool)
+
+    rows = pd.DataFrame({
+        'source': filename,
+        'agent': records['agent'].astype(object).to_numpy(),
+        'seconds': records['seconds'].to_numpy(),
+        'answered': answered.astype('int64'),
+        'unique_key': records[spec['unique_key']].to_numpy(),
+        'number': records['number'].to_numpy(),
+        'call_id': records['call_id'].to_numpy(),
+        'status': records['status'].astype(object).to_numpy(),
+        'time': nanoseconds,
+        'hour': nanoseconds // NS_PER_HOUR * NS_PER_HOUR,
+        'identity': call_identity(records, filename).view('int64')  # SQLite integers are signed
+    })
+    # sqlite3 takes Python ints, strings and None
+    rows = rows.astype(object)
+    return rows.where(rows.notna(), None).itertuples(index=False, name=None)
+
+def stage_file(conn, path, filename, chunksize=100000):
+    """Read a call log into the staging table, `chunksize` rows at a time."""
+    insert = f"INSERT INTO staging VALUES ({', '.join('?' * len(CALL_COLUMNS))})"
+    for chunk in read_source(path, filename, chunksize):
+        conn.executemany(insert, record_rows(normalize_calls(chunk, filename), filename))
+
+def restore_stored_rejected(conn, filenames):
+    """Reject again the rows each of these files had rejected when it was loaded, so a run that reads nothing still reports them."""
+    for filename in filenames:
+        stored = conn.execute('SELECT rows FROM rejected WHERE source = ?', (filename,)).fetchone()
+        if stored is not None:
+            restore_rejected(read_rejected(io.StringIO(stored[0])), filename)
+
+def load_file(conn, path, filename, chunksize=100000):
+    """
+    Bulk-load a call log's normalized records, `chunksize` rows at a time, and return how many new calls were added.
+    The same content is never loaded twice, and calls already in the store for that source (by identity, see
+    dedup.call_identity) are skipped, so overlapping exports and exports that split an hour each add only their new calls.
+    The rows rejected while loading are kept with the file and rejected again whenever it is skipped.
+    """
+    digest = file_digest(path)
+    stored = conn.execute('SELECT digest FROM files WHERE source = ?', (filename,)).fetchone()
+    if stored is not None and stored[0] == digest:
+        print(f"{filename} is already in the store")
+        restore_stored_rejected(conn, [filename])
+        return 0
+
+    # One transaction, so a failed load leaves the store as it was
+    with conn:
+        conn.execute('DELETE FROM staging')
+        _, rejected = rejected_by(stage_file, conn, path, filename, chunksize)
+        if rejected is not None:
+            rows = io.StringIO()
+            save_rejected(rejected, rows)
+            conn.execute('INSERT OR REPLACE INTO rejected VALUES (?, ?)', (filename, rows.getvalue()))
+        else:
+            conn.execute('DELETE FROM rejected WHERE source = ?', (filename,))
+
+        staged = conn.execute('SELECT COUNT(*) FROM staging').fetchone()[0]
+        loaded = conn.execute('INSERT OR IGNORE INTO calls SELECT * FROM staging').rowcount
+        conn.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?)', (filename, digest, time.strftime('%Y-%m-%d %H:%M:%S')))
+        conn.execute('DELETE FROM staging')
+    print(f"{loaded} call records of {filename} loaded into the store ({staged - loaded} were already in it)")
+    return loaded
+
+def time_filter(start=None, end=None):
+    """Return the SQL condition and parameters for calls from `start` (inclusive) to `end` (exclusive), which leaves out calls without a time (see store_untimed)."""
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append('time >= ?')
+        params.append(pd.Timestamp(start).value)
+    if end is not None:
+        conditions.append('time < ?')
+        params.append(pd.Timestamp(end).value)
+    return ''.join(f" AND {condition}" for condition in conditions), params
+
+def store_untimed(conn, filenames):
+    """Return {filename: (calls without a time, calls)} for the given files in the store (see sources.report_untimed)."""
+    rows = conn.execute('SELECT source, SUM(time IS NULL), COUNT(*) FROM calls GROUP BY source').fetchall()
+    return {source: (missing, calls) for source, missing, calls in rows if source in filenames}
+
+def stored_sources(conn):
+    """Return the names of the files that have been loaded into the store."""
+    return {source for source, in conn.execute('SELECT source FROM files')}
+
+def store_durations(conn, filenames, start=None, end=None):
+    """Return (totals, filename) pairs for the given files over a date range, as app.load_all_durations gives them."""
+    condition, params = time_filter(start, end)
+    stored = stored_sources(conn)
+    per_file_totals = []
+    for filename in filenames:
+        if filename not in stored:
+            continue
+        # Agents in order of their first call, as pandas' groupby(sort=False) gives them
+        rows = conn.execute(
+            f"SELECT agent, SUM(seconds) FROM calls WHERE source = ? AND answered = 1{condition} GROUP BY agent ORDER BY MIN(rowid)",
+            [filename] + params
+        ).fetchall()
+        agents = [agent for agent, _ in rows]
+        seconds = [total for _, total in rows]
+        per_file_totals.append((pd.DataFrame({'agent': pd.Series(agents, dtype=object), 'filename': filename, 'seconds': pd.Series(seconds, dtype='int64')}), filename))
+    return per_file_totals
+
+def store_counts(conn, filenames, start=None, end=None):
+    """Return the per-file dicts of attempts and '<agent>_unique' counts over a date range (None for files not stored), as app2.load_all_counts gives them."""
+    condition, params = time_filter(start, end)
+    stored = stored_sources(conn)
+    all_counts = []
+    for filename in filenames:
+        if filename not in stored:
+            all_counts.append(None)
+            continue
+        # Calls without an agent name count towards nobody's attempts
+        rows = conn.execute(
+            f"SELECT agent, COUNT(*), COUNT(DISTINCT unique_key) FROM calls WHERE source = ? AND agent != ''{condition} GROUP BY agent ORDER BY MIN(rowid)",
+            [filename] + params
+        ).fetchall()
+        counts = {agent: attempts for agent, attempts, _ in rows}
+        for agent, _, unique_value in rows:
+            if unique_value:
+                counts[f"{agent}_unique"] = unique_value
+        all_counts.append(counts)
+    return all_counts
@@ -0,0 +1,164 @@
+#Marcus🗿 was here
+import numpy as np
+import os
+import pandas as pd
+from theapp import desk_order_conversion, desk_order_retention
+
+FIRST_NAMES = [
+    'Aarav', 'Abel', 'Ajay', 'Alice', 'Ana', 'Chloe', 'Daniel', 'Elena', 'Emma', 'Hana', 'Isabel', 'Jin', 'Julien',
+    'Kenji', 'Lea', 'Liam', 'Lucas', 'Maria', 'Marc', 'Mina', 'Noah', 'Olivia', 'Priya', 'Rahul', 'Sara', 'Stella',
+    'Tomas', 'Vincent', 'Yuna', 'Zoe'
+]
+LAST_NAMES = [
+    'Bernard', 'Brown', 'Costa', 'Dubois', 'Garcia', 'Ito', 'Jean', 'Kang', 'Kapoor', 'Kim', 'Logan', 'Martin',
+    'Morris', 'Nakamura', 'Perez', 'Renard', 'Rossi', 'Santos', 'Savanier', 'Shah', 'Silva', 'Singh', 'Tanaka', 'Wilson'
+]
+
+# Share of rows with an agent missing from the roster, an unreadable duration, or an unanswered status
+UNKNOWN_AGENT_RATE = 0.03
+BAD_DURATION_RATE = 0.01
+UNANSWERED_RATE = 0.35
+
+# Rows are generated and written this many at a time, so any size fits in memory
+CHUNK_ROWS = 1000000
+
+def make_roster(n_agents, rng):
+    """Return an agents.xlsx-style roster (AGENTNAME, DESK, DEPARTMENT) of distinct made-up names."""
+    names = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+    names += [f"{name} {suffix}" for suffix in range(2, n_agents // len(names) + 2) for name in names]
+    names = list(rng.choice(np.array(names, dtype=object), n_agents, replace=False))
+
+    departments = rng.choice([1, 2], n_agents, p=[0.6, 0.4])
+    desks = np.where(departments == 1, rng.choice(desk_order_conversion, n_agents), rng.choice(desk_order_retention, n_agents))
+    return pd.DataFrame({'AGENTNAME': names, 'DESK': desks, 'DEPARTMENT': departments})
+
+def name_variants(names):
+    """Spell each name the ways the exports do: as listed, upper case, lower case with stray spaces."""
+    names = np.asarray(names, dtype=object)
+    return np.concatenate([names, np.char.upper(names.astype(str)).astype(object), np.array([f" {name.lower()} " for name in names], dtype=object)])
+
+def pick_agents(spellings, unknown, n, rng):
+    """Pick n agent names, UNKNOWN_AGENT_RATE of them not on the roster."""
+    agents = rng.choice(spellings, n)
+    is_unknown = rng.random(n) < UNKNOWN_AGENT_RATE
+    agents[is_unknown] = rng.choice(unknown, is_unknown.sum())
+    return agents
+
+def make_durations(n, rng, voicespin=False):
+    """Return n talk times as HH:MM:SS or MM:SS text, with missing and malformed values mixed in."""
+    # Exports repeat a limited set of durations, so draw them from a pool
+    pool_seconds = rng.gamma(1.5, 120, 20000).astype(int)
+    hours, minutes, seconds = pool_seconds // 3600, pool_seconds % 3600 // 60, pool_seconds % 60
+    pool = np.array([f"{h:02d}:{m:02d}:{s:02d}" for h, m, s in zip(hours, minutes, seconds)], dtype=object)
+    if voicespin:
+        # Voicespin writes some MM:SS values as MM:SS:00
+        pool[::2] = np.array([f"{m + 60 * h:02d}:{s:02d}:00" for h, m, s in zip(hours[::2], minutes[::2], seconds[::2])], dtype=object)
+    else:
+        pool[::3] = np.array([f"{m + 60 * h:02d}:{s:02d}" for h, m, s in zip(hours[::3], minutes[::3], seconds[::3])], dtype=object)
+
+    durations = rng.choice(pool, n)
+    bad = rng.random(n) < BAD_DURATION_RATE
+    durations[bad] = rng.choice(np.array([None, '', 'x:y', '1:2:3:4', '  ', '--'], dtype=object), bad.sum())
+    return durations
+
+def make_times(n, rng, start='2024-10-01', days=30):
+    """Return n call times spread over `days` days from `start`."""
+    return pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days * 86400, n), unit='s')
+
+def make_numbers(n, rng, distinct):
+    """Return n destination numbers drawn from `distinct` possible ones."""
+    return (rng.integers(0, distinct, n) + 4400000000).astype(str)
+
+def voiso_chunk(spellings, unknown, n, offset, rng):
+    """Generate n voiso rows, some with several agents in 'Agent(s)' and some with none."""
+    agent_counts = rng.choice([0, 1, 2, 3], n, p=[0.05, 0.8, 0.12, 0.03])
+    agents = pick_agents(spellings, unknown, n, rng)
+    for extra in [2, 3]:
+        more = agent_counts >= extra
+        agents[more] = agents[more] + '; ' + pick_agents(spellings, unknown, more.sum(), rng)
+    agents[agent_counts == 0] = None
+    return pd.DataFrame({
+        'Date': make_times(n, rng),
+        'Agent(s)': agents,
+        'DNIS/To': make_numbers(n, rng, max(n // 3, 1000)),
+        'Talk time': make_durations(n, rng),
+        'UUID': np.char.add('v-', np.arange(offset, offset + n).astype(str))
+    })
+
+def coperato_chunk(spellings, unknown, n, offset, rng):
+    """Generate n coperato Calls History rows with answered and unanswered dispositions."""
+    return pd.DataFrame({
+        'Date': make_times(n, rng),
+        'Name': pick_agents(spellings, unknown, n, rng),
+        'Destination': make_numbers(n, rng, max(n // 3, 1000)),
+        'Call ID': np.char.add('c-', np.arange(offset, offset + n).astype(str)),
+        'Duration': make_durations(n, rng),
+        'Disposition': np.where(rng.random(n) < UNANSWERED_RATE, rng.choice(['NO ANSWER', 'BUSY', 'FAILED'], n), 'ANSWERED')
+    })
+
+def voicespin_chunk(spellings, unknown, n, offset, rng):
+    """Generate n voicespin rows with extension numbers after the agent names."""
+    agents = pick_agents(spellings, unknown, n, rng)
+    extensions = rng.integers(100, 999, n).astype(str)
+    style = rng.integers(0, 3, n)
+    agents = np.where(style == 0, agents + ' ' + extensions, np.where(style == 1, agents + ' - ' + extensions, agents))
+    return pd.DataFrame({
+        'CALL ID': np.char.add('s-', np.arange(offset, offset + n).astype(str)),
+        'CALL DATE': make_times(n, rng),
+        'AGENT': agents,
+        'DESTINATION': make_numbers(n, rng, max(n // 3, 1000)),
+        'BILLSEC': make_durations(n, rng, voicespin=True),
+        'CALL STATUS': np.where(rng.random(n) < UNANSWERED_RATE, 'NO ANSWER', 'ANSWERED')
+    })
+
+def coperato_summary(spellings, unknown, rng):
+    """Generate a coperato Agent Summary with one row per agent spelling."""
+    names = np.concatenate([spellings, unknown])
+    return pd.DataFrame({
+        'Name': names,
+        'Call Attempts': rng.integers(0, 400, len(names)),
+        'Unique': rng.integers(0, 150, len(names))
+    })
+
+def write_chunks(path, make_chunk, rows, spellings, unknown, rng):
+    """Write `rows` generated rows to a CSV, CHUNK_ROWS at a time."""
+    for offset in range(0, rows, CHUNK_ROWS):
+        chunk = make_chunk(spellings, unknown, min(CHUNK_ROWS, rows - offset), offset, rng)
+        chunk.to_csv(path, index=False, mode='w' if offset == 0 else 'a', header=offset == 0)
+
+def generate(out_dir, rows, n_agents=300, seed=0):
+    """
+    Write a seeded set of exports to out_dir: agents.xlsx plus every voiso, coperato and voicespin file the scripts read,
+    with `rows` rows in each call log. Returns the file names written.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    roster = make_roster(n_agents, rng)
+    roster.to_excel(os.path.join(out_dir, 'agents.xlsx'), index=False)
+    spellings = name_variants(roster['AGENTNAME'])
+    unknown = np.array([f"Ghost Agent {i}" for i in range(max(n_agents // 20, 1))] + ['support desk'], dtype=object)
+
+    filenames = ['agents.xlsx']
+    for filename, make_chunk in [
+        ('voiso summitlife.csv', voiso_chunk), ('voiso traling.csv', voiso_chunk), ('voiso 24x.csv', voiso_chunk),
+        ('coperato traling2.csv', coperato_chunk), ('coperato signix2.csv', coperato_chunk), ('coperato 24x2.csv', coperato_chunk),
+        ('voicespin.csv', voicespin_chunk)
+    ]:
+        write_chunks(os.path.join(out_dir, filename), make_chunk, rows, spellings, unknown, rng)
+        filenames.append(filename)
+    for filename in ['coperato traling.csv', 'coperato signix.csv', 'coperato 24x.csv']:
+        coperato_summary(spellings, unknown, rng).to_csv(os.path.join(out_dir, filename), index=False)
+        filenames.append(filename)
+    return filenames
+
+
+if __name__ == "__main__":
+    # Where to write the exports, how many rows each call log gets and the seed that makes them reproducible
+    OUT_DIR = 'synthetic'
+    ROWS = 100000
+    AGENTS = 300
+    SEED = 0
+
+    generate(OUT_DIR, ROWS, AGENTS, SEED)
+    print(f"Synthetic exports with {ROWS} rows per call log written to {OUT_DIR}")
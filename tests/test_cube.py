@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+from cube import add_to_cube, cube_untimed, empty_cube, records_to_cube
+from sources import report_untimed
+
+def voicespin_records(calls):
+    """Normalized voicespin call records from (call ID, time, seconds) triples."""
+    return pd.DataFrame({
+        'agent': pd.Series(['ann'] * len(calls), dtype='category'),
+        'seconds': [seconds for _, _, seconds in calls],
+        'number': pd.array([f"44{call_id}" for call_id, _, _ in calls], dtype='string'),
+        'call_id': pd.array([call_id for call_id, _, _ in calls], dtype='string'),
+        'status': pd.Series(['ANSWERED'] * len(calls), dtype='category'),
+        'time': pd.to_datetime([time for _, time, _ in calls])
+    })
+
+def add_export(cube, calls):
+    return add_to_cube(cube, records_to_cube(voicespin_records(calls), 'voicespin.csv', cube['ids']['identity'].to_numpy()))
+
+def test_exports_splitting_an_hour_add_up():
+    cube = add_export(empty_cube(), [('a', '2024-10-01 10:10:00', 60)])
+    cube = add_export(cube, [('b', '2024-10-01 10:40:00', 120)])
+    assert cube['totals'][['seconds', 'attempts']].sum().tolist() == [180, 2]
+    assert len(cube['totals']) == 1
+
+def test_overlapping_exports_count_each_call_once():
+    cube = add_export(empty_cube(), [('a', '2024-10-01 10:10:00', 60), ('b', '2024-10-01 10:40:00', 120)])
+    # The next pull repeats the end of the last one, and a call is listed twice in it
+    cube = add_export(cube, [('b', '2024-10-01 10:40:00', 120), ('c', '2024-10-01 11:05:00', 30), ('c', '2024-10-01 11:05:00', 30)])
+    assert cube['totals']['seconds'].tolist() == [180, 30]
+    assert cube['totals']['attempts'].tolist() == [2, 1]
+    assert len(cube['keys']) == 3
+
+def test_untimed_calls_are_reported():
+    cube = add_export(empty_cube(), [('a', '2024-10-01 10:10:00', 60), ('b', None, 120)])
+    assert cube_untimed(cube, ['voicespin.csv']) == {'voicespin.csv': (1, 2)}
+    report_untimed(cube_untimed(cube, ['voicespin.csv']))
+    with pytest.raises(ValueError, match="'CALL DATE'"):
+        report_untimed(cube_untimed(add_export(empty_cube(), [('b', None, 120)]), ['voicespin.csv']))
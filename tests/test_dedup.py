@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app import load_call_records
+from dedup import SeenCalls
+
+def voicespin_records(call_ids, agents=None):
+    """Normalized voicespin call records with the given call IDs."""
+    count = len(call_ids)
+    return pd.DataFrame({
+        'agent': agents if agents is not None else ['ann'] * count,
+        'seconds': np.arange(count, dtype='int64'),
+        'number': [f"44{i}" for i in range(count)],
+        'call_id': pd.array(call_ids, dtype='string'),
+        'status': ['ANSWERED'] * count,
+        'time': pd.Timestamp('2024-10-01') + pd.to_timedelta(np.arange(count), unit='s')
+    })
+
+@pytest.mark.parametrize('bloom', [False, True])
+def test_save_and_reload(tmp_path, bloom):
+    path = str(tmp_path / 'seen.npy')
+    seen = SeenCalls(path, bloom)
+    assert len(seen.drop_seen(voicespin_records(['a', 'b', 'c']), 'voicespin.csv')) == 3
+    seen.save()
+
+    reloaded = SeenCalls(path, bloom)
+    new = reloaded.drop_seen(voicespin_records(['b', 'c', 'd', 'e']), 'voicespin.csv')
+    assert new['call_id'].tolist() == ['d', 'e']
+    reloaded.save()
+
+    assert len(SeenCalls(path, bloom).drop_seen(voicespin_records(['a', 'b', 'c', 'd', 'e']), 'voicespin.csv')) == 0
+
+def test_identity_includes_file_and_agent(tmp_path):
+    seen = SeenCalls(str(tmp_path / 'seen.npy'))
+    seen.drop_seen(voicespin_records(['a']), 'voicespin.csv')
+
+    # The same call ID from another export, or for another agent on the same call, is a different call
+    assert len(seen.drop_seen(voicespin_records(['a']), 'coperato traling2.csv')) == 1
+    assert len(seen.drop_seen(voicespin_records(['a'], agents=['bob']), 'voicespin.csv')) == 1
+    assert len(seen.drop_seen(voicespin_records(['a']), 'voicespin.csv')) == 0
+
+def test_contains_after_bloom_grows(tmp_path):
+    seen = SeenCalls(str(tmp_path / 'seen.npy'), bloom=True)
+    hashes = np.arange(1, 300000, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    seen.add(hashes)
+    assert seen.contains(hashes).all()
+    assert not seen.contains(hashes + np.uint64(1)).any()
+
+def test_overlapping_parts_are_read_once(tmp_path):
+    # Two daily parts of a split export that both hold call 'b'
+    parts = tmp_path / 'voicespin'
+    parts.mkdir()
+    header = "CALL ID,CALL DATE,AGENT,DESTINATION,BILLSEC,CALL STATUS\n"
+    (parts / '1.csv').write_text(header + "a,2024-10-01 23:10:00,Ann 1,441,01:00:00,ANSWERED\nb,2024-10-01 23:50:00,Ann 1,442,02:00:00,ANSWERED\n")
+    (parts / '2.csv').write_text(header + "b,2024-10-01 23:50:00,Ann 1,442,02:00:00,ANSWERED\nc,2024-10-02 00:20:00,Ann 1,443,00:30:00,ANSWERED\n")
+    records = load_call_records(str(parts), 'voicespin.csv')
+    assert records['call_id'].tolist() == ['a', 'b', 'c']
+    assert records['seconds'].sum() == 210
@@ -0,0 +1,52 @@
+import pickle
+import numpy as np
+import pytest
+from distinct import DistinctCounter
+
+def test_exact_counts_and_merge():
+    first = DistinctCounter('exact')
+    first.add(['ann', 'ann', 'bob', None, 'ann'], ['1', '2', '1', '3', '1'])
+    second = DistinctCounter('exact')
+    second.add(['ann', 'cid', 'bob'], ['2', '9', None])
+
+    first.merge(second)
+    assert first.counts() == {'ann': 2, 'bob': 1, 'cid': 1}
+    assert first.count('nobody') == 0
+
+def test_exact_pickle_round_trip():
+    counter = DistinctCounter('exact')
+    counter.add(['ann', 'bob', 'ann'], ['1', '2', '3'])
+    restored = pickle.loads(pickle.dumps(counter))
+    assert restored.counts() == counter.counts()
+
+    # A restored counter keeps merging as the original would, as the month-to-date state does
+    more = DistinctCounter('exact')
+    more.add(['ann'], ['3'])
+    restored.merge(more)
+    assert restored.counts() == {'ann': 2, 'bob': 1}
+
+def test_hll_estimates_and_round_trips():
+    keys = np.arange(50000).astype(str)
+    split = DistinctCounter('hll')
+    split.add(['ann'] * 30000, keys[:30000])
+    other = DistinctCounter('hll')
+    other.add(['ann'] * 30000, keys[20000:])  # 10000 keys overlap
+
+    restored = pickle.loads(pickle.dumps(split))
+    restored.merge(other)
+    assert restored.count('ann') == pytest.approx(50000, rel=0.03)
+
+    whole = DistinctCounter('hll')
+    whole.add(['ann'] * len(keys), keys)
+    assert restored.count('ann') == whole.count('ann')
+
+def test_small_hll_counts_are_close():
+    counter = DistinctCounter('hll')
+    counter.add(['ann'] * 100, [str(key % 40) for key in range(100)])
+    assert counter.count('ann') == 40
+
+def test_modes_do_not_mix():
+    with pytest.raises(ValueError):
+        DistinctCounter('exact').merge(DistinctCounter('hll'))
+    with pytest.raises(ValueError):
+        DistinctCounter('approximate')
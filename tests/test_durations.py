@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app import convert_to_seconds, parse_durations
+
+def baseline_seconds(duration_str, is_voicespin=False):
+    """The per-value convert_to_seconds parse_durations replaced, without its warnings; None where it fell back to 0."""
+    if pd.isna(duration_str) or not isinstance(duration_str, str):
+        return None
+    duration_str = duration_str.strip()
+    if not duration_str:
+        return None
+    parts = duration_str.split(':')
+    if is_voicespin and len(parts) == 3 and parts[-1] == '00':
+        parts.pop()
+    try:
+        if len(parts) == 2:
+            minutes, seconds = map(int, parts)
+            return minutes * 60 + seconds
+        if len(parts) == 3:
+            hours, minutes, seconds = map(int, parts)
+            return hours * 3600 + minutes * 60 + seconds
+    except ValueError:
+        pass
+    return None
+
+VALUES = [
+    # MM:SS and HH:MM:SS
+    '00:00', '0:07', '12:34', '125:05', '00:00:00', '01:02:03', '10:00:59', '100:00:00',
+    # Voicespin's MM:SS:00, and values only ending in :00
+    '12:34:00', '00:45:00', '01:00:00', '1:2:00', '12:00',
+    # Spaces, signs and underscores, as int() takes them
+    ' 01:02 ', '1 : 2', '\t3:04\n', '+1:-2', '-0:30', '1_0:30', '1:2_0:00',
+    # Unreadable values
+    None, np.nan, '', '   ', 'x:y', '1:2:3:4', '--', '5', '1:', ':5', '1__0:30', '_1:30', '1:2:3:00', '1.5:30', 'abc',
+]
+
+@pytest.mark.parametrize('is_voicespin', [False, True])
+def test_matches_baseline(is_voicespin):
+    seconds, invalid = parse_durations(VALUES, is_voicespin)
+    expected = [baseline_seconds(value, is_voicespin) for value in VALUES]
+
+    assert seconds.dtype == np.int64
+    assert seconds.tolist() == [0 if value is None else value for value in expected]
+    assert invalid.tolist() == [value is None for value in expected]
+
+def test_voicespin_trailing_zeros():
+    seconds, invalid = parse_durations(['12:34:00', '01:02:03', '01:00:00'], is_voicespin=True)
+    assert seconds.tolist() == [12 * 60 + 34, 3723, 60]
+    assert not invalid.any()
+
+    seconds, _ = parse_durations(['12:34:00'])
+    assert seconds.tolist() == [12 * 3600 + 34 * 60]
+
+def test_repeated_and_missing_values():
+    values = pd.Series(['1:00', None, '1:00', 'bad', '1:00', np.nan])
+    seconds, invalid = parse_durations(values)
+    assert seconds.tolist() == [60, 0, 60, 0, 60, 0]
+    assert invalid.tolist() == [False, True, False, True, False, True]
+
+def test_empty_column():
+    seconds, invalid = parse_durations(pd.Series([], dtype=object))
+    assert len(seconds) == 0 and len(invalid) == 0
+
+def test_convert_to_seconds_parses_one_value(capsys):
+    assert [convert_to_seconds(value) for value in ['01:02:03', ' 12:34 ', None, 'x:y', 5]] == [3723, 754, 0, 0, 0]
+    assert convert_to_seconds('12:34:00', is_voicespin=True) == 754
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,48 @@
+import pandas as pd
+from app import load_incremental_durations
+from incremental import take_new_records
+
+def voicespin_records(calls):
+    """Normalized voicespin call records from (call ID, time) pairs."""
+    return pd.DataFrame({
+        'agent': ['ann'] * len(calls),
+        'seconds': [60] * len(calls),
+        'number': ['441'] * len(calls),
+        'call_id': pd.array([call_id for call_id, _ in calls], dtype='string'),
+        'status': ['ANSWERED'] * len(calls),
+        'time': pd.to_datetime([time for _, time in calls])
+    })
+
+def new_ids(entry, calls):
+    return take_new_records(entry, voicespin_records(calls), 'voicespin.csv')['call_id'].tolist()
+
+def test_calls_at_the_watermark_are_counted_once():
+    entry = {'watermark': None}
+    assert new_ids(entry, [('a', '2024-10-01 09:00:00'), ('b', '2024-10-01 10:00:00')]) == ['a', 'b']
+
+    # The next pull overlaps the last one; 'c' happened in the same second as 'b'
+    assert new_ids(entry, [('a', '2024-10-01 09:00:00'), ('b', '2024-10-01 10:00:00'), ('c', '2024-10-01 10:00:00')]) == ['c']
+    assert new_ids(entry, [('b', '2024-10-01 10:00:00'), ('c', '2024-10-01 10:00:00'), ('d', '2024-10-01 10:00:00')]) == ['d']
+    assert new_ids(entry, [('d', '2024-10-01 10:00:00'), ('e', '2024-10-01 11:00:00')]) == ['e']
+    assert entry['watermark'] == pd.Timestamp('2024-10-01 11:00:00')
+
+def test_state_without_remembered_calls_stays_strict():
+    entry = {'watermark': pd.Timestamp('2024-10-01 10:00:00')}
+    assert new_ids(entry, [('b', '2024-10-01 10:00:00'), ('c', '2024-10-01 11:00:00')]) == ['c']
+    assert new_ids(entry, [('c', '2024-10-01 11:00:00'), ('d', '2024-10-01 11:00:00')]) == ['d']
+
+def test_export_without_times_replaces_the_file():
+    entry = {'watermark': pd.Timestamp('2024-10-01 10:00:00'), 'seconds': {'ann': 60}}
+    assert new_ids(entry, [('a', None), ('b', None)]) == ['a', 'b']
+    assert entry == {'watermark': pd.Timestamp('2024-10-01 10:00:00')}
+
+def test_export_without_times_replaces_its_call_lengths(tmp_path):
+    export = tmp_path / 'voicespin.csv'
+    export.write_text("CALL ID,CALL DATE,AGENT,DESTINATION,BILLSEC,CALL STATUS\n"
+                      "a,,Ann 1,441,01:00:00,ANSWERED\n"
+                      "b,,Ann 1,442,00:20:00,ANSWERED\n")
+    state = str(tmp_path / 'state.pkl')
+    for _ in range(2):
+        per_file_totals, lengths = load_incremental_durations([str(export)], ['voicespin.csv'], state)
+    assert per_file_totals[0][0]['seconds'].tolist() == [80]
+    assert lengths.drop(columns='longest').to_numpy().sum() == 2
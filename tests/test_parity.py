@@ -0,0 +1,106 @@
+import pandas as pd
+import pytest
+from app import load_all_durations, run_durations
+from app2 import load_all_counts, run_attempts
+from exports import CALL_FILES, DURATION_FILES, export_path
+from pipeline import load_sources, run_all
+from quarantine import take_rejected
+from theapp import run_report
+
+VOISO = "Date,Agent(s),DNIS/To,Talk time,UUID\n"
+COPERATO_CALLS = "Date,Name,Destination,Call ID,Duration,Disposition\n"
+COPERATO_SUMMARY = "Name,Call Attempts,Unique\n"
+VOICESPIN = "CALL ID,CALL DATE,AGENT,DESTINATION,BILLSEC,CALL STATUS\n"
+
+# A few calls per export, with the things each reader has to get right: repeated calls, names written
+# differently, agents missing from the roster, durations that can't be read and calls that weren't answered
+EXPORTS = {
+    'voiso summitlife.csv': VOISO + "2024-10-01 09:00:00,Ann Lee,441,00:05:21,v-0\n"
+                                    "2024-10-01 09:10:00,BOB RAY,442,02:17,v-1\n"
+                                    "2024-10-01 09:10:00,BOB RAY,442,02:17,v-1\n"
+                                    "2024-10-01 09:20:00,Ghost Agent,443,01:00,v-2\n",
+    'voiso traling.csv': VOISO + "2024-10-02 10:00:00,Cid Moe,441,03:48,v-0\n"
+                                 "2024-10-02 10:05:00,ann lee,444,later,v-1\n",
+    'voiso 24x.csv': VOISO + "2024-10-03 11:00:00,Bob Ray,445,00:01:05,v-0\n",
+    'coperato traling2.csv': COPERATO_CALLS + "2024-10-01 12:00:00, ann lee ,446,c-0,01:29,ANSWERED\n"
+                                              "2024-10-01 12:05:00,Cid Moe,447,c-1,00:50,BUSY\n",
+    'coperato signix2.csv': COPERATO_CALLS + "2024-10-02 13:00:00,Bob Ray,441,c-0,00:03:10,ANSWERED\n",
+    'coperato 24x2.csv': COPERATO_CALLS + "2024-10-03 14:00:00,Cid Moe,448,c-0,00:02:57,ANSWERED\n"
+                                          "2024-10-03 14:10:00,Cid Moe,449,c-1,00:00:40,ANSWERED\n",
+    'coperato traling.csv': COPERATO_SUMMARY + "Ann Lee,30,5\nCid Moe,12,4\n",
+    'coperato signix.csv': COPERATO_SUMMARY + "Bob Ray,22,11\n",
+    'coperato 24x.csv': COPERATO_SUMMARY + "Cid Moe,9,3\nGhost Agent,4,1\n",
+    'voicespin.csv': VOICESPIN + "s-0,2024-10-01 15:00:00,Ann Lee - 522,441,02:15:00,ANSWERED\n"
+                                 "s-1,2024-10-01 15:10:00, bob ray  567,450,01:51:00,ANSWERED\n"
+                                 "s-2,2024-10-01 15:20:00,Cid Moe 12,451,00:30:00,NO ANSWER\n"
+}
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for filename, text in EXPORTS.items():
+        (tmp_path / filename).write_text(text)
+    pd.DataFrame({
+        'AGENTNAME': ['Ann Lee', 'Bob Ray', 'Cid Moe'],
+        'DESK': ['Team A', 'Team A', 'Team B'],
+        'DEPARTMENT': [1, 1, 2]
+    }).to_excel(tmp_path / 'agents.xlsx', index=False)
+    take_rejected()
+    yield str(tmp_path)
+    take_rejected()
+
+def paths(data_dir, filenames):
+    return [export_path(data_dir, filename) for filename in filenames]
+
+def sorted_totals(per_file_totals):
+    return [(totals.sort_values(list(totals.columns)).reset_index(drop=True), filename) for totals, filename in per_file_totals]
+
+def assert_same_totals(left, right):
+    assert [filename for _, filename in left] == [filename for _, filename in right]
+    for (left_totals, _), (right_totals, _) in zip(sorted_totals(left), sorted_totals(right)):
+        pd.testing.assert_frame_equal(left_totals, right_totals, check_dtype=False, check_categorical=False)
+
+def assert_same_workbooks(left, right):
+    left_sheets = pd.read_excel(left, sheet_name=None)
+    right_sheets = pd.read_excel(right, sheet_name=None)
+    assert list(left_sheets) == list(right_sheets)
+    for name in left_sheets:
+        pd.testing.assert_frame_equal(left_sheets[name], right_sheets[name])
+
+def test_chunked_and_parallel_durations_match_serial(data_dir):
+    filenames = DURATION_FILES
+    serial, serial_lengths = load_all_durations(paths(data_dir, filenames), filenames)
+    rejected = take_rejected()['rows']
+    assert len(rejected) == 1
+    for chunksize, workers in [(2, 1), (None, 2), (2, 2)]:
+        per_file_totals, lengths = load_all_durations(paths(data_dir, filenames), filenames, chunksize, workers)
+        assert_same_totals(per_file_totals, serial)
+        pd.testing.assert_frame_equal(lengths, serial_lengths)
+        assert len(take_rejected()['rows']) == len(rejected)
+
+def test_chunked_and_parallel_counts_match_serial(data_dir):
+    filenames = CALL_FILES
+    serial, serial_destinations = load_all_counts(paths(data_dir, filenames), filenames, unique_mode='exact')
+    for chunksize, workers in [(2, 1), (None, 2), (2, 2)]:
+        counts, destinations = load_all_counts(paths(data_dir, filenames), filenames, chunksize, workers, unique_mode='exact')
+        assert counts == serial
+        assert destinations.counts() == serial_destinations.counts()
+
+def test_parallel_sources_match_serial(data_dir):
+    serial_totals, serial_counts, _, serial_lengths = load_sources(data_dir)
+    per_file_totals, call_counts, _, lengths = load_sources(data_dir, chunksize=2, workers=2)
+    assert_same_totals(per_file_totals, serial_totals)
+    assert call_counts == serial_counts
+    pd.testing.assert_frame_equal(lengths, serial_lengths)
+
+def test_pipeline_matches_the_three_scripts(data_dir, tmp_path_factory):
+    out = tmp_path_factory.mktemp('out')
+    run_durations(data_dir, output=str(out / 'durations.xlsx'), quarantine_path=str(out / 'scripts_rejected.csv'))
+    run_attempts(data_dir, output=str(out / 'calls.xlsx'))
+    run_report(f"{data_dir}/agents.xlsx", str(out / 'calls.xlsx'), str(out / 'durations.xlsx'), output=str(out / 'scripts.xlsx'))
+
+    run_all(data_dir, output=str(out / 'pipeline.xlsx'), quarantine_path=str(out / 'pipeline_rejected.csv'),
+            duration_output=str(out / 'pipeline_durations.xlsx'), call_output=str(out / 'pipeline_calls.xlsx'))
+    assert_same_workbooks(out / 'pipeline.xlsx', out / 'scripts.xlsx')
+    assert_same_workbooks(out / 'pipeline_durations.xlsx', out / 'durations.xlsx')
+    assert_same_workbooks(out / 'pipeline_calls.xlsx', out / 'calls.xlsx')
+    assert (out / 'pipeline_rejected.csv').read_text() == (out / 'scripts_rejected.csv').read_text()
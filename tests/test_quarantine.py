@@ -0,0 +1,47 @@
+import io
+import pandas as pd
+import quarantine
+from quarantine import read_rejected, reject, rejected_by, restore_rejected, save_rejected, take_rejected, write_quarantine
+
+def reject_bad_rows():
+    rows = pd.DataFrame({'BILLSEC': ['x:y', None], 'AGENT': ['Ann', 'Bob']}, index=[3, 7])
+    reject('voicespin.csv', rows, 'BILLSEC', ['malformed duration', 'missing duration'])
+
+def test_saved_rejections_are_rejected_again(tmp_path):
+    take_rejected()
+    _, rows = rejected_by(reject_bad_rows)
+    assert write_quarantine(str(tmp_path / 'parsed.csv')) == 2
+    saved = io.StringIO()
+    save_rejected(rows, saved)
+
+    # A later run that gets the records from a cache instead of parsing the file
+    take_rejected()
+    restore_rejected(read_rejected(io.StringIO(saved.getvalue())))
+    assert write_quarantine(str(tmp_path / 'cached.csv')) == 2
+    assert (tmp_path / 'parsed.csv').read_text() == (tmp_path / 'cached.csv').read_text()
+    assert dict(quarantine._rejected['counts']) == {('voicespin.csv', 'malformed duration'): 1, ('voicespin.csv', 'missing duration'): 1}
+    take_rejected()
+
+def test_rejected_by_keeps_earlier_rejections():
+    take_rejected()
+    reject_bad_rows()
+    _, rows = rejected_by(lambda: None)
+    assert rows is None
+    assert len(take_rejected()['rows']) == 1
+
+def test_split_export_rows_keep_their_part_and_line(tmp_path):
+    from app import read_call_records
+    header = "CALL ID,CALL DATE,AGENT,DESTINATION,BILLSEC,CALL STATUS\n"
+    parts = tmp_path / 'voicespin'
+    parts.mkdir()
+    (parts / 'a.csv').write_text(header + "1,2024-10-01 10:00:00,Ann,441,x:y,ANSWERED\n2,2024-10-01 10:01:00,Ann,442,01:00,ANSWERED\n")
+    (parts / 'b.csv').write_text(header + "3,2024-10-01 11:00:00,Bob,443,bad,ANSWERED\n")
+
+    for chunksize in [1, None]:
+        take_rejected()
+        read_call_records(str(parts), 'voicespin.csv', chunksize)
+        assert write_quarantine(str(tmp_path / 'rejected.csv')) == 2
+        rows = pd.read_csv(tmp_path / 'rejected.csv', dtype=str)
+        assert rows['part'].tolist() == [str(parts / 'a.csv'), str(parts / 'b.csv')]
+        assert rows['line'].tolist() == ['2', '2']
+    take_rejected()
@@ -0,0 +1,25 @@
+from store import load_file, open_store, store_counts, store_durations
+
+HEADER = "CALL ID,CALL DATE,AGENT,DESTINATION,BILLSEC,CALL STATUS\n"
+
+def write_export(folder, rows):
+    """Write a voicespin export with the given rows into its own folder."""
+    folder.mkdir()
+    path = folder / 'voicespin.csv'
+    path.write_text(HEADER + ''.join(row + '\n' for row in rows))
+    return str(path)
+
+def test_exports_splitting_an_hour_add_up(tmp_path):
+    first = write_export(tmp_path / 'first', ["a,2024-10-01 10:10:00,Ann 1,441,01:00:00,ANSWERED"])
+    # The next pull repeats the end of the last one
+    second = write_export(tmp_path / 'second', [
+        "a,2024-10-01 10:10:00,Ann 1,441,01:00:00,ANSWERED",
+        "b,2024-10-01 10:40:00,Ann 1,442,02:00:00,ANSWERED"
+    ])
+    conn = open_store(str(tmp_path / 'calls.db'))
+    assert load_file(conn, first, 'voicespin.csv') == 1
+    assert load_file(conn, second, 'voicespin.csv') == 1
+
+    [(totals, _)] = store_durations(conn, ['voicespin.csv'])
+    assert totals['seconds'].tolist() == [180]
+    assert store_counts(conn, ['voicespin.csv'])[0]['ann'] == 2
@@ -1,25 +1,8 @@
 #Marcus🗿 was here
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill, Border, Side
-
-# Load the data from the Excel files
-agent_list = pd.read_excel(r"C:\Users\marcus.forsen\Desktop\new project\agents.xlsx")
-call_results_conversion = pd.read_excel(r"C:\Users\marcus.forsen\Desktop\new project\Agent_Call_Results.xlsx", sheet_name='Conversion Agents')
-call_results_retention = pd.read_excel(r"C:\Users\marcus.forsen\Desktop\new project\Agent_Call_Results.xlsx", sheet_name='Retention Agents')
-duration_results_conversion = pd.read_excel(r"C:\Users\marcus.forsen\Desktop\new project\Agent_Duration_Results.xlsx", sheet_name='Conversion Agents')
-duration_results_retention = pd.read_excel(r"C:\Users\marcus.forsen\Desktop\new project\Agent_Duration_Results.xlsx", sheet_name='Retention Agents')
-
-# Clean and standardize the 'Agent Name' in all dataframes
-agent_list['AGENTNAME'] = agent_list['AGENTNAME'].str.strip().str.upper()
-call_results_conversion['Agent Name'] = call_results_conversion['Agent Name'].str.strip().str.upper()
-call_results_retention['Agent Name'] = call_results_retention['Agent Name'].str.strip().str.upper()
-duration_results_conversion['Agent Name'] = duration_results_conversion['Agent Name'].str.strip().str.upper()
-duration_results_retention['Agent Name'] = duration_results_retention['Agent Name'].str.strip().str.upper()
-
-# Extract and rename columns from the agent list
-agents_data = agent_list[['AGENTNAME', 'DESK', 'DEPARTMENT']].copy()
-agents_data.rename(columns={'AGENTNAME': 'Agent Name', 'DESK': 'Desk'}, inplace=True)
+import xlsxwriter
+from instrument import finish_run, instrumented, start_run
+from roster import AgentRoster
 
 # Define the custom desk order for "Conversion Agents"
 desk_order_conversion = [
@@ -29,117 +12,11 @@ desk_order_conversion_dict = {desk: idx for idx, desk in enumerate(desk_order_co
 
 # Define the custom desk order for "Retention Agents"
 desk_order_retention = [
-    'Japan Team', 'Korean Team', 'Aarav Team', 'Ajay Team', 'French', 
+    'Japan Team', 'Korean Team', 'Aarav Team', 'Ajay Team', 'French',
     'AKA Team', 'Spanish', 'Portuguese'
 ]
 desk_order_retention_dict = {desk: idx for idx, desk in enumerate(desk_order_retention)}
 
-# Extract relevant columns and handle call results and durations for Conversion Agents
-call_data_conversion = call_results_conversion[['Agent Name', 'Unique', 'Call Attempts']].copy()
-duration_data_conversion = duration_results_conversion[['Agent Name', 'Total Time']].copy()
-
-# Convert the "Total Time" to timedelta and handle formatting
-duration_data_conversion['Total Time'] = pd.to_timedelta(duration_data_conversion['Total Time'], errors='coerce')
-duration_data_conversion['Duration'] = duration_data_conversion['Total Time'].apply(lambda x: str(x).split()[-1] if pd.notnull(x) else '0')
-duration_data_conversion.drop(columns=['Total Time'], inplace=True)
-
-# Extract relevant columns and handle call results and durations for Retention Agents
-call_data_retention = call_results_retention[['Agent Name', 'Unique', 'Call Attempts']].copy()
-duration_data_retention = duration_results_retention[['Agent Name', 'Total Time']].copy()
-
-# Convert the "Total Time" to timedelta and handle formatting
-duration_data_retention['Total Time'] = pd.to_timedelta(duration_data_retention['Total Time'], errors='coerce')
-duration_data_retention['Duration'] = duration_data_retention['Total Time'].apply(lambda x: str(x).split()[-1] if pd.notnull(x) else '0')
-duration_data_retention.drop(columns=['Total Time'], inplace=True)
-
-# Merge the "Unique", "Call Attempts" and "Duration" columns with the agent data for Conversion Agents
-merged_data_conversion = pd.merge(agents_data[agents_data['DEPARTMENT'] == 1].copy(), call_data_conversion, on='Agent Name', how='left')
-merged_data_conversion = pd.merge(merged_data_conversion, duration_data_conversion, on='Agent Name', how='left')
-
-# Merge the "Unique", "Call Attempts" and "Duration" columns with the agent data for Retention Agents
-merged_data_retention = pd.merge(agents_data[agents_data['DEPARTMENT'] == 2].copy(), call_data_retention, on='Agent Name', how='left')
-merged_data_retention = pd.merge(merged_data_retention, duration_data_retention, on='Agent Name', how='left')
-
-# Fill missing values in "Unique", "Call Attempts", and "Duration" with 0
-merged_data_conversion['Unique'] = merged_data_conversion['Unique'].fillna(0)
-merged_data_conversion['Call Attempts'] = merged_data_conversion['Call Attempts'].fillna(0)
-merged_data_conversion['Duration'] = merged_data_conversion['Duration'].fillna('0')
-merged_data_conversion['Target'] = 0  # Default target
-
-merged_data_retention['Unique'] = merged_data_retention['Unique'].fillna(0)
-merged_data_retention['Call Attempts'] = merged_data_retention['Call Attempts'].fillna(0)
-merged_data_retention['Duration'] = merged_data_retention['Duration'].fillna('0')
-merged_data_retention['Target'] = 0  # Default target
-
-# Define a function to calculate the Target as a percentage
-def calculate_target(row):
-    # Calculate percentage from unique calls
-    unique_calls_percentage = (row['Unique'] // 3) * 1
-
-    # Calculate percentage from duration
-    duration_str = str(row['Duration'])
-    if duration_str != '0':
-        duration_parts = duration_str.split(':')
-        if len(duration_parts) == 3:
-            hours, minutes, seconds = map(int, duration_parts)
-        elif len(duration_parts) == 2:
-            hours = 0
-            minutes, seconds = map(int, duration_parts)
-        else:
-            hours = 0
-            minutes = 0
-            seconds = int(duration_parts[0])
-        total_minutes = hours * 60 + minutes + (seconds / 60)
-        duration_percentage = (total_minutes // 1.5) * 1
-    else:
-        duration_percentage = 0
-
-    # Combine the percentages
-    return unique_calls_percentage + duration_percentage
-
-# Apply the calculation function to each row
-merged_data_conversion['Target'] = merged_data_conversion.apply(calculate_target, axis=1)
-merged_data_retention['Target'] = merged_data_retention.apply(calculate_target, axis=1)
-
-# Convert the Target to a numeric value for sorting
-merged_data_conversion['Target Numeric'] = merged_data_conversion['Target']
-merged_data_retention['Target Numeric'] = merged_data_retention['Target']
-
-# Apply the custom sorting order for "Conversion Agents"
-merged_data_conversion['Desk Order'] = merged_data_conversion['Desk'].map(desk_order_conversion_dict)
-merged_data_conversion.sort_values(by=['Desk Order', 'Target Numeric'], ascending=[True, False], inplace=True)
-
-# Apply the custom sorting order for "Retention Agents"
-merged_data_retention['Desk Order'] = merged_data_retention['Desk'].map(desk_order_retention_dict)
-merged_data_retention.sort_values(by=['Desk Order', 'Target Numeric'], ascending=[True, False], inplace=True)
-
-# Drop the temporary 'Desk Order' column used for sorting
-merged_data_conversion.drop(columns=['Desk Order', 'Target Numeric', 'DEPARTMENT'], inplace=True)
-merged_data_retention.drop(columns=['Desk Order', 'Target Numeric', 'DEPARTMENT'], inplace=True)
-
-# Reorder columns for Conversion Agents
-merged_data_conversion = merged_data_conversion[['Desk', 'Agent Name', 'Duration', 'Call Attempts', 'Unique', 'Target']]
-
-# Reorder columns for Retention Agents
-merged_data_retention = merged_data_retention[['Desk', 'Agent Name', 'Duration', 'Call Attempts', 'Unique', 'Target']]
-
-# Convert 'Target' column to string with percentage format
-merged_data_conversion['Target'] = merged_data_conversion['Target'].astype(int).astype(str) + '%'
-merged_data_retention['Target'] = merged_data_retention['Target'].astype(int).astype(str) + '%'
-
-# Create the new Excel file with updated data
-file_path = 'Agent_Results.xlsx'
-with pd.ExcelWriter(file_path) as writer:
-    merged_data_conversion.to_excel(writer, sheet_name='Conversion Agents', index=False)
-    merged_data_retention.to_excel(writer, sheet_name='Retention Agents', index=False)
-
-# Load the Excel file with openpyxl
-wb = load_workbook(file_path)
-
-# Get the worksheets
-ws_conversion = wb['Conversion Agents']
-ws_retention = wb['Retention Agents']
-
 # Define colors for each desk
 desk_colors_conversion = {
     'Team Vincent': 'FFFFFF',     # Very light red
@@ -163,69 +40,206 @@ desk_colors_retention = {
     'Portuguese': 'FFFFFF'  # Very light green
 }
 
-# Define grey color for highlighting special values
-grey_fill = PatternFill(start_color='D3D3D3', end_color='D3D3D3', fill_type='solid')
-
-# Apply coloring to Conversion Agents sheet
-for row in ws_conversion.iter_rows(min_row=2, max_row=ws_conversion.max_row, min_col=1, max_col=6):
-    desk = row[0].value
-    if desk in desk_colors_conversion:
-        fill = PatternFill(start_color=desk_colors_conversion[desk], end_color=desk_colors_conversion[desk], fill_type='solid')
-        for cell in row:
-            cell.fill = fill
-            # Apply grey background for special values
-            if cell.value in ['00:00:00', 0, '0%', '0']:
-                cell.fill = grey_fill
-
-# Apply coloring to Retention Agents sheet
-for row in ws_retention.iter_rows(min_row=2, max_row=ws_retention.max_row, min_col=1, max_col=6):
-    desk = row[0].value
-    if desk in desk_colors_retention:
-        fill = PatternFill(start_color=desk_colors_retention[desk], end_color=desk_colors_retention[desk], fill_type='solid')
-        for cell in row:
-            cell.fill = fill
-            # Apply grey background for special values
-            if cell.value in ['00:00:00', 0, '0%', '0']:
-                cell.fill = grey_fill
-
-# Define the thin border style
-thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-
-# Apply the border to Conversion Agents sheet
-for row in ws_conversion.iter_rows(min_row=1, max_row=ws_conversion.max_row, min_col=1, max_col=6):
-    for cell in row:
-        cell.border = thin_border
-
-# Apply the border to Retention Agents sheet
-for row in ws_retention.iter_rows(min_row=1, max_row=ws_retention.max_row, min_col=1, max_col=6):
-    for cell in row:
-        cell.border = thin_border
-
-# Save the updated Excel file
-wb.save(file_path)
-
-# Identify and print unmatched agents with their file source
-all_agents = set(agent_list['AGENTNAME'])
-call_agents_conversion = set(call_results_conversion['Agent Name'])
-call_agents_retention = set(call_results_retention['Agent Name'])
-duration_agents_conversion = set(duration_results_conversion['Agent Name'])
-duration_agents_retention = set(duration_results_retention['Agent Name'])
-
-unmatched_conversion = (call_agents_conversion | duration_agents_conversion) - all_agents
-unmatched_retention = (call_agents_retention | duration_agents_retention) - all_agents
-
-unmatched_sources = {
-    'Conversion Agents Call Results': call_agents_conversion - all_agents,
-    'Conversion Agents Duration Results': duration_agents_conversion - all_agents,
-    'Retention Agents Call Results': call_agents_retention - all_agents,
-    'Retention Agents Duration Results': duration_agents_retention - all_agents
-}
-
-print("\nUnmatched Agents:")
-for source, unmatched in unmatched_sources.items():
-    if unmatched:
-        print(f"\n{source}:")
-        for agent in unmatched:
-            print(f" - {agent}")
-
-print("\nAgent_Results.xlsx has been generated.")
+@instrumented('parse durations')
+def total_time_to_seconds(duration_results):
+    """Turn the "X h Y m Z s" Total Time of a duration results sheet into whole seconds (missing where unreadable)."""
+    total_time = pd.to_timedelta(duration_results['Total Time'], errors='coerce')
+    return pd.DataFrame({
+        'Agent Name': duration_results['Agent Name'],
+        'Seconds': (total_time.dt.total_seconds() // 1).astype('Int64')
+    })
+
+def format_durations(seconds):
+    """Format whole seconds as HH:MM:SS, letting the hours go past 24."""
+    seconds = pd.Series(seconds, dtype='int64')
+    hours = (seconds // 3600).astype(str).str.zfill(2)
+    minutes = (seconds % 3600 // 60).astype(str).str.zfill(2)
+    return hours + ':' + minutes + ':' + (seconds % 60).astype(str).str.zfill(2)
+
+def calculate_target(unique, seconds):
+    """
+    Calculate the Target percentage of every agent at once: a point per 3 unique calls
+    plus a point per full 1.5 minutes (90 seconds) of talk time.
+    """
+    return unique // 3 + seconds // 90
+
+def with_agent_codes(roster, results):
+    """Replace the 'Agent Name' of a results frame with the roster's agent code, -1 for names not on the roster."""
+    results = results.copy()
+    results.insert(0, 'code', roster.encode(results['Agent Name'].str.strip().str.lower()))
+    return results.drop(columns=['Agent Name'])
+
+# The columns of a scored sheet as it is written; build_results also keeps each agent's 'Seconds' of talk time
+# and 'Target Value' (the Target as a number) for callers that need numbers rather than display text, e.g. the leaderboard
+SHEET_COLUMNS = ['Desk', 'Agent Name', 'Duration', 'Call Attempts', 'Unique', 'Target']
+
+def rank_department(agents_data, department, call_data, duration_data, desk_order_dict):
+    """
+    Merge one department's call and duration results onto the roster, score them and sort them by desk and target.
+    Durations stay whole seconds until the Duration column is formatted for the sheet.
+    """
+    # Merge the "Unique", "Call Attempts" and "Seconds" columns with the agent data, joining on the agent codes
+    merged_data = pd.merge(agents_data[agents_data['DEPARTMENT'] == department].copy(), call_data, on='code', how='left')
+    merged_data = pd.merge(merged_data, duration_data, on='code', how='left')
+
+    # Fill missing values in "Unique", "Call Attempts", and "Seconds" with 0
+    merged_data['Unique'] = merged_data['Unique'].fillna(0)
+    merged_data['Call Attempts'] = merged_data['Call Attempts'].fillna(0)
+    has_duration = merged_data['Seconds'].notna()
+    seconds = merged_data['Seconds'].fillna(0).astype('int64')
+
+    # Score every agent in one go
+    merged_data['Seconds'] = seconds
+    merged_data['Target Value'] = calculate_target(merged_data['Unique'], seconds).astype('int64')
+
+    # Apply the custom sorting order
+    merged_data['Desk Order'] = merged_data['Desk'].map(desk_order_dict)
+    merged_data.sort_values(by=['Desk Order', 'Target Value'], ascending=[True, False], inplace=True)
+
+    # Format for the sheet only now; agents without a duration get '0', as before
+    merged_data['Duration'] = format_durations(seconds).where(has_duration, '0')
+    merged_data['Target'] = merged_data['Target Value'].astype(str) + '%'
+
+    # Reorder columns
+    return merged_data[SHEET_COLUMNS + ['Seconds', 'Target Value']]
+
+@instrumented('score')
+def build_results(roster, call_data_conversion, call_data_retention, duration_data_conversion, duration_data_retention):
+    """
+    Score every roster agent from their call results ('Agent Name', 'Unique', 'Call Attempts')
+    and durations ('Agent Name', 'Seconds'), returning the conversion and retention sheets (see SHEET_COLUMNS).
+    """
+    # Extract and rename columns from the roster
+    agents_data = pd.DataFrame({
+        'code': roster.frame['code'],
+        'Desk': roster.frame['desk'],
+        'Agent Name': roster.frame['name'].str.upper(),
+        'DEPARTMENT': roster.frame['department']
+    })
+
+    call_data_conversion, call_data_retention, duration_data_conversion, duration_data_retention = [
+        with_agent_codes(roster, results) for results in [call_data_conversion, call_data_retention, duration_data_conversion, duration_data_retention]
+    ]
+    merged_data_conversion = rank_department(agents_data, 1, call_data_conversion, duration_data_conversion, desk_order_conversion_dict)
+    merged_data_retention = rank_department(agents_data, 2, call_data_retention, duration_data_retention, desk_order_retention_dict)
+    return merged_data_conversion, merged_data_retention
+
+# Cell values that are greyed out on desk-colored rows
+ZERO_VALUES = ['00:00:00', 0, '0%', '0']
+
+def sheet_formats(workbook, desk_colors):
+    """Create the shared formats of a sheet once: plain bordered cells, the grey zero fill and each desk's fill."""
+    border = {'border': 1}
+    formats = {
+        'plain': workbook.add_format(border),
+        'grey': workbook.add_format({**border, 'pattern': 1, 'bg_color': '#D3D3D3'}),
+        'desks': {}
+    }
+    for desk, color in desk_colors.items():
+        formats['desks'][desk] = workbook.add_format({**border, 'pattern': 1, 'bg_color': f'#{color}'})
+    return formats
+
+def write_cell(ws, row, col, value, cell_format):
+    """Write one value with its format, leaving missing values as empty bordered cells."""
+    if pd.isna(value):
+        ws.write_blank(row, col, None, cell_format)
+    elif isinstance(value, str):
+        ws.write_string(row, col, value, cell_format)
+    else:
+        ws.write_number(row, col, value, cell_format)
+
+def write_sheet(workbook, sheet_name, merged_data, desk_colors):
+    """
+    Write one scored sheet row by row: rows of a known desk get its color with zero values greyed out,
+    and every cell gets a thin border.
+    """
+    ws = workbook.add_worksheet(sheet_name)
+    formats = sheet_formats(workbook, desk_colors)
+
+    for col, column in enumerate(merged_data.columns):
+        ws.write_string(0, col, column, formats['plain'])
+
+    for row, values in enumerate(merged_data.itertuples(index=False, name=None), start=1):
+        desk_format = formats['desks'].get(values[0]) if isinstance(values[0], str) else None
+        for col, value in enumerate(values):
+            if desk_format is None:
+                cell_format = formats['plain']
+            elif not pd.isna(value) and value in ZERO_VALUES:
+                cell_format = formats['grey']
+            else:
+                cell_format = desk_format
+            write_cell(ws, row, col, value, cell_format)
+
+@instrumented('export results')
+def write_results(merged_data_conversion, merged_data_retention, file_path='Agent_Results.xlsx'):
+    """Write the scored and styled sheets to Excel in a single streaming pass."""
+    # constant_memory flushes each row to disk as soon as the next one starts
+    workbook = xlsxwriter.Workbook(file_path, {'constant_memory': True})
+    write_sheet(workbook, 'Conversion Agents', merged_data_conversion[SHEET_COLUMNS], desk_colors_conversion)
+    write_sheet(workbook, 'Retention Agents', merged_data_retention[SHEET_COLUMNS], desk_colors_retention)
+    workbook.close()
+
+def run_report(roster_path, call_results_path, duration_results_path, output='Agent_Results.xlsx'):
+    """Score the agents from the call and duration reports of app2.py and app.py and write the results (what theapp.py runs)."""
+    # Load the data from the Excel files
+    roster = AgentRoster.from_excel(roster_path)
+    call_results_conversion = pd.read_excel(call_results_path, sheet_name='Conversion Agents')
+    call_results_retention = pd.read_excel(call_results_path, sheet_name='Retention Agents')
+    duration_results_conversion = pd.read_excel(duration_results_path, sheet_name='Conversion Agents')
+    duration_results_retention = pd.read_excel(duration_results_path, sheet_name='Retention Agents')
+
+    # Clean and standardize the 'Agent Name' in all dataframes
+    call_results_conversion['Agent Name'] = call_results_conversion['Agent Name'].str.strip().str.upper()
+    call_results_retention['Agent Name'] = call_results_retention['Agent Name'].str.strip().str.upper()
+    duration_results_conversion['Agent Name'] = duration_results_conversion['Agent Name'].str.strip().str.upper()
+    duration_results_retention['Agent Name'] = duration_results_retention['Agent Name'].str.strip().str.upper()
+
+    # Extract relevant columns and handle call results and durations
+    call_data_conversion = call_results_conversion[['Agent Name', 'Unique', 'Call Attempts']].copy()
+    call_data_retention = call_results_retention[['Agent Name', 'Unique', 'Call Attempts']].copy()
+    duration_data_conversion = total_time_to_seconds(duration_results_conversion)
+    duration_data_retention = total_time_to_seconds(duration_results_retention)
+
+    # Score and sort the agents, then create the new Excel file with updated data
+    merged_data_conversion, merged_data_retention = build_results(roster, call_data_conversion, call_data_retention, duration_data_conversion, duration_data_retention)
+    write_results(merged_data_conversion, merged_data_retention, output)
+
+    # Identify and print unmatched agents with their file source
+    all_agents = set(roster.frame['name'].str.upper())
+    call_agents_conversion = set(call_results_conversion['Agent Name'])
+    call_agents_retention = set(call_results_retention['Agent Name'])
+    duration_agents_conversion = set(duration_results_conversion['Agent Name'])
+    duration_agents_retention = set(duration_results_retention['Agent Name'])
+
+    unmatched_sources = {
+        'Conversion Agents Call Results': call_agents_conversion - all_agents,
+        'Conversion Agents Duration Results': duration_agents_conversion - all_agents,
+        'Retention Agents Call Results': call_agents_retention - all_agents,
+        'Retention Agents Duration Results': duration_agents_retention - all_agents
+    }
+
+    print("\nUnmatched Agents:")
+    for source, unmatched in unmatched_sources.items():
+        if unmatched:
+            print(f"\n{source}:")
+            for agent in unmatched:
+                print(f" - {agent}")
+
+    print(f"\n{output} has been generated.")
+
+
+if __name__ == "__main__":
+    # Set REPORT_PATH to write a JSON report of every stage's time, rows and memory; PROFILE_PATH also saves a cProfile of the run
+    REPORT_PATH = None
+    PROFILE_PATH = None
+    if REPORT_PATH or PROFILE_PATH:
+        start_run(PROFILE_PATH)
+
+    run_report(
+        r"C:\Users\marcus.forsen\Desktop\new project\agents.xlsx",
+        r"C:\Users\marcus.forsen\Desktop\new project\Agent_Call_Results.xlsx",
+        r"C:\Users\marcus.forsen\Desktop\new project\Agent_Duration_Results.xlsx",
+        'Agent_Results.xlsx'
+    )
+
+    finish_run(REPORT_PATH)
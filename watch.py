@@ -0,0 +1,144 @@
+#Marcus🗿 was here
+import os
+import time
+from exports import export_path, input_files
+from pipeline import CALL_FILES, DURATION_FILES, load_source, run_pipeline
+from lengths import merge_histograms
+from quarantine import merge_rejected, print_rejected, take_rejected, write_quarantine
+from roster import AgentRoster
+
+ROSTER_FILE = 'agents.xlsx'
+
+def file_signature(path):
+    """Return a file's (size, modification time), or None if it isn't there. A folder of parts has one (name, size, time) per part."""
+    try:
+        files = input_files(path)
+        if files == [path]:
+            stat = os.stat(path)
+            return stat.st_size, stat.st_mtime_ns
+        return tuple((os.path.basename(file), os.stat(file).st_size, os.stat(file).st_mtime_ns) for file in files)
+    except FileNotFoundError:
+        return None
+
+class FolderWatcher:
+    """
+    Keep the roster and each export's per-agent totals and call counts in memory, re-reading only the files that are
+    new or changed. A file is only read once its size and modification time were the same on two polls in a row,
+    so exports that are still being copied into the folder are left alone until they are complete.
+    """
+
+    def __init__(self, data_dir, duration_files=DURATION_FILES, call_files=CALL_FILES, chunksize=None, cache_dir=None):
+        self.data_dir = data_dir
+        self.duration_files = duration_files
+        self.call_files = call_files
+        self.chunksize = chunksize
+        self.cache_dir = cache_dir
+        self.roster = None
+        self.results = {}  # filename -> (totals, counts, destinations, lengths) as pipeline.load_source gives them
+        self.rejected = {}  # filename -> the rows rejected when it was last read
+        self.loaded = {}  # filename -> signature of the content that was read
+        self.seen = {}  # filename -> signature at the last poll
+
+    def path(self, filename):
+        """Return where a file is in the folder; exports may be gzipped, zipped or a folder of parts."""
+        if filename == ROSTER_FILE:
+            return os.path.join(self.data_dir, filename)
+        return export_path(self.data_dir, filename)
+
+    def poll(self):
+        """Look at the folder once and return the files whose settled content hasn't been read yet (removed files included)."""
+        changed = []
+        for filename in [ROSTER_FILE] + list(dict.fromkeys(self.duration_files + self.call_files)):
+            signature = file_signature(self.path(filename))
+            previous = self.seen.get(filename, ())  # Never equal to a signature, so every file is seen once before it settles
+            self.seen[filename] = signature
+            if signature == previous and signature != self.loaded.get(filename):
+                changed.append(filename)
+        return changed
+
+    def ingest(self, filenames):
+        """Read the given files again, replacing what was held for them. A file that fails to read keeps its previous data."""
+        for filename in filenames:
+            path = self.path(filename)
+            signature = self.seen[filename]
+            self.loaded[filename] = signature
+            if signature is None:
+                print(f"{filename} was removed")
+                self.results.pop(filename, None)
+                self.rejected.pop(filename, None)
+                continue
+
+            print(f"Reading {filename}")
+            try:
+                if filename == ROSTER_FILE:
+                    self.roster = AgentRoster.from_excel(path)
+                else:
+                    take_rejected()
+                    self.results[filename] = load_source(path, filename, self.duration_files, self.call_files, self.chunksize, self.cache_dir)
+                    self.rejected[filename] = take_rejected()
+            except Exception as e:
+                print(f"Error reading {filename}, keeping its previous data: {e}")
+
+    def report(self, output='Agent_Results.xlsx', quarantine_path=None, write_details=False):
+        """
+        Score everything held in memory, write the report and the quarantine of every file's rejected rows.
+        Returns the scored conversion and retention sheets.
+        """
+        per_file_totals = [(self.results[filename][0], filename) for filename in self.duration_files if self.results.get(filename, (None, None))[0] is not None]
+        call_counts = [(self.results[filename][1], filename) for filename in self.call_files if self.results.get(filename, (None, None))[1] is not None]
+        # The call lengths of the files as they were last read, for the details workbook
+        lengths = merge_histograms([self.results[filename][3] for filename in self.duration_files if filename in self.results])
+        scored = run_pipeline(self.roster, per_file_totals, call_counts, output, write_details, lengths=lengths)
+
+        take_rejected()
+        for rejected in self.rejected.values():
+            merge_rejected(rejected)
+        print_rejected()
+        if quarantine_path:
+            write_quarantine(quarantine_path)
+        return scored
+
+def watch(watcher, output='Agent_Results.xlsx', quarantine_path=None, write_details=False, poll_seconds=5, on_report=None):
+    """
+    Poll the folder forever, regenerating the report whenever a file has changed.
+    on_report, if given, is called with the scored sheets after every report.
+    """
+    print(f"Watching {watcher.data_dir} every {poll_seconds} s (Ctrl+C to stop)")
+    pending = False
+    while True:
+        changed = watcher.poll()
+        if changed:
+            watcher.ingest(changed)
+            pending = True
+
+        if pending and watcher.roster is not None:
+            try:
+                scored = watcher.report(output, quarantine_path, write_details)
+                pending = False
+                if on_report is not None:
+                    on_report(scored)
+            except PermissionError as e:
+                # Usually the report is open in Excel; try again on the next poll
+                print(f"Could not write the report, trying again in {poll_seconds} s: {e}")
+        time.sleep(poll_seconds)
+
+
+if __name__ == "__main__":
+    # The folder the exports are dropped into, and how often to look at it
+    DATA_DIR = r'C:\Users\marcus.forsen\Desktop\new project'
+    POLL_SECONDS = 5
+    # Set STREAMING to read each export in chunks of CHUNK_SIZE rows instead of loading them all at once
+    STREAMING = False
+    CHUNK_SIZE = 100000
+    # Set CACHE_DIR to reuse parsed call logs whose content hasn't changed when the service is restarted
+    CACHE_DIR = None
+    # Where the report goes; WRITE_DETAILS also writes Agent_Duration_Results.xlsx and Agent_Call_Results.xlsx each time
+    OUTPUT = 'Agent_Results.xlsx'
+    WRITE_DETAILS = False
+    QUARANTINE_PATH = 'rejected_rows.csv'
+
+    watcher = FolderWatcher(DATA_DIR, chunksize=CHUNK_SIZE if STREAMING else None, cache_dir=CACHE_DIR)
+    try:
+        watch(watcher, OUTPUT, QUARANTINE_PATH, WRITE_DETAILS, POLL_SECONDS)
+    except KeyboardInterrupt:
+        print("Stopped watching.")